@@ -0,0 +1,72 @@
+"""Responsiveness of the event loop while translating: translate() called inline versus translate_async.
+
+A heartbeat task wakes up every millisecond while a batch of graphs is translated, and records by how much
+it wakes up late.
+
+    - graphs/s: translations per second
+    - max lag: the longest time (ms) the event loop was blocked
+
+Translations in threads still hold the GIL, so only a process pool keeps the loop fully responsive.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_async_translate
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_translate_many import corpus
+from pylogos.async_translate import process_executor, translate_async, translate_many_async
+from pylogos.translate import translate
+
+
+async def heartbeat(lags, interval=0.001):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def inline(graphs):
+    for query_graph in graphs:
+        translate(query_graph)
+        await asyncio.sleep(0)
+
+
+async def concurrent(graphs, executor, max_in_flight=8):
+    limit = asyncio.Semaphore(max_in_flight)
+    await asyncio.gather(*(translate_async(query_graph, executor, limit=limit) for query_graph in graphs))
+
+
+async def batch(graphs, executor, max_in_flight=8):
+    async for _ in translate_many_async(graphs, executor, max_in_flight):
+        pass
+
+
+async def measure(coroutine):
+    lags = []
+    task = asyncio.create_task(heartbeat(lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await coroutine
+    seconds = time.perf_counter() - start
+    task.cancel()
+    return seconds, max(lags, default=0.0)
+
+
+def main(num_graphs=500):
+    print(f"{'mode':<34}{'graphs/s':>10}{'max lag (ms)':>14}")
+    with ThreadPoolExecutor(4) as threads, process_executor(cache_size=0) as processes:
+        modes = [
+            ("inline", lambda graphs: inline(graphs)),
+            ("translate_async, threads", lambda graphs: concurrent(graphs, threads)),
+            ("translate_many_async, threads", lambda graphs: batch(graphs, threads)),
+            ("translate_many_async, processes", lambda graphs: batch(graphs, processes)),
+        ]
+        for name, make in modes:
+            seconds, lag = asyncio.run(measure(make(corpus(num_graphs))))
+            print(f"{name:<34}{num_graphs / seconds:>10.0f}{lag * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
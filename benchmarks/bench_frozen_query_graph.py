@@ -0,0 +1,56 @@
+"""End-to-end translate() latency on a networkx Query_graph versus its FrozenQueryGraph snapshot.
+
+    - cold: analyses (query subjects, reference points, ...) computed from scratch in every call
+            (for the snapshot, the time of freeze() is reported separately)
+    - warm: analyses already cached, i.e., only the MRP traversal and sentence construction
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_frozen_query_graph
+"""
+import pickle
+import timeit
+
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+    chain_query_graph,
+)
+
+GRAPHS = [
+    ("SPJ_query", lambda: SPJ_query().simplified_graph),
+    ("GroupBy_query", lambda: GroupBy_query().simplified_graph),
+    ("Nested_with_correlation_query", lambda: Nested_with_correlation_query().simplified_graph),
+    ("Nested_with_multisublink_query", lambda: Nested_with_multisublink_query().simplified_graph),
+    ("Nested_with_groupby_query", lambda: Nested_with_groupby_query().simplified_graph),
+    ("Nested_with_multilevel_query", lambda: Nested_with_multilevel_query().simplified_graph),
+    ("chain_query_graph(30)", lambda: chain_query_graph(30)),
+]
+
+
+def latency_ms(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main(number=50):
+    print(f"{'graph':<32}{'freeze':>8}{'cold nx':>10}{'cold frozen':>13}{'warm nx':>10}{'warm frozen':>13}  (ms)")
+    for name, build in GRAPHS:
+        data = pickle.dumps(build())
+        query_graph = pickle.loads(data)
+        frozen_graph = query_graph.freeze()
+
+        freeze_ms = latency_ms(query_graph.freeze, number)
+        # Fresh copies so that no analysis is cached
+        cold_nx_ms = latency_ms(lambda: translate(pickle.loads(data)), number) - latency_ms(lambda: pickle.loads(data), number)
+        cold_frozen_ms = latency_ms(lambda: translate(query_graph.freeze()), number) - freeze_ms
+        warm_nx_ms = latency_ms(lambda: translate(query_graph), number)
+        warm_frozen_ms = latency_ms(lambda: translate(frozen_graph), number)
+        print(f"{name:<32}{freeze_ms:>8.3f}{cold_nx_ms:>10.3f}{cold_frozen_ms:>13.3f}{warm_nx_ms:>10.3f}{warm_frozen_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
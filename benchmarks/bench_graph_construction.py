@@ -0,0 +1,30 @@
+"""Query graph construction throughput: one connect_* call per edge versus Query_graph.from_edges.
+
+    - connect:    chain_query_graph(n), i.e., nodes built once and one connect_* call per edge
+    - from_edges: Query_graph.from_edges on the equivalent tuple records (chain_query_graph_edges(n))
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_graph_construction
+"""
+import timeit
+
+from pylogos.query_graph.koutrika_query_graph import Query_graph
+from tests.test_koutrika_et_al_2010.utils import chain_query_graph, chain_query_graph_edges
+
+
+def graphs_per_second(func, number):
+    return number / min(timeit.repeat(func, number=number, repeat=3))
+
+
+def main(number=200):
+    print(f"{'relations':>10}{'edges':>8}{'connect':>12}{'from_edges':>12}{'speedup':>9}  (graphs/s)")
+    for num_relations in [5, 30, 100]:
+        edges = chain_query_graph_edges(num_relations)
+        num_edges = chain_query_graph(num_relations).number_of_edges()
+        connect = graphs_per_second(lambda: chain_query_graph(num_relations), number)
+        from_edges = graphs_per_second(lambda: Query_graph.from_edges(edges), number)
+        print(f"{num_relations:>10}{num_edges:>8}{connect:>12.0f}{from_edges:>12.0f}{from_edges / connect:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
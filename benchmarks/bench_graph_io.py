@@ -0,0 +1,56 @@
+"""Load throughput of a graph corpus: back-to-back pickle records (utils_hjkim.load_graphs) versus the binary format.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_graph_io
+"""
+import os
+import tempfile
+import timeit
+
+from pylogos.query_graph.binary_format import iter_graphs, write_graphs
+from tests.test_koutrika_et_al_2010.utils import (
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    SPJ_query,
+    chain_query_graph,
+    random_query_graph,
+)
+from tests.test_modified_algorithm.utils_hjkim import load_graphs
+from tests.test_modified_algorithm.utils_hjkim import write_graphs as write_pickled_graphs
+
+
+def corpus(num_graphs):
+    builders = [
+        lambda i: SPJ_query().simplified_graph,
+        lambda i: Nested_with_groupby_query().simplified_graph,
+        lambda i: Nested_with_multilevel_query().simplified_graph,
+        lambda i: chain_query_graph(5 + i % 20),
+        lambda i: random_query_graph(5 + i % 20, i),
+    ]
+    return [builders[i % len(builders)](i) for i in range(num_graphs)]
+
+
+def graphs_per_second(func, num_graphs):
+    return num_graphs / min(timeit.repeat(func, number=1, repeat=3))
+
+
+def main(num_graphs=2000):
+    graphs = corpus(num_graphs)
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, "graphs.pkl")
+        binary_path = os.path.join(directory, "graphs.bin")
+        with open(pickle_path, "wb") as f:
+            write_pickled_graphs(f, graphs)
+        write_graphs(binary_path, graphs)
+
+        print(f"{'format':<20}{'size (KiB)':>12}{'graphs/s':>12}")
+        for name, path, load in [
+            ("pickle (load_graphs)", pickle_path, lambda: load_graphs(pickle_path, num_graphs)),
+            ("binary (mmap)", binary_path, lambda: list(iter_graphs(binary_path))),
+            ("binary (read)", binary_path, lambda: list(iter_graphs(binary_path, use_mmap=False))),
+        ]:
+            print(f"{name:<20}{os.path.getsize(path) / 1024:>12.0f}{graphs_per_second(load, num_graphs):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
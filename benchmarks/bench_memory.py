@@ -0,0 +1,70 @@
+"""Memory benchmark for query graphs and translated sentences.
+
+Reports the bytes allocated per graph (nodes, edges and the networkx structure, as loaded from a pickle)
+and per translated sentence (SStrChar tokens kept by the string builder), measured with tracemalloc.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_memory
+"""
+import pickle
+import sys
+import tracemalloc
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.algorithm.string_builder import SStrChar
+from pylogos.query_graph.koutrika_query_graph import Predicate, Relation
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_multilevel_query,
+    SPJ_query,
+    chain_query_graph,
+)
+
+GRAPHS = [
+    ("SPJ_query", lambda: SPJ_query().simplified_graph),
+    ("GroupBy_query", lambda: GroupBy_query().simplified_graph),
+    ("Nested_with_multilevel_query", lambda: Nested_with_multilevel_query().simplified_graph),
+    ("chain_query_graph(30)", lambda: chain_query_graph(30)),
+]
+
+
+def allocated_bytes_per_item(create, number):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [create() for _ in range(number)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / number
+
+
+def instance_size(obj):
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, "__dict__") else 0)
+
+
+def main(number=200):
+    print(f"{'object':<30}{'bytes':>10}")
+    for name, obj in [
+        ("Relation", Relation("movie", "movie")),
+        ("Predicate", Predicate()),
+        ("SStrChar", SStrChar("title", "movie", "title")),
+    ]:
+        print(f"{name:<30}{instance_size(obj):>10}")
+
+    print()
+    print(f"{'graph':<30}{'nodes':>8}{'edges':>8}{'bytes/graph':>14}{'bytes/sentence':>16}")
+    for name, build in GRAPHS:
+        query_graph = build()
+        query_subject = query_graph.query_subjects[0]
+        data = pickle.dumps(query_graph)
+        graph_bytes = allocated_bytes_per_item(lambda: pickle.loads(data), number)
+        sentence_bytes = allocated_bytes_per_item(
+            lambda: MRP()._call(query_subject, None, None, query_graph).construct_sentence(), number
+        )
+        print(
+            f"{name:<30}{query_graph.number_of_nodes():>8}{query_graph.number_of_edges():>8}{graph_bytes:>14.0f}{sentence_bytes:>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Scaling of MRP with the depth of the query graph: long join chains, wide stars and deeply nested queries.
+
+    - traverse: the traversal of MRP (MRP._call) on a graph whose analyses are cached, i.e., with the
+      descriptions gathered in the string builder but not put into a sentence
+    - per node: traverse divided by the number of nodes of the graph
+    - translate: translate() on a fresh copy of the graph (analyses and sentence construction included)
+
+The traversal keeps its own stack, so graphs far deeper than the recursion limit of Python are translated.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_mrp_depth
+"""
+import pickle
+import sys
+import timeit
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import chain_query_graph, nested_query_graph, star_query_graph
+
+SIZES = [125, 250, 500, 1000, 2000, 4000]
+# Building the sentence is quadratic in its number of phrases, so keep full translations to smaller graphs
+MAX_TRANSLATE_SIZE = 250
+# The sentence of every nested query is built during the traversal
+MAX_NESTED_SIZE = 500
+
+
+def latency_ms(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main(number=3):
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    print(f"{'graph':<8}{'size':>6}{'nodes':>7}{'traverse (ms)':>15}{'per node (us)':>15}{'translate (ms)':>16}")
+    translator = MRP()
+    for name, build in [("chain", chain_query_graph), ("star", star_query_graph), ("nested", nested_query_graph)]:
+        for size in SIZES:
+            if name == "nested" and size > MAX_NESTED_SIZE:
+                continue
+            query_graph = build(size)
+            query_subject = query_graph.query_subjects[0]
+            traverse_ms = latency_ms(lambda: translator._call(query_subject, None, None, query_graph), number)
+            translate_str = "-"
+            if size <= MAX_TRANSLATE_SIZE:
+                data = pickle.dumps(query_graph)
+                translate_ms = latency_ms(lambda: translate(pickle.loads(data)), 1) - latency_ms(lambda: pickle.loads(data), 1)
+                translate_str = f"{translate_ms:.1f}"
+            per_node_us = traverse_ms * 1000 / len(query_graph)
+            print(f"{name:<8}{size:>6}{len(query_graph):>7}{traverse_ms:>15.1f}{per_node_us:>15.1f}{translate_str:>16}")
+
+
+if __name__ == "__main__":
+    main()
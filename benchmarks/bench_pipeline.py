@@ -0,0 +1,54 @@
+"""Memory of the streaming pipeline (pylogos.pipeline.translate_file) against loading the whole corpus.
+
+For growing corpora written in the binary graph format:
+
+    - load all: the peak memory (tracemalloc) of load_graphs followed by the list of the translations
+    - streaming: the peak memory of translate_file to a JSONL file, which levels off as the corpus grows
+      (the decoded graphs are freed in batches by the garbage collector)
+    - graphs/s: throughput of translate_file without tracing
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_pipeline
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_translate_many import corpus
+from pylogos.batch import translate_many
+from pylogos.pipeline import translate_file
+from pylogos.query_graph.binary_format import load_graphs, write_graphs
+
+SIZES = [250, 1000, 4000]
+
+
+def peak_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main(workers=0, chunksize=64):
+    print(f"{'graphs':>7}{'load all (KiB)':>16}{'streaming (KiB)':>17}{'graphs/s':>10}{'peak in flight':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        graph_path = os.path.join(directory, "graphs.bin")
+        output_path = os.path.join(directory, "translations.jsonl")
+        for num_graphs in SIZES:
+            write_graphs(graph_path, corpus(num_graphs))
+            load_all_kib = peak_kib(
+                lambda: list(translate_many(load_graphs(graph_path), workers=workers, chunksize=chunksize))
+            )
+            streaming_kib = peak_kib(lambda: translate_file(graph_path, output_path, workers, chunksize))
+            start = time.perf_counter()
+            report = translate_file(graph_path, output_path, workers, chunksize)
+            rate = num_graphs / (time.perf_counter() - start)
+            print(f"{num_graphs:>7}{load_all_kib:>16.0f}{streaming_kib:>17.0f}{rate:>10.0f}{report.peak_in_flight:>16}")
+        print(f"peak RSS: {report.peak_rss_kib} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark for hashing of query graph nodes and edges.
+
+Measures the throughput of the hash-heavy hot paths of the translation:
+    - MRP: full translation of each test query graph
+    - get_one_hop_path_of: edge lookups for every node of the graph
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_query_graph_hash
+"""
+import timeit
+
+from pylogos.algorithm.MRP import MRP
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+)
+
+QUERIES = [
+    SPJ_query,
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_multisublink_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+]
+
+
+def bench_mrp(query_graph, number):
+    query_subject = query_graph.query_subjects[0]
+    return timeit.timeit(lambda: MRP()(query_subject, None, None, query_graph), number=number)
+
+
+def bench_one_hop_path(query_graph, number):
+    nodes = list(query_graph.nodes)
+
+    def run():
+        for node in nodes:
+            query_graph.get_one_hop_path_of(node)
+
+    return timeit.timeit(run, number=number)
+
+
+def main(number=200):
+    print(f"{'query':<35}{'MRP (calls/s)':>16}{'one-hop (graphs/s)':>22}")
+    for query_cls in QUERIES:
+        query_graph = query_cls().simplified_graph
+        mrp_time = bench_mrp(query_graph, number)
+        one_hop_time = bench_one_hop_path(query_graph, number * 10)
+        print(f"{query_cls.__name__:<35}{number / mrp_time:>16.1f}{number * 10 / one_hop_time:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
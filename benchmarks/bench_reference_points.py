@@ -0,0 +1,40 @@
+"""Scaling benchmark for the reference point analysis of Query_graph.
+
+Compares the single-pass classifier (Query_graph.reference_points) with the original
+condition-by-condition implementation on synthetic chain and star graphs.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_reference_points
+"""
+import timeit
+
+from tests.test_koutrika_et_al_2010.test_query_graph import legacy_reference_points
+from tests.test_koutrika_et_al_2010.utils import chain_query_graph, star_query_graph
+
+SIZES = [10, 20, 40, 80, 160, 320]
+# The legacy implementation runs a BFS per pair of relations, so keep it to small graphs
+MAX_LEGACY_SIZE = 160
+
+
+def bench(query_graph, compute, number):
+    def run():
+        # Measure a cold analysis every time
+        query_graph.invalidate_analysis_cache()
+        compute(query_graph)
+
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def main(number=5):
+    print(f"{'graph':<8}{'relations':>10}{'nodes':>8}{'single-pass (ms)':>18}{'legacy (ms)':>14}")
+    for name, build in [("chain", chain_query_graph), ("star", star_query_graph)]:
+        for size in SIZES:
+            query_graph = build(size)
+            new_time = bench(query_graph, lambda g: g.reference_points, number)
+            legacy_time = bench(query_graph, legacy_reference_points, number) if size <= MAX_LEGACY_SIZE else None
+            legacy_str = f"{legacy_time * 1000:.2f}" if legacy_time is not None else "-"
+            print(f"{name:<8}{size:>10}{len(query_graph):>8}{new_time * 1000:>18.2f}{legacy_str:>14}")
+
+
+if __name__ == "__main__":
+    main()
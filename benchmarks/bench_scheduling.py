@@ -0,0 +1,58 @@
+"""Cost-aware scheduling (translate_batch) against chunks in input order (translate_many) on a skewed batch.
+
+The batch is mostly small example graphs, with a few deeply nested queries and long join chains at its end, so
+that the chunks in input order leave one worker with the heavy graphs while the others are idle.
+
+    - accuracy: correlation between estimate_cost and the measured translation time of the graphs
+    - seconds: wall-clock time of the batch
+    - utilization: fraction of the batch every worker spent translating (translate_batch only)
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_scheduling
+"""
+import os
+import pickle
+import time
+
+import numpy as np
+
+from benchmarks.bench_translate_many import corpus
+from pylogos.batch import estimate_cost, translate_batch, translate_many
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import chain_query_graph, nested_query_graph
+
+
+def skewed_batch(num_graphs):
+    heavy = [nested_query_graph(40 + 5 * i) for i in range(4)] + [chain_query_graph(60 + 10 * i) for i in range(4)]
+    return corpus(num_graphs - len(heavy)) + heavy
+
+
+def cost_accuracy(graphs):
+    estimates, seconds = [], []
+    for query_graph in graphs:
+        data = pickle.dumps(query_graph)
+        start = time.perf_counter()
+        translate(pickle.loads(data))
+        seconds.append(time.perf_counter() - start)
+        estimates.append(estimate_cost(query_graph))
+    return np.corrcoef(estimates, seconds)[0, 1]
+
+
+def main(num_graphs=1000, chunksize=64):
+    workers = max(os.cpu_count() or 1, 2)
+    graphs = skewed_batch(num_graphs)
+    print(f"{num_graphs} graphs, {workers} workers, {os.cpu_count()} cores")
+    print(f"accuracy: {cost_accuracy(graphs[::10] + graphs[-8:]):.3f}")
+
+    start = time.perf_counter()
+    for _ in translate_many(graphs, workers=workers, chunksize=chunksize, cache_size=0):
+        pass
+    print(f"{'translate_many':<16}{time.perf_counter() - start:>8.2f} s")
+
+    _, report = translate_batch(graphs, workers=workers, cache_size=0)
+    utilization = " ".join(f"{value:.2f}" for value in sorted(report.utilization.values(), reverse=True))
+    print(f"{'translate_batch':<16}{report.seconds:>8.2f} s, {report.tasks} tasks, utilization {utilization}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Scaling of translate_many with the number of worker processes.
+
+The example graphs of the repository are replicated (as distinct copies) to a large corpus, which is
+translated without translation cache, so that every graph costs a full MRP translation.
+
+    - graphs/s: translations per second, including the transfer of the graphs to the workers
+    - speedup: graphs/s over the graphs/s of one worker
+    - efficiency: speedup over the number of workers
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_translate_many
+"""
+import os
+import pickle
+import time
+
+from pylogos.batch import TranslationError, translate_many
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+    chain_query_graph,
+)
+
+
+def corpus(num_graphs):
+    examples = [
+        query().simplified_graph
+        for query in [
+            SPJ_query,
+            GroupBy_query,
+            Nested_with_correlation_query,
+            Nested_with_multisublink_query,
+            Nested_with_groupby_query,
+            Nested_with_multilevel_query,
+        ]
+    ] + [chain_query_graph(10)]
+    data = [pickle.dumps(query_graph) for query_graph in examples]
+    return [pickle.loads(data[idx % len(data)]) for idx in range(num_graphs)]
+
+
+def worker_counts():
+    counts, workers = [], 1
+    while workers < (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main(num_graphs=10_000, chunksize=64):
+    graphs = corpus(num_graphs)
+    print(f"{num_graphs} graphs, {os.cpu_count()} cores")
+    print(f"{'workers':>8}{'graphs/s':>11}{'speedup':>9}{'efficiency':>12}{'errors':>8}")
+    base_rate = None
+    for workers in [0] + worker_counts():
+        start = time.perf_counter()
+        errors = sum(
+            1
+            for result in translate_many(graphs, workers=workers, chunksize=chunksize, cache_size=0)
+            if isinstance(result, TranslationError)
+        )
+        rate = num_graphs / (time.perf_counter() - start)
+        if workers == 0:
+            print(f"{'inline':>8}{rate:>11.0f}{'-':>9}{'-':>12}{errors:>8}")
+            continue
+        base_rate = rate if base_rate is None else base_rate
+        speedup = rate / base_rate
+        print(f"{workers:>8}{rate:>11.0f}{speedup:>8.2f}x{speedup / workers:>12.2f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
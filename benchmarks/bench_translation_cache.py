@@ -0,0 +1,70 @@
+"""translate() latency with and without a TranslationCache, on fresh graphs that only differ in their constants.
+
+    - translate: MRP on every graph
+    - cache hit: shape key of the graph and rendering of the cached sentence template
+    - cache miss: MRP with placeholders and compilation of the template (the first graph of every shape)
+    - bulk: render_bindings over a NumPy structured array of bindings, in sentences per second
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.bench_translation_cache
+"""
+import pickle
+import time
+import timeit
+
+import numpy as np
+
+from pylogos.translate import translate
+from pylogos.translation_cache import TranslationCache, render_bindings, value_nodes
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_multilevel_query,
+    SPJ_query,
+    chain_query_graph,
+)
+
+GRAPHS = [
+    ("SPJ_query", lambda: SPJ_query().simplified_graph),
+    ("GroupBy_query", lambda: GroupBy_query().simplified_graph),
+    ("Nested_with_multilevel_query", lambda: Nested_with_multilevel_query().simplified_graph),
+    ("chain_query_graph(30)", lambda: chain_query_graph(30)),
+]
+
+
+def latency_ms(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1000
+
+
+def main(number=50):
+    print(f"{'graph':<32}{'translate':>11}{'cache hit':>11}{'cache miss':>12}{'speedup':>9}  (ms)")
+    for name, build in GRAPHS:
+        data = pickle.dumps(build())
+        # Copies, as the analyses of a graph are cached by the graph itself
+        graphs = [pickle.loads(data) for _ in range(6 * number)]
+        translate_ms = latency_ms(lambda: translate(graphs.pop()), number)
+        cache = TranslationCache()
+        cache.translate(pickle.loads(data))
+        hit_ms = latency_ms(lambda: cache.translate(graphs.pop()), number)
+        miss_ms = latency_ms(lambda: TranslationCache().translate(pickle.loads(data)), number) - latency_ms(
+            lambda: pickle.loads(data), number
+        )
+        print(f"{name:<32}{translate_ms:>11.3f}{hit_ms:>11.3f}{miss_ms:>12.3f}{translate_ms / hit_ms:>8.1f}x")
+
+    print(f"\n{'graph':<32}{'values':>8}{'sentences/s':>14}{'with mapping':>14}")
+    for name, build in GRAPHS:
+        query_graph = build()
+        num_values = len(value_nodes(query_graph))
+        bindings = np.zeros(100_000, dtype=[(f"v{idx}", "i8") for idx in range(num_values)])
+        for idx in range(num_values):
+            bindings[f"v{idx}"] = np.arange(len(bindings)) + idx
+        rates = []
+        for with_mapping in [False, True]:
+            start = time.perf_counter()
+            for _ in render_bindings(query_graph, bindings, with_mapping=with_mapping):
+                pass
+            rates.append(len(bindings) / (time.perf_counter() - start))
+        print(f"{name:<32}{num_values:>8}{rates[0]:>14.0f}{rates[1]:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
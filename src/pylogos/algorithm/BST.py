@@ -1,4 +1,5 @@
 from pylogos.query_graph.koutrika_query_graph import Value, Selection, Membership
+from pylogos.query_graph.label_overlay import LabelOverlay
 
 VAL_SEL = " whose "
 CONJ_SEL = " and "
@@ -6,8 +7,8 @@ COORD_CONJ = " and "
 CONJ_NOUN = " that "
 CONJ_PROJ = ", "
 
-def label(item):
-    return item.label
+def label(item, label_overlay=None):
+    return item.label if label_overlay is None else label_overlay.label(item)
     # if issubclass(type(item), Node):
     #     return item.label
     # else:
@@ -19,8 +20,9 @@ def label(item):
     #         return " is "
     #     return type(item).__name__
 
-def modify_label(item, value):
-    item.label += value
+def modify_label(label_overlay, item, value):
+    # The nodes are shared by all translations: rewrite the label in the overlay of this one
+    label_overlay.add_suffix(item, value)
 
 
 class BST():
@@ -38,9 +40,11 @@ class BST():
     """
     def __init__(self):
         self.do_resolve_common_expressions = True
+        self.label_overlay = LabelOverlay()
 
     def __call__(self, *args, **kwargs):
         # self, args = args[0], args[1:]
+        self.label_overlay = LabelOverlay()
         pStr, fStr, wStr = self._call(*args, **kwargs)
         return f"Find {pStr} for{fStr}. Return results only for {wStr}.".replace("  ", " ")
 
@@ -51,7 +55,7 @@ class BST():
         close.append(v)
 
         # Add description for join conditions
-        if (v not in g.secondary_relations): fStr += f" {label(v)}"
+        if (v not in g.secondary_relations): fStr += f" {label(v, self.label_overlay)}"
 
         # Add description for groupby clause
         
@@ -64,39 +68,39 @@ class BST():
             for next_src, next_edge, next_dst in g.get_one_hop_path_of(dst):
                 if src == next_dst: continue # Missing in the algorithm of the paper
                 if type(next_dst) == Value:
-                    str = label(v) + VAL_SEL + label(dst) + ' ' + label(next_edge) + ' ' + label(next_dst) + ' '
+                    str = label(v, self.label_overlay) + VAL_SEL + label(dst, self.label_overlay) + ' ' + label(next_edge, self.label_overlay) + ' ' + label(next_dst, self.label_overlay) + ' '
                     wStr = self._make_lbl(wStr, str, CONJ_SEL)
                 elif dst not in close:
                     if dst not in children:
                         if type(edge) == Selection:
                             sel_edges += 1
                         children.append(dst)
-                        fStr = f" {fStr} that {label(edge)}"
+                        fStr = f" {fStr} that {label(edge, self.label_overlay)}"
 
         # Modify labels for recursion
         while children:
             tv = children.pop()
             # sel_edges -= 1
             # if (sel_edges > 0):
-            #     modify_label(tv, COORD_CONJ)
+            #     modify_label(self.label_overlay, tv, COORD_CONJ)
             # elif (sel_edges == 0):
-            #     modify_label(tv, CONJ_NOUN)
+            #     modify_label(self.label_overlay, tv, CONJ_NOUN)
             open.append(tv)
 
         # Add description for projection
         for src, dst in g.in_edges(v):
             edge = g.edges[src, dst]['data']
             if type(edge) == Membership:
-                children.append((label(src), label(edge)))
+                children.append((label(src, self.label_overlay), label(edge, self.label_overlay)))
         tmp_str = ''
         if children and self.do_resolve_common_expressions:
             # My modification of the algorithm to apply resolve_common_expressions written in the paper
-            tmp_str = self._resolve_common_expressions(children, label(v))
+            tmp_str = self._resolve_common_expressions(children, label(v, self.label_overlay))
             print(f"{v.name}: {tmp_str}")
         else:
             while children:
                 x, y = children.pop()
-                tmp_str += " the " + x + " " + y + " " + label(v)
+                tmp_str += " the " + x + " " + y + " " + label(v, self.label_overlay)
                 if len(children) != 1:
                     tmp_str += ", "
         if tmp_str:
@@ -1,6 +1,10 @@
+import threading
+from collections import deque, namedtuple
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Mapping, Optional, Set, Tuple
+
 import networkx as nx
 
-from pylogos.algorithm.string_builder import StringBuilder
+from pylogos.algorithm.string_builder import SStrSen, StringBuilder
 from pylogos.query_graph.koutrika_query_graph import (
     Attribute,
     Function,
@@ -11,14 +15,22 @@ from pylogos.query_graph.koutrika_query_graph import (
     Order,
     Predicate,
     Query_graph,
+    QueryGraphAnalysis,
     Relation,
     Selection,
     Transformation,
     Value,
+    stable_hash,
 )
+from pylogos.query_graph.label_overlay import LabelOverlay
+
+if TYPE_CHECKING:
+    from pylogos.translation_cache import TranslationCache
 
 IS_DEBUG = True
 
+TranslationStats = namedtuple("TranslationStats", ["translations", "nested_hits", "nested_misses"])
+
 
 def debug_print(msg):
     if not IS_DEBUG:
@@ -26,27 +38,40 @@ def debug_print(msg):
     print(msg)
 
 
-class MRP:
-    """
-    MULTIPLE_REFERENCE_POINTS algorithm
-    Input:
-        - current_node: node (the node being processed in each call)
-        - rp: node (reference point for v)
-        - parent_node: node (the parent node of v)
-        - query_graph: graph
-        - open: list (nodes to be visited)
-        - close: list (nodes already visited)
-        - path: list (storing the edges between rp and v)
-        - cStr: clause
-    Output:
-        - cStr (clause)
+class MRPContext:
+    """Traversal state of one MRP call.
+
+    :param label_overlay: labels rewritten for this call (see LabelOverlay)
     """
 
-    def __init__(self):
+    __slots__ = (
+        "label_overlay",
+        "visited_nodes",
+        "group_by_nodes",
+        "order_by_nodes",
+        "having_clause",
+        "reference_points",
+        "nested_sentences",
+        "nested_hits",
+        "nested_misses",
+    )
+
+    def __init__(self, label_overlay: Optional[LabelOverlay] = None):
+        self.label_overlay = label_overlay
         self.visited_nodes = set()
         self.group_by_nodes = []
         self.order_by_nodes = []
         self.having_clause = []
+        # Reference points of the graph, as a set (filled by the first traversal)
+        self.reference_points: Optional[Set[Node]] = None
+        # Block key (see MRP._nested_block) -> sentence of the nested query and positions of the nodes it visits
+        self.nested_sentences: Dict[Hashable, Tuple[SStrSen, List[int]]] = {}
+        self.nested_hits = 0
+        self.nested_misses = 0
+
+    def apply(self, node):
+        """Return node as seen by this call, i.e., with the fields set in the label overlay"""
+        return node if self.label_overlay is None else self.label_overlay.apply(node)
 
     @property
     def has_group_by(self):
@@ -60,10 +85,91 @@ class MRP:
     def has_order_by(self):
         return len(self.order_by_nodes) > 0
 
+
+class _Traversal:
+    """Traversal of a query (or of a nested query) by MRP._run, with the string builder it appends to.
+
+    :param path: edges traversed since the last reference point
+    """
+
+    __slots__ = ("string_builder", "path", "pending", "active")
+
+    def __init__(self, path: deque):
+        self.string_builder = StringBuilder()
+        self.path = path
+        # (node, parent node, reference point) of the nodes left to visit, the next one last
+        self.pending = []
+        # Generator of the node being visited (see MRP._visit)
+        self.active = None
+
+
+class MRP:
+    """
+    MULTIPLE_REFERENCE_POINTS algorithm
+    Input:
+        - current_node: node (the node being processed in each call)
+        - rp: node (reference point for v)
+        - parent_node: node (the parent node of v)
+        - query_graph: graph
+        - open: list (nodes to be visited)
+        - close: list (nodes already visited)
+        - path: list (storing the edges between rp and v)
+        - cStr: clause
+    Output:
+        - cStr (clause)
+
+    The translator is reentrant: the state of a traversal lives in an MRPContext created for every call,
+    and the query graph is only read. An instance can thus be built once and shared by threads, along
+    with what it holds for all calls:
+
+    :param label_overlay: labels applied in every call (calls can pass their own overlay instead)
+    :param lexicon: descriptions of relations and attributes by entity name, used in place of their labels
+    :param cache: translation cache used by translate()
+
+    Within a call, nested queries that are described alike (same labels and structure, e.g., the same
+    sub-select in several sublinks) are described once. translation_stats() counts the hits and misses.
+    """
+
+    def __init__(
+        self,
+        label_overlay: Optional[LabelOverlay] = None,
+        lexicon: Optional[Mapping[str, str]] = None,
+        cache: Optional["TranslationCache"] = None,
+    ):
+        self.label_overlay = label_overlay
+        self.lexicon = dict(lexicon) if lexicon else {}
+        self.cache = cache
+        # Templates built with different lexicons must not be mixed in a shared cache
+        self.lexicon_key = stable_hash(repr(sorted(self.lexicon.items()))) if self.lexicon else 0
+        self._stats_lock = threading.Lock()
+        self._translations = 0
+        self._nested_hits = 0
+        self._nested_misses = 0
+
+    def translation_stats(self) -> TranslationStats:
+        """Return the number of sentences built by this translator, and the nested queries found in (and added to) the memo of their call"""
+        with self._stats_lock:
+            return TranslationStats(self._translations, self._nested_hits, self._nested_misses)
+
+    def new_context(self, query_graph: Query_graph, label_overlay: Optional[LabelOverlay] = None) -> MRPContext:
+        """Return the context of a call on query_graph, with the labels of the lexicon added to the overlay"""
+        label_overlay = self.label_overlay if label_overlay is None else label_overlay
+        if self.lexicon:
+            lexicon_overlay = LabelOverlay(label_overlay)
+            for node in query_graph.nodes:
+                if type(node) in (Relation, Attribute) and node.entity_name in self.lexicon:
+                    lexicon_overlay.set(node, label=self.lexicon[node.entity_name])
+            label_overlay = lexicon_overlay
+        return MRPContext(label_overlay)
+
+    def translate(self, query_graph: Query_graph) -> Tuple[str, List[Dict[str, Any]]]:
+        """Same as pylogos.translate.translate, with the lexicon and cache of this translator"""
+        if self.cache is not None:
+            return self.cache.translate(query_graph, translator=self)
+        return self(query_graph.query_subjects[0], None, None, query_graph)
+
     def __call__(self, *args, **kwargs) -> str:
-        string_builder = self._call(*args, **kwargs)
-        cStr = string_builder.construct_sentence()
-        cStr.add_prefix("Find ")
+        cStr = self.build_sentence(*args, **kwargs)
         # My logic
         # Add string for group by
         # if self.has_group_by:
@@ -79,6 +185,26 @@ class MRP:
 
         return str(cStr) + ".", cStr.get_sentence_mapping()
 
+    def build_sentence(
+        self,
+        current_node,
+        parent_node,
+        previous_reference_point,
+        query_graph,
+        self_path=None,
+        label_overlay: Optional[LabelOverlay] = None,
+    ) -> SStrSen:
+        """Same as __call__, but return the sentence object instead of its string and mapping"""
+        context = self.new_context(query_graph, label_overlay)
+        string_builder = self._call(current_node, parent_node, previous_reference_point, query_graph, self_path, context)
+        cStr = string_builder.construct_sentence()
+        cStr.add_prefix("Find ")
+        with self._stats_lock:
+            self._translations += 1
+            self._nested_hits += context.nested_hits
+            self._nested_misses += context.nested_misses
+        return cStr
+
     def _call(
         self,
         current_node,
@@ -86,14 +212,71 @@ class MRP:
         previous_reference_point,
         query_graph,
         self_path=None,
+        context: Optional[MRPContext] = None,
+    ) -> StringBuilder:
+        """Traverse the graph from current_node and return the string builder holding the descriptions"""
+        context = self.new_context(query_graph) if context is None else context
+        traversal = _Traversal(deque(self_path) if self_path else deque())
+        traversal.pending.append((current_node, parent_node, previous_reference_point))
+        return self._run(traversal, query_graph, context)
+
+    def _run(self, traversal: _Traversal, query_graph: Query_graph, context: MRPContext) -> StringBuilder:
+        """Run a traversal to completion with an explicit stack, so that the Python call depth stays flat.
+
+        Every node is visited by a generator (see _visit) that appends to the string builder of its traversal.
+        A nested query is described by a traversal of its own: the generator yields the relation to start it
+        from, and gets the sentence of the nested query back once the nested traversal is done.
+        """
+        traversals = [traversal]
+        if context.reference_points is None:
+            # Tested for every node: a set rather than the list of the graph
+            context.reference_points = set(query_graph.reference_points)
+        sent_value = None
+        while True:
+            traversal = traversals[-1]
+            if traversal.active is None:
+                if not traversal.pending:
+                    traversals.pop()
+                    if not traversals:
+                        return traversal.string_builder
+                    # Resume the step of the enclosing traversal that started this nested one
+                    sent_value = traversal.string_builder.construct_sentence()
+                    continue
+                node, parent_node, previous_reference_point = traversal.pending.pop()
+                traversal.active = self._visit(node, parent_node, previous_reference_point, query_graph, traversal, context)
+                sent_value = None
+            try:
+                nested_relation = traversal.active.send(sent_value)
+            except StopIteration as stop:
+                traversal.active = None
+                if stop.value:
+                    # Children are visited depth-first, last one first
+                    traversal.pending.extend(stop.value)
+                continue
+            sent_value = None
+            nested_traversal = _Traversal(deque())
+            nested_traversal.pending.append((nested_relation, None, None))
+            traversals.append(nested_traversal)
+
+    def _visit(
+        self,
+        current_node,
+        parent_node,
+        previous_reference_point,
+        query_graph,
+        traversal: _Traversal,
+        context: MRPContext,
     ):
-        self_path = [] if self_path == None else self_path
+        """Describe current_node (yielding the relations of nested queries) and return the children to visit"""
+        string_builder = traversal.string_builder
+        self_path = traversal.path
+        reference_points = context.reference_points
 
         def get_non_visited_outgoing_nodes(node: Node):
             return [
                 dst
                 for dst in query_graph.get_out_going_nodes(node)
-                if dst not in self.visited_nodes
+                if dst not in context.visited_nodes
             ]
 
         def get_next_non_visited_relation(node: Node):
@@ -113,36 +296,31 @@ class MRP:
             If the current node has no membership edges, we generate the description from the previous reference point to the current node
             """
             if has_membership:
-                dst_node, src_node = self_path.pop(-1)
+                dst_node, src_node = self_path.pop()
             else:
-                src_node, dst_node = self_path.pop(0)
+                src_node, dst_node = self_path.popleft()
             return (src_node, dst_node)
 
-        # Initialize the string builder
-        string_builder = StringBuilder()
-        opened = []
-
         # Set visited
         # debug_print(f"Current node: {current_node.name}")
-        self.visited_nodes.add(current_node)
+        context.visited_nodes.add(current_node)
 
         # Save the traversed path
         if parent_node:
-            assert query_graph.has_path(
+            # Parents are predecessors, whose edge spares a search of the reachability index
+            assert query_graph.has_edge(parent_node, current_node) or query_graph.has_path(
                 parent_node, current_node
             ), f"Current node {current_node} is not reachable from Parent node {parent_node}"
             self_path.append([parent_node, current_node])
 
         # Construct a description for the reference point
-        if current_node in query_graph.reference_points:
+        if current_node in reference_points:
             # Check if the current node has an membership edge
             has_membership = query_graph.has_membership_edge(current_node)
 
             if has_membership:
                 # Create a full description for the current node
-                string_builder.add(
-                    self.label_mv(query_graph, current_node, current_node)
-                )
+                yield from self._label_mv(query_graph, current_node, current_node, context, string_builder)
 
             # Create a description for traversed path
             while self_path:
@@ -157,46 +335,29 @@ class MRP:
                     reference_point_to_ground_to = (
                         current_node if has_membership else previous_reference_point
                     )
-                    string_builder.add(
-                        self.label_v(
-                            query_graph, reference_point_to_ground_to, dst_node
-                        )
-                    )
+                    yield from self._label_v(query_graph, reference_point_to_ground_to, dst_node, context, string_builder)
 
                 # Add the join condition description
                 string_builder.add_join_conditions(
-                    previous_reference_point,
-                    current_node,
+                    context.apply(previous_reference_point),
+                    context.apply(current_node),
                     edge_desc,
-                    dst_node,
+                    context.apply(dst_node),
                     has_membership,
                 )
 
         # State changing: New reference point
         next_referece_point = (
             current_node
-            if current_node in query_graph.reference_points
+            if current_node in reference_points
             else previous_reference_point
         )
 
-        # Propagate recursive call to next non-visited nodes
-        for dst in get_non_visited_outgoing_nodes(current_node):
-            if dst not in self.visited_nodes:
-                opened.append((dst, current_node, next_referece_point))
-
-        while opened:
-            pop_current_node, pop_parent_node, pop_referece_point = opened.pop(-1)
-            string_builder.add(
-                self._call(
-                    pop_current_node,
-                    pop_parent_node,
-                    pop_referece_point,
-                    query_graph,
-                    self_path,
-                )
-            )
-
-        return string_builder
+        # Propagate to next non-visited nodes
+        return [
+            (dst, current_node, next_referece_point)
+            for dst in get_non_visited_outgoing_nodes(current_node)
+        ]
 
     def label_edge(
         self, query_graph: Query_graph, src_node: Node, dst_node: Node
@@ -216,7 +377,7 @@ class MRP:
         return edge.label
 
     def label_mv(
-        self, query_graph: Query_graph, reference_point: Node, relation: Node
+        self, query_graph: Query_graph, reference_point: Node, relation: Node, context: Optional[MRPContext] = None
     ) -> StringBuilder:
         """This function returns text description of the projected and selection attributes of a relation
         :param node: node of a query graph
@@ -226,31 +387,13 @@ class MRP:
         :return: description of the projected attribute of the relation
         :rtype: str
         """
-        if type(relation) != Relation:
-            return StringBuilder()
-        assert (
-            type(relation) == Relation
-        ), f"Node must be a relation, but got {type(relation)}"
+        context = self.new_context(query_graph) if context is None else context
         string_builder = StringBuilder()
-
-        # Check if aggregation function is applied
-        # For all projected attributes of the relation
-        for attribute in query_graph.get_membership_nodes(relation):
-            # Check if any aggregation function is applied
-            function_node = query_graph.get_function_node_to(attribute)
-            agg_func_label = function_node.label if function_node else None
-            # Add projection info
-            string_builder.add_projection(relation, attribute, agg_func_label)
-            # Mark visited
-            self.visited_nodes.add(attribute)
-
-        # Get description for the selection conditions
-        string_builder.add(self.label_v(query_graph, reference_point, relation))
-
+        self._run_steps(self._label_mv(query_graph, reference_point, relation, context, string_builder), query_graph, context)
         return string_builder
 
     def label_v(
-        self, graph: Query_graph, reference_point: Node, relation: Node
+        self, graph: Query_graph, reference_point: Node, relation: Node, context: Optional[MRPContext] = None
     ) -> StringBuilder:
         """Return text description of node's where conditions
         :param graph: query graph
@@ -260,189 +403,305 @@ class MRP:
         :return: description of the where conditions of the node
         :rtype: str
         """
-        if type(relation) != Relation:
-            return StringBuilder()
-        assert (
-            type(relation) == Relation
-        ), f"Node must be a relation, but got {type(relation)}"
+        context = self.new_context(graph) if context is None else context
         string_builder = StringBuilder()
+        self._run_steps(self._label_v(graph, reference_point, relation, context, string_builder), graph, context)
+        return string_builder
 
-        for att in graph.get_out_going_nodes(relation):
-            out_edge_from_relation = graph.get_edge(relation, att)
-            # Check if the edge is selection
-            if type(out_edge_from_relation) == Selection:
-                for dst in graph.get_out_going_nodes(att):
-                    out_edge_from_att = graph.get_edge(att, dst)
-                    # Create a description if: Relation_node -> Selection_edge -> Attribute_node -> Predicate_edge
-                    if type(out_edge_from_att) == Predicate:
-                        # Mark visited nodes
-                        self.visited_nodes.add(att)
-                        self.visited_nodes.add(dst)
-                        if type(dst) == Value:
-                            string_builder.add_selection(
-                                reference_point, relation, att, out_edge_from_att, dst
-                            )
-                        elif type(dst) == Attribute:
-                            # Get parent relations
-                            associated_relations = list(
-                                filter(
-                                    lambda n: type(n) == Relation,
-                                    graph.get_out_going_nodes(dst),
-                                )
-                            )
-                            assert (
-                                len(associated_relations) == 1
-                            ), f"Unexpected number of parent relations, {len(associated_relations)} "
-                            associated_relation = associated_relations[0]
-                            # If the associated relation is already visited, there is a cycle in the query graph, which means correlated nested query
-                            if associated_relation in self.visited_nodes:
-                                dst_parent = (
-                                    reference_point
-                                    if reference_point.label
-                                    == associated_relation.label
-                                    else relation
-                                )
-                                string_builder.add_selection(
-                                    reference_point,
-                                    associated_relation,
-                                    att,
-                                    out_edge_from_att,
-                                    dst.label,
-                                    dst_parent,
-                                )
-                            else:
-                                nested_string_builder = self._call(
-                                    associated_relation, None, None, graph
-                                )
-                                value_str = nested_string_builder.construct_sentence()
-                                string_builder.add_selection(
-                                    reference_point,
-                                    relation,
-                                    att,
-                                    out_edge_from_att,
-                                    value_str,
-                                    None,
-                                )
-                        elif type(dst) == Function:
-                            # Get attribute
-                            node_list = [
-                                n
-                                for n in graph.get_out_going_nodes(dst)
-                                if type(n) == Attribute
-                            ]
-                            assert (
-                                len(node_list) == 1
-                            ), f"Unexpected number of attirbute, {len(node_list)} "
-                            next_att_node = node_list[0]
-                            # Get parent relations
-                            associated_relations = [
-                                n
-                                for n in graph.get_out_going_nodes(next_att_node)
-                                if type(n) == Relation
-                            ]
-                            assert (
-                                len(associated_relations) == 1
-                            ), f"Unexpected number of parent relations, {len(associated_relations)} "
-                            associated_relation = associated_relations[0]
-                            # If the associated relation is already visited, there is a cycle in the query graph, which means correlated nested query
-                            if associated_relation in self.visited_nodes:
-                                dst_parent = (
-                                    reference_point
-                                    if reference_point.label
-                                    == associated_relation.label
-                                    else relation
-                                )
-                                dst_label = f"{dst.label} {next_att_node}"
-                                string_builder.add_selection(
-                                    reference_point,
-                                    associated_relation,
-                                    att,
-                                    out_edge_from_att,
-                                    dst_label,
-                                    dst_parent,
-                                )
-                            else:
-                                nested_string_builder = self._call(
-                                    associated_relation, None, None, graph
-                                )
-                                value_str = nested_string_builder.construct_sentence()
-                                string_builder.add_selection(
-                                    reference_point,
-                                    associated_relation,
-                                    att,
-                                    out_edge_from_att,
-                                    value_str,
-                                    None,
-                                )
-
-            elif type(out_edge_from_relation) == Grouping:
-                # Initialize the state for traversing all grouping attributes
-                selected_node = att
-                selected_edge = out_edge_from_relation
-                # Get all attributes for grouping
-                while (
-                    type(selected_edge) == Grouping and type(selected_node) == Attribute
-                ):
-                    # Mark visited
-                    self.visited_nodes.add(selected_node)
-
-                    # Add the description for the grouping
-                    string_builder.add_grouping(
-                        reference_point, relation, selected_node
-                    )
+    def _run_steps(self, steps, query_graph: Query_graph, context: MRPContext) -> None:
+        """Run the steps of a description, describing the nested queries they yield"""
+        traversal = _Traversal(deque())
+        traversal.active = steps
+        self._run(traversal, query_graph, context)
+
+    def _nested_sentence(self, graph: Query_graph, relation: Node, entry: Node, context: MRPContext):
+        """Steps of the description of the nested query rooted at relation and reached through entry: yields relation
+        to describe it (see _run) unless a nested query with the same block key was described in this call, and
+        returns its sentence"""
+        block = self._nested_block(graph, relation, entry, context)
+        if block is None:
+            context.nested_misses += 1
+            return (yield relation)
+        key, nodes = block
+        memo = context.nested_sentences.get(key)
+        if memo is not None:
+            context.nested_hits += 1
+            sentence, visited_positions = memo
+            # Leave the same nodes visited as the description would
+            context.visited_nodes.update(nodes[position] for position in visited_positions)
+            return sentence
+        context.nested_misses += 1
+        num_visited_nodes = len(context.visited_nodes)
+        num_visited_in_block = sum(1 for node in nodes if node in context.visited_nodes)
+        sentence = yield relation
+        visited_positions = [position for position, node in enumerate(nodes) if node in context.visited_nodes]
+        # Only replayable if the description visited nothing but nodes of the block
+        if num_visited_nodes + len(visited_positions) - num_visited_in_block == len(context.visited_nodes):
+            context.nested_sentences[key] = (sentence, visited_positions)
+        return sentence
+
+    def _nested_block(
+        self, graph: Query_graph, relation: Node, entry: Node, context: MRPContext
+    ) -> Optional[Tuple[Hashable, List[Node]]]:
+        """Return the key and the nodes of the block of the nested query rooted at relation, or None if a node of
+        the block other than entry (the attribute or function of the sublink, which is always visited) is visited,
+        e.g., in a correlated query, in which case its description depends on the rest of the graph.
+
+        The block holds what the traversal of the nested query reads: the nodes reachable from relation, the attributes
+        projected by its relations and their aggregation functions. The key holds their types, labels, entity names,
+        whether they are reference points and the edges between them, so that two blocks with the same key are
+        described by the same sentence and visit the same nodes (by position in the block).
+        """
+        visited_nodes = context.visited_nodes
+        reference_points = context.reference_points
+        positions = {id(relation): 0}
+        nodes = [relation]
+        # Position of the first node of the block equal to each node, as equal nodes are one node to the visited set
+        first_equal_positions = {}
+        node_keys = []
+
+        def position_of(node: Node) -> int:
+            position = positions.get(id(node))
+            if position is None:
+                position = positions[id(node)] = len(nodes)
+                nodes.append(node)
+            return position
+
+        for position, node in enumerate(nodes):
+            if node in visited_nodes and node is not entry:
+                return None
+            links = [
+                (QueryGraphAnalysis._structural_edge_key(graph.get_edge(node, dst)), position_of(dst))
+                for dst in graph.get_out_going_nodes(node)
+            ]
+            if type(node) == Relation:
+                links += [("projects", position_of(attribute)) for attribute in graph.get_membership_nodes(node)]
+            elif type(node) == Attribute:
+                function_node = graph.get_function_node_to(node)
+                if function_node:
+                    links.append(("aggregated by", position_of(function_node)))
+            applied = context.apply(node)
+            node_keys.append(
+                (
+                    type(node).__name__,
+                    applied.label,
+                    applied.entity_name,
+                    node in reference_points,
+                    first_equal_positions.setdefault(node, position),
+                    tuple(links),
+                )
+            )
+        return tuple(node_keys), nodes
 
-                    # Get next node and stop if there is no next node
-                    next_nodes = graph.get_out_going_nodes(selected_node)
-                    assert (
-                        len(next_nodes) < 2
-                    ), f"Expected only one outgoing node connnected to grouping attribute, but found {len(next_nodes)} "
-                    if not next_nodes:
-                        break
+    def _label_mv(
+        self,
+        query_graph: Query_graph,
+        reference_point: Node,
+        relation: Node,
+        context: MRPContext,
+        string_builder: StringBuilder,
+    ):
+        """Steps of label_mv, appending to string_builder"""
+        if type(relation) != Relation:
+            return None
 
-                    # State change: to the next node
-                    next_node = next_nodes[0]
+        # Check if aggregation function is applied
+        # For all projected attributes of the relation
+        for attribute in query_graph.get_membership_nodes(relation):
+            # Check if any aggregation function is applied
+            function_node = query_graph.get_function_node_to(attribute)
+            agg_func_label = context.apply(function_node).label if function_node else None
+            # Add projection info
+            string_builder.add_projection(context.apply(relation), context.apply(attribute), agg_func_label)
+            # Mark visited
+            context.visited_nodes.add(attribute)
 
-                    # State change: to the next edge
-                    selected_edge = graph.get_edge(selected_node, next_node)
-                    selected_node = next_node
+        # Get description for the selection conditions
+        yield from self._label_v(query_graph, reference_point, relation, context, string_builder)
 
-            elif type(out_edge_from_relation) == Having:
-                # Get function node
-                function_node = graph.get_function_node_from(att)
-                assert (
-                    function_node
-                ), f"Having condition must be connected to function node, but found {function_node} "
+    def _label_v(
+        self,
+        graph: Query_graph,
+        reference_point: Node,
+        relation: Node,
+        context: MRPContext,
+        string_builder: StringBuilder,
+    ):
+        """Steps of label_v, appending to string_builder. Yields the relation of every nested query to describe,
+        and receives the sentence of the nested query"""
+        if type(relation) != Relation:
+            return None
+
+        # The string builder keeps selections, groupings and havings apart, so they can be described type by type
+        for att in graph.out_by_type(relation, Selection):
+            # Create a description if: Relation_node -> Selection_edge -> Attribute_node -> Predicate_edge
+            for dst in graph.out_by_type(att, Predicate):
+                out_edge_from_att = graph.get_edge(att, dst)
+                # Mark visited nodes
+                context.visited_nodes.add(att)
+                context.visited_nodes.add(dst)
+                if type(dst) == Value:
+                    string_builder.add_selection(
+                        context.apply(reference_point),
+                        context.apply(relation),
+                        context.apply(att),
+                        out_edge_from_att,
+                        context.apply(dst),
+                    )
+                elif type(dst) == Attribute:
+                    # Get parent relations
+                    associated_relations = list(
+                        filter(
+                            lambda n: type(n) == Relation,
+                            graph.get_out_going_nodes(dst),
+                        )
+                    )
+                    assert (
+                        len(associated_relations) == 1
+                    ), f"Unexpected number of parent relations, {len(associated_relations)} "
+                    associated_relation = associated_relations[0]
+                    # If the associated relation is already visited, there is a cycle in the query graph, which means correlated nested query
+                    if associated_relation in context.visited_nodes:
+                        dst_parent = (
+                            reference_point
+                            if context.apply(reference_point).label
+                            == context.apply(associated_relation).label
+                            else relation
+                        )
+                        string_builder.add_selection(
+                            context.apply(reference_point),
+                            context.apply(associated_relation),
+                            context.apply(att),
+                            out_edge_from_att,
+                            context.apply(dst).label,
+                            context.apply(dst_parent),
+                        )
+                    else:
+                        value_str = yield from self._nested_sentence(graph, associated_relation, dst, context)
+                        string_builder.add_selection(
+                            context.apply(reference_point),
+                            context.apply(relation),
+                            context.apply(att),
+                            out_edge_from_att,
+                            value_str,
+                            None,
+                        )
+                elif type(dst) == Function:
+                    # Get attribute
+                    node_list = [
+                        n
+                        for n in graph.get_out_going_nodes(dst)
+                        if type(n) == Attribute
+                    ]
+                    assert (
+                        len(node_list) == 1
+                    ), f"Unexpected number of attirbute, {len(node_list)} "
+                    next_att_node = node_list[0]
+                    # Get parent relations
+                    associated_relations = [
+                        n
+                        for n in graph.get_out_going_nodes(next_att_node)
+                        if type(n) == Relation
+                    ]
+                    assert (
+                        len(associated_relations) == 1
+                    ), f"Unexpected number of parent relations, {len(associated_relations)} "
+                    associated_relation = associated_relations[0]
+                    # If the associated relation is already visited, there is a cycle in the query graph, which means correlated nested query
+                    if associated_relation in context.visited_nodes:
+                        dst_parent = (
+                            reference_point
+                            if context.apply(reference_point).label
+                            == context.apply(associated_relation).label
+                            else relation
+                        )
+                        dst_label = f"{context.apply(dst).label} {context.apply(next_att_node)}"
+                        string_builder.add_selection(
+                            context.apply(reference_point),
+                            context.apply(associated_relation),
+                            context.apply(att),
+                            out_edge_from_att,
+                            dst_label,
+                            context.apply(dst_parent),
+                        )
+                    else:
+                        value_str = yield from self._nested_sentence(graph, associated_relation, dst, context)
+                        string_builder.add_selection(
+                            context.apply(reference_point),
+                            context.apply(associated_relation),
+                            context.apply(att),
+                            out_edge_from_att,
+                            value_str,
+                            None,
+                        )
 
-                # Get value node
-                out_nodes = graph.get_out_going_nodes(function_node)
-                assert (
-                    len(out_nodes) == 1
-                ), f"Having condition must be connected to only one node, but found {len(out_nodes)} "
-                assert (
-                    type(out_nodes[0]) == Value
-                ), f"Having condition must be connected to value node, but found {type(out_nodes[0])} "
-                value_node = out_nodes[0]
+        for att in graph.out_by_type(relation, Grouping):
+            # Initialize the state for traversing all grouping attributes
+            selected_node = att
+            # Get all attributes for grouping
+            while type(selected_node) == Attribute:
+                # Mark visited
+                context.visited_nodes.add(selected_node)
 
-                # Check edge type
-                out_edge = graph.get_edge(function_node, value_node)
+                # Add the description for the grouping
+                string_builder.add_grouping(
+                    context.apply(reference_point), context.apply(relation), context.apply(selected_node)
+                )
+
+                # Get next node and stop if there is no next node
+                next_nodes = graph.get_out_going_nodes(selected_node)
                 assert (
-                    type(out_edge) == Predicate
-                ), f"Having attribute must be connected to value node through Predicate edge, but found {type(out_edge)} "
+                    len(next_nodes) < 2
+                ), f"Expected only one outgoing node connnected to grouping attribute, but found {len(next_nodes)} "
+                if not next_nodes:
+                    break
+
+                # State change: to the next node, if it is connected through a grouping edge
+                next_grouping_nodes = graph.out_by_type(selected_node, Grouping)
+                selected_node = next_grouping_nodes[0] if next_grouping_nodes else None
+
+        for att in graph.out_by_type(relation, Having):
+            # Get function node
+            function_node = graph.get_function_node_from(att)
+            assert (
+                function_node
+            ), f"Having condition must be connected to function node, but found {function_node} "
 
-                # Mark visited
-                self.visited_nodes.add(function_node)
-                self.visited_nodes.add(value_node)
+            # Get value node
+            out_nodes = graph.get_out_going_nodes(function_node)
+            assert (
+                len(out_nodes) == 1
+            ), f"Having condition must be connected to only one node, but found {len(out_nodes)} "
+            assert (
+                type(out_nodes[0]) == Value
+            ), f"Having condition must be connected to value node, but found {type(out_nodes[0])} "
+            value_node = out_nodes[0]
 
-                # Append description for the having condition
-                string_builder.add_having(
-                    reference_point, relation, att, function_node, out_edge, value_node
-                )
+            # Check edge type
+            out_edge = graph.get_edge(function_node, value_node)
+            assert (
+                type(out_edge) == Predicate
+            ), f"Having attribute must be connected to value node through Predicate edge, but found {type(out_edge)} "
+
+            # Mark visited
+            context.visited_nodes.add(function_node)
+            context.visited_nodes.add(value_node)
+
+            # Append description for the having condition
+            string_builder.add_having(
+                context.apply(reference_point),
+                context.apply(relation),
+                context.apply(att),
+                context.apply(function_node),
+                out_edge,
+                context.apply(value_node),
+            )
 
         # Check if current node has attributes and values
-        return string_builder
+        return None
 
     def label_having(
-        self, graph: Query_graph, relation: Node, attribute: Node
+        self, graph: Query_graph, relation: Node, attribute: Node, context: MRPContext
     ) -> StringBuilder:
         """Return text description of node's having conditions
         :param graph: query graph
@@ -459,10 +718,10 @@ class MRP:
             for dst in graph.get_out_going_nodes(function_node):
                 edge = graph.get_edge(function_node, dst)
                 if type(edge) == Predicate and type(dst) == Value:
-                    self.visited_nodes.add(function_node)
-                    self.visited_nodes.add(dst)
+                    context.visited_nodes.add(function_node)
+                    context.visited_nodes.add(dst)
                     string_builder.add_having(
-                        relation, attribute, function_node, edge, dst
+                        context.apply(relation), context.apply(attribute), context.apply(function_node), edge, context.apply(dst)
                     )
 
         return string_builder
@@ -5,6 +5,7 @@ from enum import IntEnum
 from typing import List, Optional, Tuple, Union
 
 from pylogos.query_graph.koutrika_query_graph import Node, Predicate
+from pylogos.query_graph.slots import SlotsPickleMixin
 
 
 class OperationType(IntEnum):
@@ -20,7 +21,7 @@ def remove_number_in_string(string: str) -> str:
     return "".join([c for c in string if not c.isdigit()])
 
 
-class SStrChar:
+class SStrChar(SlotsPickleMixin):
     """This is an string object to keep track of the origin of the string.
     Here, the origin means which table or column the string is created to describe.
 
@@ -28,6 +29,8 @@ class SStrChar:
     :type str: _type_
     """
 
+    __slots__ = ("ori_label", "text", "table_node", "column_node", "op_type", "is_table")
+
     def __init__(
         self,
         text: str,
@@ -0,0 +1,111 @@
+"""Translation of query graphs from asyncio code, without blocking the event loop.
+
+translate_async runs translate() in an executor: the default thread pool of the loop, any thread pool, or a
+process pool (see process_executor), in which case the graph is sent to a worker process that translates it
+with its own translator. translate_many_async is the asynchronous counterpart of pylogos.batch.translate_many.
+
+Cancelling a coroutine waiting for a translation cancels the translation if it has not started yet; a
+translation that has started runs to completion in the executor and its result is dropped.
+"""
+import asyncio
+import functools
+import traceback
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Mapping, Optional, Union
+
+from pylogos import batch
+from pylogos.algorithm.MRP import MRP
+from pylogos.batch import Translation, TranslationError
+from pylogos.query_graph.koutrika_query_graph import Query_graph
+from pylogos.translate import translate
+
+if TYPE_CHECKING:
+    from pylogos.translation_cache import TranslationCache
+
+
+def process_executor(
+    workers: Optional[int] = None, lexicon: Optional[Mapping[str, str]] = None, cache_size: int = 1024
+) -> ProcessPoolExecutor:
+    """Return a process pool whose workers each keep a translator (MRP with lexicon) and a translation cache"""
+    return ProcessPoolExecutor(workers, initializer=batch._init_worker, initargs=(lexicon, cache_size))
+
+
+def _translate_in_worker(query_graph: Query_graph) -> Translation:
+    if batch._worker_translator is None:
+        # Pool not made by process_executor
+        return translate(query_graph)
+    return batch._worker_translator.translate(query_graph)
+
+
+def _executor_call(
+    query_graph: Query_graph,
+    executor: Optional[Executor],
+    cache: Optional["TranslationCache"],
+    translator: Optional[MRP],
+) -> "asyncio.Future[Translation]":
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        if cache is not None or translator is not None:
+            raise ValueError("cache and translator cannot be sent to a process pool, see process_executor")
+        return loop.run_in_executor(executor, _translate_in_worker, query_graph)
+    return loop.run_in_executor(executor, functools.partial(translate, query_graph, cache, translator))
+
+
+async def translate_async(
+    query_graph: Query_graph,
+    executor: Optional[Executor] = None,
+    cache: Optional["TranslationCache"] = None,
+    translator: Optional[MRP] = None,
+    limit: Optional[asyncio.Semaphore] = None,
+) -> Translation:
+    """Return translate(query_graph, cache, translator), computed in executor (default executor of the loop if None).
+
+    :param limit: semaphore shared by the callers to bound the number of translations in flight
+    """
+    if limit is None:
+        return await _executor_call(query_graph, executor, cache, translator)
+    async with limit:
+        return await _executor_call(query_graph, executor, cache, translator)
+
+
+async def translate_many_async(
+    graphs: Iterable[Query_graph],
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 8,
+    cache: Optional["TranslationCache"] = None,
+    translator: Optional[MRP] = None,
+) -> AsyncIterator[Union[Translation, TranslationError]]:
+    """Yield translate(graph) for every graph, in order, or a TranslationError for the graphs that fail.
+
+    At most max_in_flight graphs are taken from graphs and not yet yielded. Closing the generator (or cancelling
+    the task iterating over it) cancels the translations not started yet.
+    """
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be positive, got {max_in_flight}")
+    pending = deque()
+    try:
+        for index, query_graph in enumerate(graphs):
+            pending.append((index, _executor_call(query_graph, executor, cache, translator)))
+            if len(pending) >= max_in_flight:
+                yield await _next_result(pending)
+        while pending:
+            yield await _next_result(pending)
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+async def _next_result(pending: deque) -> Union[Translation, TranslationError]:
+    # The future stays in pending while awaited, so that it is cancelled with the others
+    index, future = pending[0]
+    try:
+        result = await future
+    except asyncio.CancelledError:
+        # Subclass of Exception before Python 3.8
+        raise
+    except Exception as error:
+        formatted = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        result = TranslationError(index, type(error).__name__, str(error), formatted)
+    pending.popleft()
+    return result
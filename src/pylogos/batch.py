@@ -0,0 +1,296 @@
+"""Translation of many query graphs over a pool of worker processes.
+
+translate_many sends the graphs to the workers in chunks and yields the translations in the order of
+the graphs, while only a bounded number of chunks are in flight: the graphs are read from the input as
+the workers need them, so the input can be a generator over a corpus larger than memory. A graph that
+fails to translate yields a TranslationError record instead of aborting the batch.
+
+translate_batch instead takes a whole batch, and sends the graphs to the workers from the most to the least
+expensive (see estimate_cost), the expensive graphs one at a time and the cheap ones in small groups: a worker
+takes the next task as soon as it is done with its previous one, so no worker is left with a chunk of heavy
+graphs while the others are idle.
+"""
+import os
+import time
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.query_graph.koutrika_query_graph import Attribute, Function, Membership, Predicate, Query_graph, Relation
+from pylogos.translation_cache import TranslationCache
+
+# Failure of the translation of the graph at position index of the input
+TranslationError = namedtuple("TranslationError", ["index", "error_type", "message", "traceback"])
+
+Translation = Tuple[str, List[Dict[str, Any]]]
+
+# Cheap size statistics of a query graph, from which estimate_cost predicts its translation time
+GraphStatistics = namedtuple("GraphStatistics", ["nodes", "edges", "relations", "sublinks", "nesting_depth"])
+
+# Run of translate_batch: wall-clock seconds, number of tasks, and the seconds spent translating and the fraction of
+# the run it represents, for every worker (by process id) that ran a task
+BatchReport = namedtuple("BatchReport", ["seconds", "tasks", "busy_seconds", "utilization"])
+
+# Translator and cache of the current (worker) process, set once by _init_worker
+_worker_translator: Optional[MRP] = None
+
+
+def _inner_relations(query_graph: Query_graph, node) -> Tuple[Relation, ...]:
+    """Relations of the nested query whose projected attribute (or aggregate of it) is node"""
+    if type(node) == Function:
+        return tuple(
+            relation
+            for attribute in query_graph.get_out_going_nodes(node)
+            if type(attribute) == Attribute
+            for relation in query_graph.out_by_type(attribute, Membership)
+        )
+    return query_graph.out_by_type(node, Membership) if type(node) == Attribute else ()
+
+
+def _outer_relations(query_graph: Query_graph, node) -> List[Relation]:
+    """Relations from which node is reached through attributes and functions only"""
+    relations, seen, stack = [], {node}, [node]
+    while stack:
+        for src in query_graph.get_incoming_nodes(stack.pop()):
+            if src in seen:
+                continue
+            seen.add(src)
+            if type(src) == Relation:
+                relations.append(src)
+            else:
+                stack.append(src)
+    return relations
+
+
+def graph_statistics(query_graph: Query_graph) -> GraphStatistics:
+    """Count the nodes, edges, relations and sublinks (predicates comparing to a nested query) of query_graph,
+    and the nesting depth: the largest number of sublinks on a path from the outermost query"""
+    inner_queries = {}
+    sublinks = 0
+    for src, dst, edge in query_graph.edges(data="data"):
+        if type(edge) != Predicate:
+            continue
+        inner_relations = _inner_relations(query_graph, dst)
+        if not inner_relations:
+            continue
+        sublinks += 1
+        for outer_relation in _outer_relations(query_graph, src):
+            inner_queries.setdefault(outer_relation, set()).update(inner_relations)
+    # Longest path in the graph of sublinks between relations, without recursion; an edge back to a relation on the
+    # current path (correlation) does not add to the depth
+    depth = {}
+    for root in inner_queries:
+        if root in depth:
+            continue
+        on_path, stack = {root}, [(root, iter(inner_queries[root]))]
+        while stack:
+            relation, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_path.discard(relation)
+                depth[relation] = max(
+                    (depth.get(inner, 0) + 1 for inner in inner_queries[relation] if inner not in on_path), default=0
+                )
+            elif child not in depth and child not in on_path and child in inner_queries:
+                on_path.add(child)
+                stack.append((child, iter(inner_queries[child])))
+    return GraphStatistics(
+        nodes=query_graph.number_of_nodes(),
+        edges=query_graph.number_of_edges(),
+        relations=len(query_graph.relations),
+        sublinks=sublinks,
+        nesting_depth=max(depth.values(), default=0),
+    )
+
+
+def estimate_cost(query_graph: Query_graph) -> float:
+    """Estimate the time to translate query_graph, in arbitrary units (about a millisecond), from graph_statistics.
+
+    Building the sentence is quadratic in the size of the graph, and every level of nesting builds the sentence
+    of its nested query again. The weights were fitted on chains, stars and nested queries of up to 800 nodes
+    and edges; the number of sublinks added nothing once the nesting depth is known.
+    """
+    statistics = graph_statistics(query_graph)
+    size = statistics.nodes + statistics.edges
+    return 1.0 + size * (0.08 + 0.0007 * size + 0.012 * statistics.nesting_depth)
+
+
+def _new_translator(lexicon: Optional[Mapping[str, str]], cache_size: int) -> MRP:
+    return MRP(lexicon=lexicon, cache=TranslationCache(maxsize=cache_size) if cache_size else None)
+
+
+def _init_worker(lexicon: Optional[Mapping[str, str]], cache_size: int) -> None:
+    global _worker_translator
+    _worker_translator = _new_translator(lexicon, cache_size)
+
+
+def _translate_chunk(
+    start: int, graphs: Sequence[Query_graph], translator: Optional[MRP] = None
+) -> List[Union[Translation, TranslationError]]:
+    """Translate graphs, the first of which is at position start of the input, with the translator of the worker by default"""
+    translator = _worker_translator if translator is None else translator
+    return [_translate_one(index, query_graph, translator) for index, query_graph in enumerate(graphs, start=start)]
+
+
+def _translate_one(index: int, query_graph: Query_graph, translator: MRP) -> Union[Translation, TranslationError]:
+    try:
+        return translator.translate(query_graph)
+    except Exception as error:
+        return TranslationError(index, type(error).__name__, str(error), traceback.format_exc())
+
+
+def _translate_task(
+    indices: Sequence[int], graphs: Sequence[Query_graph], translator: Optional[MRP] = None
+) -> Tuple[int, float, List[Union[Translation, TranslationError]]]:
+    """Translate graphs, at the given positions of the input, and return the process id and the time it took"""
+    translator = _worker_translator if translator is None else translator
+    start = time.perf_counter()
+    results = [_translate_one(index, query_graph, translator) for index, query_graph in zip(indices, graphs)]
+    return os.getpid(), time.perf_counter() - start, results
+
+
+def _chunks(graphs: Iterable[Query_graph], chunksize: int) -> Iterator[Tuple[int, List[Query_graph]]]:
+    iterator = iter(graphs)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return None
+        yield start, chunk
+        start += len(chunk)
+
+
+def translate_many(
+    graphs: Iterable[Query_graph],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    lexicon: Optional[Mapping[str, str]] = None,
+    cache_size: int = 1024,
+    max_pending_chunks: Optional[int] = None,
+) -> Iterator[Union[Translation, TranslationError]]:
+    """Yield translate(graph) for every graph, in order, or a TranslationError for the graphs that fail.
+
+    Every worker builds its translator (MRP with the given lexicon) and translation cache once, and keeps
+    them for all its chunks.
+
+    :param workers: number of worker processes (os.cpu_count() by default). With 0, the graphs are translated
+        in the calling process
+    :param chunksize: number of graphs sent to a worker at once
+    :param lexicon: lexicon of the translators (see MRP)
+    :param cache_size: maximum number of templates in the translation cache of every worker (0 for no cache)
+    :param max_pending_chunks: maximum number of chunks sent and not yet yielded (twice the number of workers by default)
+    """
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be positive, got {chunksize}")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 0:
+        raise ValueError(f"workers must be non-negative, got {workers}")
+    max_pending_chunks = 2 * workers if max_pending_chunks is None else max_pending_chunks
+    # Checked here rather than when the first result is requested
+    return _translate_many(graphs, workers, chunksize, lexicon, cache_size, max_pending_chunks)
+
+
+def _translate_many(
+    graphs: Iterable[Query_graph],
+    workers: int,
+    chunksize: int,
+    lexicon: Optional[Mapping[str, str]],
+    cache_size: int,
+    max_pending_chunks: int,
+) -> Iterator[Union[Translation, TranslationError]]:
+    if workers == 0:
+        translator = _new_translator(lexicon, cache_size)
+        for start, chunk in _chunks(graphs, chunksize):
+            yield from _translate_chunk(start, chunk, translator)
+        return None
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(lexicon, cache_size))
+    pending = deque()
+    try:
+        for start, chunk in _chunks(graphs, chunksize):
+            pending.append(executor.submit(_translate_chunk, start, chunk))
+            if len(pending) >= max_pending_chunks:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # Also reached when the caller stops early: drop the chunks not started yet
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _tasks(costs: Sequence[float], max_task_cost: float) -> List[List[int]]:
+    """Group the positions of the graphs, from the most to the least expensive, into tasks of at most max_task_cost
+    (or of a single graph)"""
+    tasks, task_cost = [], 0.0
+    for index in sorted(range(len(costs)), key=costs.__getitem__, reverse=True):
+        if not tasks or task_cost + costs[index] > max_task_cost:
+            tasks.append([])
+            task_cost = 0.0
+        tasks[-1].append(index)
+        task_cost += costs[index]
+    return tasks
+
+
+def _collect(done: Iterable, results: List, busy_seconds: Dict[int, float]) -> None:
+    """Put the results of the (task, _translate_task(task, ...)) pairs in done at their positions in results"""
+    for task, (pid, busy, task_results) in done:
+        busy_seconds[pid] = busy_seconds.get(pid, 0.0) + busy
+        for index, result in zip(task, task_results):
+            results[index] = result
+
+
+def translate_batch(
+    graphs: Iterable[Query_graph],
+    workers: Optional[int] = None,
+    lexicon: Optional[Mapping[str, str]] = None,
+    cache_size: int = 1024,
+    cost: Callable[[Query_graph], float] = estimate_cost,
+    tasks_per_worker: int = 8,
+) -> Tuple[List[Union[Translation, TranslationError]], BatchReport]:
+    """Return [translate(graph) for graph in graphs] (with TranslationError records for the graphs that fail) and
+    a BatchReport, translating the most expensive graphs first.
+
+    Unlike translate_many, the whole batch is read and held in memory, to be ordered by cost.
+
+    :param workers: number of worker processes (os.cpu_count() by default). With 0, the graphs are translated
+        in the calling process
+    :param cost: estimate of the translation time of a graph
+    :param tasks_per_worker: the cheap graphs are grouped into tasks of at most the total cost over workers
+        times tasks_per_worker
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 0:
+        raise ValueError(f"workers must be non-negative, got {workers}")
+    if tasks_per_worker < 1:
+        raise ValueError(f"tasks_per_worker must be positive, got {tasks_per_worker}")
+    graphs = list(graphs)
+    costs = [cost(query_graph) for query_graph in graphs]
+    if any(graph_cost < 0 for graph_cost in costs):
+        raise ValueError(f"costs must be non-negative, got {min(costs)}")
+    if not any(costs):
+        # No estimate to go by: balance the number of graphs
+        costs = [1.0] * len(graphs)
+    tasks = _tasks(costs, sum(costs) / (max(workers, 1) * tasks_per_worker))
+    results: List[Union[Translation, TranslationError, None]] = [None] * len(graphs)
+    busy_seconds: Dict[int, float] = {}
+    start = time.perf_counter()
+    if workers == 0:
+        translator = _new_translator(lexicon, cache_size)
+        done = ((task, _translate_task(task, [graphs[index] for index in task], translator)) for task in tasks)
+        _collect(done, results, busy_seconds)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(lexicon, cache_size)) as executor:
+            # The pool hands the tasks to the workers in this order, each as soon as a worker is free
+            futures = {
+                executor.submit(_translate_task, task, [graphs[index] for index in task]): task for task in tasks
+            }
+            _collect(((futures[future], future.result()) for future in as_completed(futures)), results, busy_seconds)
+    seconds = time.perf_counter() - start
+    utilization = {pid: busy / seconds if seconds else 0.0 for pid, busy in busy_seconds.items()}
+    return results, BatchReport(seconds, len(tasks), busy_seconds, utilization)
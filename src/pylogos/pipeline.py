@@ -0,0 +1,114 @@
+"""Streaming translation of a graph file (see pylogos.query_graph.binary_format) into a JSONL file.
+
+The pipeline is a chain of generators: the graphs are decoded one at a time from the memory-mapped
+file, translated by translate_many (which keeps a bounded number of chunks in flight) and written as
+soon as their translation comes back. Neither the corpus nor the outputs are ever held in memory, so
+the memory use of a run does not depend on the size of the corpus.
+
+Every line of the output is a JSON object: {"id": ..., "sentence": ..., "mapping": ...} where id is
+the position of the graph in the file, or {"id": ..., "error": {"type": ..., "message": ...}} for
+the graphs that failed to translate.
+"""
+import json
+import time
+from collections import namedtuple
+from typing import Iterable, Iterator, Mapping, Optional, TextIO, Union
+
+from pylogos.batch import TranslationError, translate_many
+from pylogos.query_graph.binary_format import iter_graphs
+from pylogos.query_graph.koutrika_query_graph import Query_graph
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+PipelineReport = namedtuple(
+    "PipelineReport",
+    ["graphs", "errors", "seconds", "graphs_per_second", "peak_in_flight", "peak_rss_kib", "peak_worker_rss_kib"],
+)
+PipelineReport.__doc__ = """Summary of a run of translate_file.
+
+peak_in_flight is the largest number of graphs read from the file and not yet written. The peak resident
+set sizes are high-water marks of the whole calling process, and of the largest worker process (None
+when not measured)."""
+
+
+def _peak_rss_kib(who) -> Optional[int]:
+    if resource is None:
+        return None
+    # In KiB on Linux
+    return resource.getrusage(who).ru_maxrss
+
+
+def translation_record(index: int, result) -> str:
+    """Return the JSONL line (without newline) of the result of translate_many for the graph at position index"""
+    if isinstance(result, TranslationError):
+        return json.dumps({"id": index, "error": {"type": result.error_type, "message": result.message}})
+    sentence, mapping = result
+    return json.dumps({"id": index, "sentence": sentence, "mapping": mapping})
+
+
+class _Counter:
+    """Wraps an iterable and counts the items taken from it"""
+
+    def __init__(self, iterable: Iterable):
+        self.iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self) -> Iterator:
+        for item in self.iterator:
+            self.count += 1
+            yield item
+
+
+def translate_file(
+    graph_path: str,
+    output: Union[str, TextIO],
+    workers: int = 0,
+    chunksize: int = 64,
+    max_pending_chunks: Optional[int] = None,
+    lexicon: Optional[Mapping[str, str]] = None,
+    cache_size: int = 1024,
+    graph_backend: Optional[str] = None,
+) -> PipelineReport:
+    """Translate the graphs of graph_path and write their records to output (a path or a text file).
+
+    The arguments after output are those of translate_many: in flight are at most max_pending_chunks chunks
+    of chunksize graphs (max_pending_chunks is twice the number of workers by default, and 1 with no workers).
+    """
+    if isinstance(output, str):
+        with open(output, "w", encoding="utf-8") as file:
+            return translate_file(
+                graph_path, file, workers, chunksize, max_pending_chunks, lexicon, cache_size, graph_backend
+            )
+    if max_pending_chunks is None:
+        max_pending_chunks = max(2 * workers, 1)
+    graphs: Iterable[Query_graph] = _Counter(iter_graphs(graph_path, graph_backend=graph_backend))
+    start = time.perf_counter()
+    written = errors = peak_in_flight = 0
+    results = translate_many(
+        graphs,
+        workers=workers,
+        chunksize=chunksize,
+        lexicon=lexicon,
+        cache_size=cache_size,
+        max_pending_chunks=max_pending_chunks,
+    )
+    for index, result in enumerate(results):
+        peak_in_flight = max(peak_in_flight, graphs.count - written)
+        errors += isinstance(result, TranslationError)
+        output.write(translation_record(index, result))
+        output.write("\n")
+        written += 1
+    seconds = time.perf_counter() - start
+    return PipelineReport(
+        graphs=written,
+        errors=errors,
+        seconds=seconds,
+        graphs_per_second=written / seconds if seconds else 0.0,
+        peak_in_flight=peak_in_flight,
+        peak_rss_kib=_peak_rss_kib(resource.RUSAGE_SELF) if resource else None,
+        # Worker processes are accounted once they have exited, i.e., at the end of the run
+        peak_worker_rss_kib=_peak_rss_kib(resource.RUSAGE_CHILDREN) if resource and workers else None,
+    )
@@ -0,0 +1,251 @@
+"""Compact binary format for streams of Query_graph.
+
+A file is a header (magic, format version) followed by back-to-back records, one per graph. Each record
+is self-contained and starts with its size, so readers can skip records without decoding them:
+
+    record size      uint32 (number of bytes after this field)
+    record header    RECORD_HEADER: number of strings, nodes and edges, string pool size,
+                     reference point distance threshold, string id of the graph name
+    string offsets   uint32[number of strings + 1] into the string pool
+    string pool      UTF-8 bytes of all distinct strings of the graph, padded to 4 bytes
+    node table       NODE_DTYPE[number of nodes], in the node order of the graph
+    edge table       EDGE_DTYPE[number of edges], in the adjacency order of the graph
+    in-edge order    uint32[number of edges]: edge ids in the order of the predecessor lists
+
+All integers are little-endian, and missing strings (e.g., a relation without alias) have the id NO_STRING.
+"""
+import functools
+import mmap
+import struct
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from pylogos.query_graph.koutrika_query_graph import (
+    Attribute,
+    Dummy_edge,
+    Edge,
+    Function,
+    Grouping,
+    Having,
+    Join,
+    Membership,
+    Node,
+    OperatorType,
+    Order,
+    Predicate,
+    Query_graph,
+    Relation,
+    Selection,
+    Transformation,
+    Value,
+    _load_interned_edge,
+)
+
+MAGIC = b"PLQG"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")  # magic, version, reserved
+RECORD_SIZE = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<IIIIdI")
+NO_STRING = 0xFFFFFFFF
+NO_OPERATOR = -1
+IS_PRIMARY = 0x1
+
+# Type codes stored in the files: only append to these tuples
+NODE_TYPE_CODES = (Relation, Attribute, Value, Function)
+EDGE_TYPE_CODES = (Membership, Selection, Predicate, Join, Transformation, Order, Grouping, Having, Dummy_edge)
+
+NODE_DTYPE = np.dtype(
+    [
+        ("type", "u1"),
+        ("flags", "u1"),
+        ("node_name", "<u4"),
+        ("entity_name", "<u4"),
+        ("label", "<u4"),
+        ("alias", "<u4"),
+        # Node hashes are stable across processes, so they are stored instead of recomputed
+        ("hash", "<i8"),
+    ]
+)
+EDGE_DTYPE = np.dtype([("src", "<u4"), ("dst", "<u4"), ("type", "u1"), ("op", "i1"), ("label", "<u4")])
+
+
+class _StringPool:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def add(self, string: Optional[str]) -> int:
+        if string is None:
+            return NO_STRING
+        return self.ids.setdefault(string, len(self.ids))
+
+    def to_bytes(self):
+        encoded = [string.encode("utf-8") for string in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        pool = b"".join(encoded)
+        return offsets.tobytes(), pool + b"\0" * (-len(pool) % 4)
+
+
+def _type_code(types, obj) -> int:
+    try:
+        return types.index(type(obj))
+    except ValueError:
+        raise ValueError(f"{type(obj).__name__} can not be written in format version {FORMAT_VERSION}")
+
+
+def dumps_graph(query_graph: Query_graph) -> bytes:
+    """Return the record of query_graph (without the leading record size)"""
+    strings = _StringPool()
+    name_id = strings.add(query_graph.node_name)
+
+    nodes = list(query_graph.nodes)
+    node_ids = {node: idx for idx, node in enumerate(nodes)}
+    node_table = np.zeros(len(nodes), dtype=NODE_DTYPE)
+    node_table["type"] = [_type_code(NODE_TYPE_CODES, node) for node in nodes]
+    node_table["flags"] = [IS_PRIMARY if getattr(node, "is_primary", False) else 0 for node in nodes]
+    for field in ["node_name", "entity_name", "label", "alias"]:
+        node_table[field] = [strings.add(getattr(node, field, None)) for node in nodes]
+    node_table["hash"] = [hash(node) for node in nodes]
+
+    edges = list(query_graph.edges(data="data"))
+    edge_ids = {(src, dst): idx for idx, (src, dst, _) in enumerate(edges)}
+    edge_table = np.zeros(len(edges), dtype=EDGE_DTYPE)
+    edge_table["src"] = [node_ids[src] for src, _, _ in edges]
+    edge_table["dst"] = [node_ids[dst] for _, dst, _ in edges]
+    edge_table["type"] = [_type_code(EDGE_TYPE_CODES, edge) for _, _, edge in edges]
+    edge_table["op"] = [getattr(edge, "op", NO_OPERATOR) for _, _, edge in edges]
+    edge_table["label"] = [strings.add(getattr(edge, "label", None)) for _, _, edge in edges]
+    # networkx keeps predecessors in the insertion order of the edges, which the adjacency order loses
+    in_order = np.array([edge_ids[src, dst] for dst in nodes for src in query_graph.pred[dst]], dtype="<u4")
+
+    offsets, pool = strings.to_bytes()
+    header = RECORD_HEADER.pack(
+        len(strings.ids), len(nodes), len(edges), len(pool), query_graph.reference_point_distance_threshold, name_id
+    )
+    return b"".join([header, offsets, pool, node_table.tobytes(), edge_table.tobytes(), in_order.tobytes()])
+
+
+_set_slot = object.__setattr__
+
+
+@functools.lru_cache(maxsize=None)
+def _decode_edge(type_code: int, op: int, label: Optional[str]) -> Edge:
+    # Edges are interned, so the same instance can be returned for every record
+    state = {} if label is None else {"label": label}
+    if op != NO_OPERATOR:
+        state["op"] = OperatorType(op)
+    return _load_interned_edge(EDGE_TYPE_CODES[type_code], state)
+
+
+def loads_graph(buffer, offset: int = 0, graph_backend: Optional[str] = None) -> Query_graph:
+    """Decode the record starting at offset of buffer (bytes, mmap, ...) into a Query_graph"""
+    num_strings, num_nodes, num_edges, pool_size, threshold, name_id = RECORD_HEADER.unpack_from(buffer, offset)
+    offset += RECORD_HEADER.size
+    offsets = np.frombuffer(buffer, dtype="<u4", count=num_strings + 1, offset=offset).tolist()
+    offset += 4 * (num_strings + 1)
+    pool = bytes(buffer[offset : offset + offsets[-1]])
+    strings = {idx: pool[begin:end].decode("utf-8") for idx, (begin, end) in enumerate(zip(offsets, offsets[1:]))}
+    strings[NO_STRING] = None
+    offset += pool_size
+    node_table = np.frombuffer(buffer, dtype=NODE_DTYPE, count=num_nodes, offset=offset)
+    offset += NODE_DTYPE.itemsize * num_nodes
+    edge_table = np.frombuffer(buffer, dtype=EDGE_DTYPE, count=num_edges, offset=offset)
+    offset += EDGE_DTYPE.itemsize * num_edges
+    in_order = np.frombuffer(buffer, dtype="<u4", count=num_edges, offset=offset).tolist()
+
+    nodes: List[Node] = []
+    for type_code, flags, node_name, entity_name, label, alias, node_hash in node_table.tolist():
+        cls = NODE_TYPE_CODES[type_code]
+        # Same state as pickled nodes, set directly: this loop dominates the load time
+        node = cls.__new__(cls)
+        _set_slot(node, "node_name", strings[node_name])
+        _set_slot(node, "entity_name", strings[entity_name])
+        _set_slot(node, "label", strings[label])
+        _set_slot(node, "_hash", node_hash)
+        if cls is Relation:
+            _set_slot(node, "alias", strings[alias])
+            _set_slot(node, "is_primary", bool(flags & IS_PRIMARY))
+        nodes.append(node)
+
+    edges = []
+    for src_id, dst_id, type_code, op, label in edge_table.tolist():
+        edge = _decode_edge(type_code, op, strings[label])
+        edges.append((nodes[src_id], nodes[dst_id], {"data": edge}))
+
+    kwargs = {} if graph_backend is None else {"graph_backend": graph_backend}
+    threshold = int(threshold) if threshold.is_integer() else threshold
+    query_graph = Query_graph(strings[name_id], threshold, **kwargs)
+    # Fill the networkx adjacency directly, keeping the order of the successor and predecessor lists
+    node_data, succ, pred = query_graph._node, query_graph._succ, query_graph._pred
+    for node in nodes:
+        node_data[node] = {"data": node}
+        succ[node] = {}
+        pred[node] = {}
+    for src, dst, attributes in edges:
+        succ[src][dst] = attributes
+    for edge_id in in_order:
+        src, dst, attributes = edges[edge_id]
+        pred[dst][src] = attributes
+    query_graph._sync_graph_backend()
+    query_graph.invalidate_analysis_cache()
+    return query_graph
+
+
+def write_graphs(file: Union[str, BinaryIO], graphs) -> int:
+    """Write graphs to a file (path or binary file object) and return the number of graphs written"""
+    if isinstance(file, str):
+        with open(file, "wb") as f:
+            return write_graphs(f, graphs)
+    file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+    count = 0
+    for query_graph in graphs:
+        record = dumps_graph(query_graph)
+        file.write(RECORD_SIZE.pack(len(record)))
+        file.write(record)
+        count += 1
+    return count
+
+
+def _check_file_header(buffer) -> int:
+    if len(buffer) < FILE_HEADER.size:
+        raise ValueError("Not a query graph file: too short")
+    magic, version, _ = FILE_HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not a query graph file: bad magic {magic!r}")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported query graph file version {version} (expected at most {FORMAT_VERSION})")
+    return FILE_HEADER.size
+
+
+def iter_records(buffer) -> Iterator[int]:
+    """Yield the offset of every record (after its size field) in the content of a file"""
+    offset = _check_file_header(buffer)
+    while offset < len(buffer):
+        (size,) = RECORD_SIZE.unpack_from(buffer, offset)
+        offset += RECORD_SIZE.size
+        if offset + size > len(buffer):
+            raise ValueError(f"Truncated query graph record at byte {offset - RECORD_SIZE.size}")
+        yield offset
+        offset += size
+
+
+def iter_graphs(path: str, use_mmap: bool = True, graph_backend: Optional[str] = None) -> Iterator[Query_graph]:
+    """Yield the graphs of a file one at a time.
+
+    With use_mmap the file is memory-mapped, so only the pages of the records being decoded are read
+    and memory use does not grow with the size of the file.
+    """
+    with open(path, "rb") as f:
+        if not use_mmap:
+            buffer = f.read()
+            for offset in iter_records(buffer):
+                yield loads_graph(buffer, offset, graph_backend)
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for offset in iter_records(buffer):
+                yield loads_graph(buffer, offset, graph_backend)
+
+
+def load_graphs(path: str, graph_backend: Optional[str] = None) -> List[Query_graph]:
+    return list(iter_graphs(path, graph_backend=graph_backend))
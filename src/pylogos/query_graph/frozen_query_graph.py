@@ -0,0 +1,181 @@
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from pylogos.query_graph.koutrika_query_graph import (
+    Attribute,
+    Dummy_edge,
+    Edge,
+    Function,
+    Grouping,
+    Having,
+    Join,
+    Membership,
+    Node,
+    Order,
+    Predicate,
+    QueryGraphAnalysis,
+    Query_graph,
+    Relation,
+    Selection,
+    Transformation,
+    TraversalIndex,
+    Value,
+    cached_analysis,
+)
+
+# Types encoded in FrozenQueryGraph.node_type_codes and FrozenQueryGraph.edge_type_codes (-1 for any other type)
+NODE_TYPES = (Relation, Attribute, Value, Function)
+EDGE_TYPES = (Membership, Selection, Predicate, Join, Transformation, Order, Grouping, Having, Dummy_edge)
+
+
+def _type_code(types, obj) -> int:
+    return types.index(type(obj)) if type(obj) in types else -1
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class FrozenQueryGraph(QueryGraphAnalysis):
+    """Immutable snapshot of a Query_graph in compressed sparse row (CSR) form.
+
+    Nodes get dense integer ids in the order of the source graph. The neighbors of node i are
+    out_indices[out_indptr[i]:out_indptr[i + 1]] (in_indices for incoming edges; both in the order of the networkx
+    adjacency, succ and pred), and the matching entries of out_edges/in_edges index edge_table.
+
+    The snapshot supports the read-only API of Query_graph (traversal utilities and analyses such as
+    reference_points and query_subjects), so MRP and translate() run on it directly. The analyses are
+    computed on first access and never invalidated.
+
+    :param query_graph: graph to take the snapshot of
+    """
+
+    def __init__(self, query_graph: Query_graph):
+        self._init_analysis_cache()
+        self.node_name = query_graph.node_name
+        self._reference_point_distance_threshold = query_graph.reference_point_distance_threshold
+
+        # Node table
+        self.nodes: Tuple[Node, ...] = tuple(query_graph.nodes)
+        self.node_ids: Dict[Node, int] = {node: idx for idx, node in enumerate(self.nodes)}
+        self.labels: Tuple[str, ...] = tuple(node.label for node in self.nodes)
+        self.node_type_codes = _read_only(np.array([_type_code(NODE_TYPES, node) for node in self.nodes], dtype=np.int8))
+
+        # Edge table: interned edges are shared, so only distinct edges are stored (by identity: edges with
+        # unhashable labels are not interned)
+        edge_table_ids = {}
+        edge_table = []
+        successor_ids, out_edge_ids = [], []
+        for src in self.nodes:
+            successor_ids.append([])
+            out_edge_ids.append([])
+            for dst, attributes in query_graph.adj[src].items():
+                edge = attributes["data"]
+                if id(edge) not in edge_table_ids:
+                    edge_table_ids[id(edge)] = len(edge_table)
+                    edge_table.append(edge)
+                successor_ids[-1].append(self.node_ids[dst])
+                out_edge_ids[-1].append(edge_table_ids[id(edge)])
+        self.edge_table: Tuple[Edge, ...] = tuple(edge_table)
+        self.edge_type_codes = _read_only(np.array([_type_code(EDGE_TYPES, edge) for edge in self.edge_table], dtype=np.int8))
+
+        # CSR adjacency
+        self.out_indptr, self.out_indices, self.out_edges = self._to_csr(successor_ids, out_edge_ids)
+        predecessor_ids, in_edge_ids = [], []
+        for dst in self.nodes:
+            predecessor_ids.append([])
+            in_edge_ids.append([])
+            for src, attributes in query_graph.pred[dst].items():
+                predecessor_ids[-1].append(self.node_ids[src])
+                in_edge_ids[-1].append(edge_table_ids[id(attributes["data"])])
+        self.in_indptr, self.in_indices, self.in_edges = self._to_csr(predecessor_ids, in_edge_ids)
+
+        # Python lists of the CSR rows: element access on NumPy arrays is slow in pure-Python loops
+        self._successor_ids = successor_ids
+        self._predecessor_ids = predecessor_ids
+        self._edge_ids: Dict[Tuple[int, int], int] = {
+            (src_id, dst_id): edge_id
+            for src_id, (dst_ids, edge_ids) in enumerate(zip(successor_ids, out_edge_ids))
+            for dst_id, edge_id in zip(dst_ids, edge_ids)
+        }
+
+    @staticmethod
+    def _to_csr(neighbor_ids: List[List[int]], edge_ids: List[List[int]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        indptr = np.zeros(len(neighbor_ids) + 1, dtype=np.int32)
+        np.cumsum([len(ids) for ids in neighbor_ids], out=indptr[1:])
+        indices = np.fromiter((idx for ids in neighbor_ids for idx in ids), dtype=np.int32, count=indptr[-1])
+        edges = np.fromiter((idx for ids in edge_ids for idx in ids), dtype=np.int32, count=indptr[-1])
+        return _read_only(indptr), _read_only(indices), _read_only(edges)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.node_ids
+
+    @property
+    def reference_point_distance_threshold(self):
+        return self._reference_point_distance_threshold
+
+    def freeze(self) -> "FrozenQueryGraph":
+        return self
+
+    ### Graph primitives
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return len(self._edge_ids)
+
+    def successors(self, node: Node) -> Iterator[Node]:
+        return (self.nodes[dst_id] for dst_id in self._successor_ids[self.node_ids[node]])
+
+    def predecessors(self, node: Node) -> Iterator[Node]:
+        return (self.nodes[src_id] for src_id in self._predecessor_ids[self.node_ids[node]])
+
+    def has_edge(self, src: Node, dst: Node) -> bool:
+        return src in self.node_ids and dst in self.node_ids and (self.node_ids[src], self.node_ids[dst]) in self._edge_ids
+
+    def edges(self, data=False):
+        """Return all edges as (src, dst) pairs, or (src, dst, edge) triples when data is "data" """
+        for (src_id, dst_id), edge_id in self._edge_ids.items():
+            if data:
+                yield self.nodes[src_id], self.nodes[dst_id], self.edge_table[edge_id]
+            else:
+                yield self.nodes[src_id], self.nodes[dst_id]
+
+    def out_edges(self, node: Node) -> List[Tuple[Node, Node]]:
+        return [(node, dst) for dst in self.successors(node)]
+
+    def in_edges(self, node: Node) -> List[Tuple[Node, Node]]:
+        return [(src, node) for src in self.predecessors(node)]
+
+    def get_out_going_nodes(self, node: Node) -> List[Node]:
+        return [dst for dst in self.successors(node) if dst != node]
+
+    def get_incoming_nodes(self, node: Node) -> List[Node]:
+        return [src for src in self.predecessors(node) if src != node]
+
+    def get_edge(self, src: Node, dst: Node) -> Edge:
+        try:
+            return self.edge_table[self._edge_ids[self.node_ids[src], self.node_ids[dst]]]
+        except KeyError:
+            raise KeyError(f"The edge {src, dst} is not in the graph.")
+
+    ### Indexes built from the CSR arrays
+    @property
+    @cached_analysis
+    def traversal_index(self):
+        nodes = self.nodes
+        out_going_ids = [
+            [dst_id for dst_id in dst_ids if nodes[dst_id] != nodes[src_id]] for src_id, dst_ids in enumerate(self._successor_ids)
+        ]
+        relation_mask = 0
+        for node_id in np.flatnonzero(self.node_type_codes == NODE_TYPES.index(Relation)).tolist():
+            relation_mask |= 1 << node_id
+        return TraversalIndex(list(nodes), self.node_ids, out_going_ids, relation_mask)
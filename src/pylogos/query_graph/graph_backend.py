@@ -0,0 +1,272 @@
+import abc
+from typing import Dict, Hashable, Iterable, List, Type
+
+import networkx as nx
+
+
+class GraphBackend(abc.ABC):
+    """Storage behind the traversal primitives of a query graph.
+
+    Nodes are hashable objects and each directed edge carries one payload (the Edge object, stored
+    as the "data" attribute in networkx). Neighbors are returned in the insertion order of the edges
+    and unknown nodes raise nx.NodeNotFound, so all backends behave the same.
+    """
+
+    name: str = ""
+
+    @classmethod
+    @abc.abstractmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "GraphBackend":
+        """Return a backend holding the nodes and edges of a networkx graph"""
+
+    @property
+    @abc.abstractmethod
+    def nodes(self) -> Iterable[Hashable]:
+        """All nodes, in insertion order"""
+
+    @abc.abstractmethod
+    def add_node(self, node: Hashable) -> None:
+        """Add node (no-op if it already exists)"""
+
+    @abc.abstractmethod
+    def add_edge(self, src: Hashable, dst: Hashable, edge) -> None:
+        """Add an edge from src to dst, adding missing nodes. The payload of an existing edge is replaced"""
+
+    @abc.abstractmethod
+    def remove_node(self, node: Hashable) -> None:
+        """Remove node and its edges (no-op if it does not exist)"""
+
+    @abc.abstractmethod
+    def remove_edge(self, src: Hashable, dst: Hashable) -> None:
+        """Remove the edge from src to dst (no-op if it does not exist)"""
+
+    @abc.abstractmethod
+    def number_of_nodes(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    def number_of_edges(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    def has_node(self, node: Hashable) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def has_edge(self, src: Hashable, dst: Hashable) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def successors(self, node: Hashable) -> List[Hashable]:
+        pass
+
+    @abc.abstractmethod
+    def predecessors(self, node: Hashable) -> List[Hashable]:
+        pass
+
+    @abc.abstractmethod
+    def get_edge(self, src: Hashable, dst: Hashable):
+        """Return the payload of the edge from src to dst (KeyError if there is none)"""
+
+    def has_path(self, src: Hashable, dst: Hashable) -> bool:
+        return self._distance(src, dst) is not None
+
+    def shortest_path_length(self, src: Hashable, dst: Hashable) -> int:
+        distance = self._distance(src, dst)
+        if distance is None:
+            raise nx.NetworkXNoPath(f"Node {dst} not reachable from {src}")
+        return distance
+
+    def _distance(self, src: Hashable, dst: Hashable):
+        # Single BFS without caching. Query_graph answers repeated queries with its ReachabilityIndex
+        for node in [src, dst]:
+            if not self.has_node(node):
+                raise nx.NodeNotFound(f"Node {node} is not in the graph")
+        visited = {src}
+        frontier = [src]
+        depth = 0
+        while frontier:
+            if dst in visited:
+                return depth
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for neighbor in self.successors(node):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return None
+
+
+class NetworkxBackend(GraphBackend):
+    """Backend over the adjacency dicts of a networkx DiGraph.
+
+    Query_graph is a DiGraph itself and uses this backend over its own storage: networkx has already
+    applied a mutation when the backend is notified of it, so the mutators only check that the state
+    matches. Given another graph, the mutators write to it.
+
+    :param graph: graph to read (and write) the nodes and edges of
+    """
+
+    name = "networkx"
+
+    def __init__(self, graph: nx.DiGraph = None):
+        self.graph = nx.DiGraph() if graph is None else graph
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "NetworkxBackend":
+        return cls(graph)
+
+    @property
+    def nodes(self) -> Iterable[Hashable]:
+        return self.graph._node
+
+    def add_node(self, node: Hashable) -> None:
+        if node not in self.graph._node:
+            nx.DiGraph.add_node(self.graph, node, data=node)
+
+    def add_edge(self, src: Hashable, dst: Hashable, edge) -> None:
+        attributes = self.graph._succ[src].get(dst) if src in self.graph._succ else None
+        if attributes is None or attributes.get("data") is not edge:
+            for node in [src, dst]:
+                self.add_node(node)
+            nx.DiGraph.add_edge(self.graph, src, dst, data=edge)
+
+    def remove_node(self, node: Hashable) -> None:
+        if node in self.graph._node:
+            nx.DiGraph.remove_node(self.graph, node)
+
+    def remove_edge(self, src: Hashable, dst: Hashable) -> None:
+        if self.has_edge(src, dst):
+            nx.DiGraph.remove_edge(self.graph, src, dst)
+
+    def number_of_nodes(self) -> int:
+        return len(self.graph._node)
+
+    def number_of_edges(self) -> int:
+        return sum(len(neighbors) for neighbors in self.graph._succ.values())
+
+    def has_node(self, node: Hashable) -> bool:
+        return node in self.graph._node
+
+    def has_edge(self, src: Hashable, dst: Hashable) -> bool:
+        return src in self.graph._succ and dst in self.graph._succ[src]
+
+    def successors(self, node: Hashable) -> List[Hashable]:
+        try:
+            return list(self.graph._succ[node])
+        except KeyError:
+            raise nx.NodeNotFound(f"Node {node} is not in the graph")
+
+    def predecessors(self, node: Hashable) -> List[Hashable]:
+        try:
+            return list(self.graph._pred[node])
+        except KeyError:
+            raise nx.NodeNotFound(f"Node {node} is not in the graph")
+
+    def get_edge(self, src: Hashable, dst: Hashable):
+        try:
+            return self.graph._succ[src][dst]["data"]
+        except KeyError:
+            raise KeyError(f"The edge {src, dst} is not in the graph.")
+
+
+class AdjacencyListBackend(GraphBackend):
+    """Pure-Python backend keeping, for every node, a dict of successor -> edge payload and a dict of
+    predecessors. It skips the per-node and per-edge attribute dicts and the views of networkx, so
+    neighbor and payload lookups are plain dict accesses.
+    """
+
+    name = "adjacency"
+
+    def __init__(self):
+        self._succ: Dict[Hashable, Dict[Hashable, object]] = {}
+        self._pred: Dict[Hashable, Dict[Hashable, None]] = {}
+        self._number_of_edges = 0
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> "AdjacencyListBackend":
+        backend = cls()
+        for node in graph.nodes:
+            backend.add_node(node)
+        for src, dst, edge in graph.edges(data="data"):
+            backend.add_edge(src, dst, edge)
+        return backend
+
+    @property
+    def nodes(self) -> Iterable[Hashable]:
+        return self._succ
+
+    def add_node(self, node: Hashable) -> None:
+        if node not in self._succ:
+            self._succ[node] = {}
+            self._pred[node] = {}
+
+    def add_edge(self, src: Hashable, dst: Hashable, edge) -> None:
+        self.add_node(src)
+        self.add_node(dst)
+        if dst not in self._succ[src]:
+            self._number_of_edges += 1
+            # Predecessors as dict keys: ordered and O(1) to remove
+            self._pred[dst][src] = None
+        self._succ[src][dst] = edge
+
+    def remove_node(self, node: Hashable) -> None:
+        if node not in self._succ:
+            return None
+        for dst in list(self._succ[node]):
+            self.remove_edge(node, dst)
+        for src in list(self._pred[node]):
+            self.remove_edge(src, node)
+        del self._succ[node]
+        del self._pred[node]
+
+    def remove_edge(self, src: Hashable, dst: Hashable) -> None:
+        if self.has_edge(src, dst):
+            del self._succ[src][dst]
+            del self._pred[dst][src]
+            self._number_of_edges -= 1
+
+    def number_of_nodes(self) -> int:
+        return len(self._succ)
+
+    def number_of_edges(self) -> int:
+        return self._number_of_edges
+
+    def has_node(self, node: Hashable) -> bool:
+        return node in self._succ
+
+    def has_edge(self, src: Hashable, dst: Hashable) -> bool:
+        return src in self._succ and dst in self._succ[src]
+
+    def successors(self, node: Hashable) -> List[Hashable]:
+        try:
+            return list(self._succ[node])
+        except KeyError:
+            raise nx.NodeNotFound(f"Node {node} is not in the graph")
+
+    def predecessors(self, node: Hashable) -> List[Hashable]:
+        try:
+            return list(self._pred[node])
+        except KeyError:
+            raise nx.NodeNotFound(f"Node {node} is not in the graph")
+
+    def get_edge(self, src: Hashable, dst: Hashable):
+        try:
+            return self._succ[src][dst]
+        except KeyError:
+            raise KeyError(f"The edge {src, dst} is not in the graph.")
+
+
+GRAPH_BACKENDS: Dict[str, Type[GraphBackend]] = {
+    NetworkxBackend.name: NetworkxBackend,
+    AdjacencyListBackend.name: AdjacencyListBackend,
+}
+
+
+def get_graph_backend(name: str) -> Type[GraphBackend]:
+    try:
+        return GRAPH_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown graph backend: {name} (expected one of {list(GRAPH_BACKENDS)})")
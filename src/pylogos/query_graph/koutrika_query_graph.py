@@ -1,11 +1,20 @@
 import abc
-import copy
+import functools
 import hashlib
+import math
+import weakref
+from collections import namedtuple
 from enum import IntEnum
-from typing import Optional, Set, List, Tuple, Union
+from typing import Dict, Iterable, Optional, Set, List, Tuple, Union
 
 import networkx as nx
 
+from pylogos.query_graph.graph_backend import GraphBackend, NetworkxBackend, get_graph_backend
+from pylogos.query_graph.node_registry import NodeRegistry, NodeView
+from pylogos.query_graph.reachability_index import ReachabilityIndex
+from pylogos.query_graph.slots import SlotsPickleMixin
+from pylogos.query_graph.typed_adjacency import TypedAdjacency
+
 
 # Type definition
 class OrderingType(IntEnum):
@@ -57,30 +66,53 @@ FunctionNames = ["Min", "Max", "Sum", "Avg", "Cnt"]
 FunctionLabels = ["minimum", "maximum", "sum of", "average", "number of"]
 
 
+def stable_hash(signature: str) -> int:
+    """Return a 64-bit hash of the signature that is identical across processes (unlike the built-in hash of str)"""
+    return int.from_bytes(hashlib.sha256(signature.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
 # Node
-class Node(metaclass=abc.ABCMeta):
+class Node(SlotsPickleMixin, metaclass=abc.ABCMeta):
+    __slots__ = ("node_name", "entity_name", "label", "_hash")
+
     def __init__(self, node_name, entity_name, label=None):
         self.node_name = node_name
         self.entity_name = entity_name
         self.label = entity_name if label is None else label
+        # Node identity never changes after construction, so hash it only once
+        self._hash = stable_hash(self.hash_key)
 
     def __str__(self):
         return self.label
 
     def __hash__(self):
-        return int(hashlib.sha256(self.signature.encode("utf-8")).hexdigest(), 16) % 10**8
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, self.__class__):
             return False
         return self.signature == other.signature
 
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        # Graphs pickled before the hash was precomputed do not carry it
+        if not hasattr(self, "_hash"):
+            self._hash = stable_hash(self.hash_key)
+
     @property
     def signature(self):
         return self.node_name.lower()
 
+    @property
+    def hash_key(self):
+        return self.signature
+
 
 class Relation(Node):
+    __slots__ = ("alias", "is_primary")
+
     def __init__(self, node_name, entity_name, label=None, alias=None, is_primary=False):
         super().__init__(node_name, entity_name, label)
         self.alias = alias
@@ -88,6 +120,8 @@ class Relation(Node):
 
 
 class Attribute(Node):
+    __slots__ = ()
+
     def __init__(self, node_name, entity_name, label=None):
         super().__init__(node_name, entity_name, label)
 
@@ -95,58 +129,142 @@ class Attribute(Node):
 class Function(Node):
     """used for representing a function, an expression or a renaming operation that is applied on an attribute A or a set of attributes"""
 
+    __slots__ = ()
+
     def __init__(self, function_type, label=None):
         super().__init__(FunctionNames[function_type], label if label else FunctionLabels[function_type])
 
 
 class Value(Node):
+    __slots__ = ()
+
     def __init__(self, node_name, entity_name, label=None):
         super().__init__(node_name, entity_name, label)
 
-    def __hash__(self):
-        return int(hashlib.sha256(self.node_name.lower().encode("utf-8")).hexdigest(), 16) % 10**8
-
     def __eq__(self, other):
         if isinstance(other, self.__class__) and (self.node_name == "" or other.node_name == ""):
             return True
         return super().__eq__(other)
 
+    # Overriding __eq__ resets __hash__, so restore the precomputed one
+    __hash__ = Node.__hash__
+
     @property
     def signature(self):
         return "Value"
 
+    @property
+    def hash_key(self):
+        # All values share the same signature, so hash them by their name instead
+        return self.node_name.lower()
+
 
 # Edge
-class Edge(metaclass=abc.ABCMeta):
+class InternedEdgeMeta(abc.ABCMeta):
+    """Make edge constructors return one shared instance per (edge type, label, operator).
+
+    Edges are immutable, so the instances can be shared by all graphs: connecting nodes allocates nothing
+    and comparing interned edges is an identity check. The tables only hold weak references, so an edge no
+    graph uses any more is dropped from them. Edges whose arguments or intern key are unhashable are not interned.
+    """
+
+    # Constructor arguments to interned edge, and intern key to interned edge
+    _edges_by_arguments = weakref.WeakValueDictionary()
+    _edges_by_key = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        arguments = (cls, args, tuple(kwargs.items()))
+        try:
+            return InternedEdgeMeta._edges_by_arguments[arguments]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable arguments
+            return InternedEdgeMeta.intern(super().__call__(*args, **kwargs))
+        edge = InternedEdgeMeta.intern(super().__call__(*args, **kwargs))
+        InternedEdgeMeta._edges_by_arguments[arguments] = edge
+        return edge
+
+    @staticmethod
+    def intern(edge):
+        """Return the shared instance equivalent to the given edge"""
+        try:
+            return InternedEdgeMeta._edges_by_key.setdefault(edge.intern_key, edge)
+        except TypeError:
+            return edge
+
+
+def _load_interned_edge(cls, state):
+    edge = cls.__new__(cls)
+    edge.__setstate__(state)
+    return InternedEdgeMeta.intern(edge)
+
+
+class Edge(SlotsPickleMixin, metaclass=InternedEdgeMeta):
+    __slots__ = ("label", "_hash", "__weakref__")
+
     def __init__(self):
-        pass
+        # Subclasses must set every field before calling this: the edge is immutable once hashed
+        self._hash = stable_hash(self.signature)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_hash"):
+            raise AttributeError(f"{type(self).__name__} is immutable and shared between graphs")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable and shared between graphs")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce_ex__(self, protocol):
+        # Intern the edges when loading a pickle (edges pickled before interning are loaded as separate instances)
+        return (_load_interned_edge, (type(self), self.__getstate__()))
 
     def __str__(self):
         return type(self).__name__
 
     def __hash__(self):
-        return int(hashlib.sha256(self.signature.encode("utf-8")).hexdigest(), 16) % 10**8
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Dummy_edge):
             return True
         if not isinstance(other, self.__class__):
             return False
         return self.signature == other.signature
 
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        # Graphs pickled before the hash was precomputed do not carry it
+        if not hasattr(self, "_hash"):
+            self._hash = stable_hash(self.signature)
+
     @property
     def signature(self):
         return str(self).lower()
 
+    @property
+    def intern_key(self):
+        return (type(self), getattr(self, "label", None))
+
     @abc.abstractmethod
     def one_hop_path_description(self, src_label, dst_label):
         pass
 
 
 class Membership(Edge):
+    __slots__ = ()
+
     def __init__(self, label="of"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
@@ -155,9 +273,11 @@ class Membership(Edge):
 class Join(Edge):
     """For simplified version of query graph (with label of join conditions)"""
 
+    __slots__ = ()
+
     def __init__(self, label):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
@@ -168,14 +288,20 @@ class Predicate(Edge):
     - Selection predicate edge: if dst is a single value or a set of values
     - Join predicate edge: if dst is an attribute"""
 
+    __slots__ = ("op",)
+
     def __init__(self, operator_id=OperatorType.Equal):
-        super().__init__()
         self.op = operator_id
         self.label = OperatorLabels[self.op]
+        super().__init__()
 
     def __str__(self):
         return OperatorNames[self.op]
 
+    @property
+    def intern_key(self):
+        return super().intern_key + (self.op,)
+
     @property
     def signature(self):
         return f"{str(super().signature)}_{str(self)}".lower()
@@ -187,9 +313,11 @@ class Predicate(Edge):
 class Selection(Edge):
     """edge for relation to attribute when there is a predicate"""
 
+    __slots__ = ()
+
     def __init__(self, label="whose"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
@@ -198,6 +326,8 @@ class Selection(Edge):
 class Transformation(Edge):
     """used for connecting an attribute A with a function f that is applied to A"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -206,69 +336,209 @@ class Transformation(Edge):
 
 
 class Order(Edge):
+    __slots__ = ()
+
     def __init__(self, label="order by"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
 
 
 class Grouping(Edge):
+    __slots__ = ()
+
     def __init__(self, label="group by"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
 
 
 class Having(Edge):
+    __slots__ = ()
+
     def __init__(self, label="having"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def one_hop_path_description(self, src_label, dst_label):
         return f"{src_label} {self.label} {dst_label}"
 
 
 class Dummy_edge(Edge):
+    __slots__ = ()
+
     def __init__(self, label="Dummy Edge"):
-        super().__init__()
         self.label = label
+        super().__init__()
 
     def __eq__(self, other):
         return issubclass(type(other), Edge)
 
+    __hash__ = Edge.__hash__
+
     def one_hop_path_description(self, src_label, dst_label):
         return ""
 
 
+# Node and edge kinds of the tuple specs accepted by Query_graph.from_edges
+NODE_KINDS = {"relation": Relation, "attribute": Attribute, "value": Value, "function": Function}
+EDGE_KINDS = {
+    "membership": Membership,
+    "selection": Selection,
+    "predicate": Predicate,
+    "join": Join,
+    "transformation": Transformation,
+    "order": Order,
+    "grouping": Grouping,
+    "having": Having,
+    "dummy": Dummy_edge,
+}
+
+
+def _build_from_spec(spec, kinds, base_type):
+    """Return the node (or edge) described by spec: an instance, a kind, or a tuple of a kind and constructor arguments"""
+    if isinstance(spec, base_type):
+        return spec
+    if isinstance(spec, str):
+        spec = (spec,)
+    try:
+        return kinds[spec[0]](*spec[1:])
+    except KeyError:
+        raise ValueError(f"Unknown {base_type.__name__.lower()} kind: {spec[0]} (expected one of {list(kinds)})")
+
+
+class _DistanceToReferencePoints:
+    """Distance from the closest reference point to each relation, for reference point condition 4.
+
+    The distance between a reference point rp and a relation r is the length of the path rp -> r if it exists,
+    otherwise that of r -> rp. When all relations are mutually reachable, only the first case occurs, so the
+    minimum over all reference points is maintained with an incremental multi-source BFS.
+    Otherwise, it falls back to comparing r with every reference point through the reachability index.
+    """
+
+    def __init__(self, query_graph, reference_points):
+        self.query_graph = query_graph
+        self.reference_points = list(reference_points)
+        self.distances = None
+        relations = query_graph.relations
+        if len(relations) > len(self.reference_points):
+            index = query_graph.reachability_index
+            relation_ids = [index.node_ids[relation] for relation in relations]
+            forward = index.relax(index.new_distances(), relation_ids[:1])
+            backward = index.relax(index.new_distances(), relation_ids[:1], reverse=True)
+            if all(forward[i] != math.inf and backward[i] != math.inf for i in relation_ids):
+                self.distances = index.relax(index.new_distances(), [index.node_ids[rp] for rp in self.reference_points])
+
+    def add(self, reference_point):
+        self.reference_points.append(reference_point)
+        if self.distances is not None:
+            index = self.query_graph.reachability_index
+            index.relax(self.distances, [index.node_ids[reference_point]])
+
+    def get(self, relation, strict=True):
+        """Return the distance to the closest reference point (math.inf if there is none).
+        If strict, raise an error when the relation is not connected to a reference point in either direction."""
+        if self.distances is not None:
+            return self.distances[self.query_graph.reachability_index.node_ids[relation]]
+        min_distance = math.inf
+        for rp in self.reference_points:
+            if self.query_graph.has_path(rp, relation):
+                distance = self.query_graph.shortest_path_length(rp, relation)
+            elif self.query_graph.has_path(relation, rp):
+                distance = self.query_graph.shortest_path_length(relation, rp)
+            elif strict:
+                raise RuntimeError(f"No path between {rp} and {relation}")
+            else:
+                continue
+            min_distance = min(min_distance, distance)
+        return min_distance
+
+
 # Query Graph
-class Query_graph(nx.DiGraph):
-    def __init__(self, node_name="", rp_dist_threshold=4):
-        super().__init__()
-        self.node_name = node_name
-        self._query_subjects = None
-        self.reference_point_distance_threshold = rp_dist_threshold
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "revision", "size"])
+
+
+class ReferencePointCondition(IntEnum):
+    """Conditions for a relation to be a reference point, in the order they are checked (see Query_graph.reference_points)"""
+
+    Projection = 1
+    BranchingPoint = 2
+    LeafRelation = 3
+    DistanceThreshold = 4
+    NestedQuery = 5
+
+
+# condition: first ReferencePointCondition satisfied (None if not a reference point)
+# distance: distance to the closest reference point (0 for reference points)
+ReferencePointInfo = namedtuple("ReferencePointInfo", ["condition", "distance"])
 
+# nodes: nodes in the order of their ids
+# node_ids: dict from node to its id
+# out_going_ids: ids of Query_graph.get_out_going_nodes for each node id
+# relation_mask: bitmask of the ids of relation nodes
+TraversalIndex = namedtuple("TraversalIndex", ["nodes", "node_ids", "out_going_ids", "relation_mask"])
+
+
+def cached_analysis(func):
+    """Memoize a derived property of the query graph until the graph is mutated.
+    The cached object is shared by all callers and must not be modified in place.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self):
+        if func.__name__ in self._analysis_cache:
+            self._analysis_cache_hits += 1
+            return self._analysis_cache[func.__name__]
+        self._analysis_cache_misses += 1
+        value = self._analysis_cache[func.__name__] = func(self)
+        return value
+
+    return wrapper
+
+
+class QueryGraphAnalysis:
+    """Read-only analyses of a query graph, shared by Query_graph and FrozenQueryGraph.
+
+    Subclasses provide the graph primitives (nodes, successors, edges(data="data"), get_out_going_nodes,
+    get_incoming_nodes and get_edge), reference_point_distance_threshold and an analysis cache
+    initialized with _init_analysis_cache.
+    """
+
+    def _init_analysis_cache(self):
+        self._revision = 0
+        self._analysis_cache = {}
+        self._analysis_cache_hits = 0
+        self._analysis_cache_misses = 0
+
+    ### Analysis cache
+    @property
+    def revision(self):
+        """Number of mutations applied to the graph so far"""
+        return self._revision
+
+    def cache_info(self):
+        return CacheInfo(self._analysis_cache_hits, self._analysis_cache_misses, self._revision, len(self._analysis_cache))
+
+    ### Graph analysis
     @property
+    @cached_analysis
     def branching_relations(self):
-        if not hasattr(self, "_branching_relations"):
-            self._branching_relations = self.get_branching_points(self.query_subjects[0])
-        return self._branching_relations
+        return self.get_branching_points(self.query_subjects[0])
 
     @property
+    @cached_analysis
     def leaf_relations(self):
         """Relations that satisfy one of the following
         1. has no out-going path to other non-visited relation when graph traversing from the query subject
         """
-        if not hasattr(self, "_leaf_relations"):
-            setattr(self, "_leaf_relations", self.get_leaf_nodes(self.query_subjects[0]))
-            # self._leaf_relations = self.get_leaf_nodes(self.query_subjects[0])
-        return self._leaf_relations
+        return self.get_leaf_nodes(self.query_subjects[0])
 
     @property
+    @cached_analysis
     def reference_points(self):
         """
         output:
@@ -280,69 +550,111 @@ class Query_graph(nx.DiGraph):
                 3. RP is a leaf relation, i.e., a relation with no outgoing paths to other relations on the query graph (This is for query with nesting)
                 4. the minimum distance of RP from the closest reference point is greater than a pre-defined threshold
                 5. connecing to a nested query
+            Reference points are ordered by the condition they satisfy first, then by the order of relations.
         """
+        classification = self.reference_point_classification
+        return sorted(
+            (relation for relation, info in classification.items() if info.condition),
+            key=lambda relation: classification[relation].condition,
+        )
 
-        def shortest_path_length(node1, node2):
-            if self.has_path(node1, node2):
-                src, dst = node1, node2
-            elif self.has_path(node2, node1):
-                dst, src = node1, node2
-            else:
-                raise RuntimeError(f"No path between {node1} and {node2}")
-            return nx.shortest_path_length(self, src, dst)
+    @property
+    @cached_analysis
+    def reference_point_classification(self):
+        """Classify all relations against the conditions of reference_points in a single pass.
+        output:
+            - dict from each relation (in the order of self.relations) to its ReferencePointInfo
+        details:
+            Each condition is decided with precomputed, linear-time structures instead of per-pair searches:
+                1. membership edges of the relation
+                2, 3. branching and leaf relations found by the traversals from the query subject
+                4. a multi-source BFS from the reference points, extended whenever a relation is added
+                5. the relations reachable through non-relation nodes, computed once per strongly connected component
+        """
+        relations = self.relations
+        conditions = {}
 
         # condition 1
-        reference_points = [
-            p_relations for p_relations in self.relations if self._get_number_of_projecting_attributes(p_relations)
-        ]
-
-        # condition 2
-        for r1 in self.relations:
-            # Pass if already a reference point
-            if r1 in reference_points:
-                continue
-            if r1 in self.branching_relations:
-                reference_points.append(r1)
-
-        # condition 3
-        for r1 in self.relations:
-            # Pass if already a reference point
-            if r1 in reference_points:
-                continue
-            # Add relation as a reference point, if leaf relation if there is not path to any other relation
-            if r1 in self.leaf_relations:
-                reference_points.append(r1)
+        for relation in relations:
+            if self._get_number_of_projecting_attributes(relation):
+                conditions[relation] = ReferencePointCondition.Projection
+
+        # condition 2 and 3
+        if len(conditions) < len(relations):
+            for condition, relations_to_add in [
+                (ReferencePointCondition.BranchingPoint, set(self.branching_relations)),
+                (ReferencePointCondition.LeafRelation, set(self.leaf_relations)),
+            ]:
+                for relation in relations:
+                    if relation not in conditions and relation in relations_to_add:
+                        conditions[relation] = condition
 
         # condition 4
-        for r1 in self.relations:
-            # Pass if already a reference point
-            if r1 in reference_points:
+        distance_to_reference_points = _DistanceToReferencePoints(self, conditions)
+        for relation in relations:
+            if relation in conditions:
                 continue
-            # Get minimum distance to other reference points
-            shortest_path_lengths = [shortest_path_length(rp, r1) for rp in reference_points]
-            min_distance = min(shortest_path_lengths) if shortest_path_lengths else float("inf")
-            # If minimum distance greater than the threshold
-            if min_distance > self.reference_point_distance_threshold:
-                # Add this relation as a reference point
-                reference_points.append(r1)
+            if distance_to_reference_points.get(relation) > self.reference_point_distance_threshold:
+                conditions[relation] = ReferencePointCondition.DistanceThreshold
+                distance_to_reference_points.add(relation)
 
         # condition 5
         # If it is a relation to connect a nested query, it is a reference point
         # For now, we assume that a relation that is connect with some operator other than equality is a relation in the inner query
-        for r1 in self.relations:
-            # Pass if already a reference point
-            if r1 in reference_points:
+        reachable_relations = None
+        for relation in relations:
+            if relation in conditions:
                 continue
-            for neighbor in self.get_neighbors(r1):
-                # If not join and the number of non visited relation is greater than 1
-                num_of_relations_to_visit = self.number_of_non_visited_relation_nodes(neighbor, set([r1]))
-                is_join = type(self.get_edge(r1, neighbor)) == Join
-                if not is_join and num_of_relations_to_visit > 0:
-                    reference_points.append(r1)
+            if reachable_relations is None:
+                reachable_relations = self._relations_reachable_through_non_relations()
+            for neighbor in self.get_neighbors(relation):
+                if type(self.get_edge(relation, neighbor)) == Join:
+                    continue
+                # Relations that a traversal from the neighbor reaches without visiting the relation itself
+                if type(neighbor) == Relation:
+                    visited = (relation, neighbor)
+                    relations_to_visit = [
+                        r
+                        for dst in self.get_out_going_nodes(neighbor)
+                        for r in ([dst] if type(dst) == Relation else reachable_relations[dst])
+                    ]
+                else:
+                    visited = (relation,)
+                    relations_to_visit = reachable_relations[neighbor]
+                if any(r not in visited for r in relations_to_visit):
+                    conditions[relation] = ReferencePointCondition.NestedQuery
+                    distance_to_reference_points.add(relation)
+                    break
+
+        return {
+            relation: ReferencePointInfo(
+                conditions.get(relation), 0 if relation in conditions else distance_to_reference_points.get(relation, strict=False)
+            )
+            for relation in relations
+        }
 
-        return reference_points
+    def _relations_reachable_through_non_relations(self, limit=3):
+        """Return, for each non-relation node, up to `limit` distinct relations reachable from it through paths of non-relation nodes"""
+        non_relation_graph = nx.DiGraph()
+        for node in self.nodes:
+            if type(node) != Relation:
+                non_relation_graph.add_node(node)
+                non_relation_graph.add_edges_from((node, dst) for dst in self.get_out_going_nodes(node) if type(dst) != Relation)
+        condensed_graph = nx.condensation(non_relation_graph)
+        reachable_relations = {}
+        for component in reversed(list(nx.topological_sort(condensed_graph))):
+            relations = []
+            for node in condensed_graph.nodes[component]["members"]:
+                for dst in self.get_out_going_nodes(node):
+                    if type(dst) == Relation and dst not in relations:
+                        relations.append(dst)
+            for next_component in condensed_graph.successors(component):
+                relations.extend(r for r in reachable_relations[next_component] if r not in relations)
+            reachable_relations[component] = tuple(relations[:limit])
+        return {node: reachable_relations[component] for node, component in condensed_graph.graph["mapping"].items()}
 
     @property
+    @cached_analysis
     def primary_relations(self):
         """TODO: Annotation for primary relation should be given from the database graph.
         But, for now, we determine it by whether the relation contains any projection attribute"""
@@ -352,57 +664,64 @@ class Query_graph(nx.DiGraph):
         return list(filter(lambda r: self._get_number_of_projecting_attributes(r), self.relations))
 
     @property
+    @cached_analysis
     def secondary_relations(self):
         """TODO: Annotation for secondary relation should be given from the database graph.
         But, for now, we determine it by whether the relation contains only selection edges for join
         """
 
-        def is_predicate_for_join(src, edge, dst):
-            return type(src) == Attribute and type(edge) == Predicate and type(dst) == Attribute
-
-        def is_selection_for_join(src, edge, dst):
-            # False if edge is not selection
-            if not type(edge) == Selection:
-                return False
-            # Check if next edge is predicate for join
-            if type(src) == Attribute and type(dst) == Relation:
-                return all(
-                    is_predicate_for_join(next_src, self.edges[next_src, next_dst]["data"], next_dst)
-                    for next_src, next_dst in self.edges(src)
-                    if next_dst != dst
-                )
-            elif type(src) == Relation and type(dst) == Attribute:
-                return all(
-                    is_predicate_for_join(next_src, self.edges[next_src, next_dst]["data"], next_dst)
-                    for next_src, next_dst in self.edges(dst)
-                    if next_dst != src
-                )
-            else:
-                return False
+        typed_adjacency = self.typed_adjacency
 
-        # Return secondary relations
-        return list(
-            filter(
-                lambda relation: all(
-                    [
-                        is_selection_for_join(src, self.edges[src, dst]["data"], dst)
-                        for src, dst in self.all_edges_of(relation)
-                    ]
-                ),
-                self.relations,
+        def is_attribute_for_join(attribute, relation):
+            # All other out-going edges of the attribute should be predicates to attributes
+            return type(attribute) == Attribute and all(
+                edge_type == Predicate and type(dst) == Attribute
+                for edge_type, dsts in typed_adjacency.out_edge_types(attribute).items()
+                for dst in dsts
+                if dst != relation
             )
-        )
+
+        def has_only_selections_for_join(relation):
+            for neighbors_by_type in [typed_adjacency.out_edge_types(relation), typed_adjacency.in_edge_types(relation)]:
+                for edge_type, neighbors in neighbors_by_type.items():
+                    if edge_type != Selection:
+                        return False
+                    if not all(is_attribute_for_join(attribute, relation) for attribute in neighbors):
+                        return False
+            return True
+
+        # Return secondary relations
+        return list(filter(has_only_selections_for_join, self.relations))
+
+    @property
+    @cached_analysis
+    def node_registry(self):
+        """Nodes partitioned by type. Kept up to date by add_node_if_not_exist instead of being rebuilt"""
+        return NodeRegistry(self.nodes, (Relation, Attribute, Value, Function))
+
+    @property
+    def relations(self) -> NodeView:
+        return self.node_registry.view(Relation)
 
     @property
-    def relations(self):
-        return list(filter(lambda n: type(n) == Relation, self.nodes))
+    def attributes(self) -> NodeView:
+        return self.node_registry.view(Attribute)
 
     @property
+    def values(self) -> NodeView:
+        return self.node_registry.view(Value)
+
+    @property
+    def functions(self) -> NodeView:
+        return self.node_registry.view(Function)
+
+    @property
+    @cached_analysis
     def query_subjects(self):
         """primary relations that has the minimum distance to its farthest relations. (When more than one is found, we return those with the most number of projecting attributes)"""
 
         def get_shortest_distance(src_node, dst_node):
-            return nx.shortest_path_length(self, src_node, dst_node)
+            return self.shortest_path_length(src_node, dst_node)
 
         def get_max_distance_with_other_relations(src_relation):
             # We assume that all relations are connected and distance(r1,r2) > 0 for all r1 in R and r2 in R.
@@ -433,87 +752,103 @@ class Query_graph(nx.DiGraph):
         # Randomly return one relation from possible candidates
         return query_subjects
 
-    def _get_number_of_projecting_attributes(self, relation):
-        assert type(relation) == Relation, f"Expected relation, but got {type(relation)}"
-        return len(
-            list(
-                filter(lambda nodes: type(self.get_edge(nodes[0], nodes[1])) == Membership, self.all_edges_of(relation))
-            )
-        )
+    @property
+    @cached_analysis
+    def reachability_index(self):
+        """BFS distances between nodes, shared by all path queries until the graph is mutated"""
+        return ReachabilityIndex(self)
 
-    ### Utils for graph construction
-    def add_node_if_not_exist(self, node):
-        if node not in self:
-            self.add_node(node, data=node)
+    @property
+    @cached_analysis
+    def traversal_index(self):
+        """Dense integer ids of the nodes, used by the traversals that keep track of visited nodes with bitmasks"""
+        nodes = list(self.nodes)
+        node_ids = {node: idx for idx, node in enumerate(nodes)}
+        out_going_ids = [[node_ids[dst] for dst in self.get_out_going_nodes(node)] for node in nodes]
+        relation_mask = 0
+        for idx, node in enumerate(nodes):
+            if type(node) == Relation:
+                relation_mask |= 1 << idx
+        return TraversalIndex(nodes, node_ids, out_going_ids, relation_mask)
 
-    def bidirectional_connect(self, node1, edge, node2):
-        self.unidirectional_connect(node1, edge, node2)
-        self.unidirectional_connect(node2, copy.deepcopy(edge), node1)
+    @property
+    @cached_analysis
+    def typed_adjacency(self):
+        """Neighbors of each node bucketed by edge type. Kept up to date by unidirectional_connect instead of being rebuilt"""
+        return TypedAdjacency(self)
+
+    def _to_visited_mask(self, visited_nodes: Optional[Set[Node]]) -> int:
+        node_ids = self.traversal_index.node_ids
+        visited_mask = 0
+        for node in visited_nodes or ():
+            if node in node_ids:
+                visited_mask |= 1 << node_ids[node]
+        return visited_mask
 
-    def unidirectional_connect(self, node1, edge, node2):
-        # Add node if not exist
-        self.add_node_if_not_exist(node1)
-        self.add_node_if_not_exist(node2)
+    def _get_number_of_projecting_attributes(self, relation):
+        assert type(relation) == Relation, f"Expected relation, but got {type(relation)}"
+        return len(self.in_by_type(relation, Membership)) + len(self.out_by_type(relation, Membership))
+
+    ### Structural fingerprint
+    @staticmethod
+    def _structural_node_key(node: Node, include_values: bool) -> Tuple[str, ...]:
+        if type(node) == Value:
+            # Literals: only their position in the graph matters, unless values are included
+            return ("Value", str(node.label)) if include_values else ("Value",)
+        fields = [node.node_name, node.entity_name, node.label]
+        if type(node) == Relation:
+            fields += [node.alias or "", node.is_primary]
+        return (type(node).__name__, *map(str, fields))
+
+    @staticmethod
+    def _structural_edge_key(edge: Edge) -> Tuple[str, ...]:
+        return (type(edge).__name__, str(getattr(edge, "label", "")), str(int(getattr(edge, "op", -1))))
 
-        # Add edge if not exist
-        if (node1, node2) not in self.edges:
-            self.add_edge(node1, node2, data=edge)
+    @property
+    @cached_analysis
+    def _canonical_structures(self):
+        # (canonical structure, fingerprint) built so far, by value of include_values
+        return {}
+
+    def _canonical_structure_and_fingerprint(self, include_values: bool) -> Tuple[Tuple, int]:
+        structures = self._canonical_structures
+        if include_values not in structures:
+            node_keys = {node: self._structural_node_key(node, include_values) for node in self.nodes}
+            edges = [(src, self._structural_edge_key(edge), dst) for src, dst, edge in self.edges(data="data")]
+            # Tell values apart by the nodes they are connected to
+            neighborhoods = {node: [] for node in node_keys if type(node) == Value}
+            for src, edge_key, dst in edges:
+                if dst in neighborhoods:
+                    neighborhoods[dst].append(("in", edge_key, node_keys[src]))
+                if src in neighborhoods:
+                    neighborhoods[src].append(("out", edge_key, node_keys[dst]))
+            for value, neighborhood in neighborhoods.items():
+                node_keys[value] += tuple(sorted(neighborhood))
+            structure = (
+                tuple(sorted(node_keys.values())),
+                tuple(sorted((node_keys[src], edge_key, node_keys[dst]) for src, edge_key, dst in edges)),
+            )
+            structures[include_values] = (structure, stable_hash(repr(structure)))
+        return structures[include_values]
 
-    def connect_membership(self, relation, attribute):
-        self.unidirectional_connect(attribute, Membership(), relation)
+    def canonical_structure(self, include_values: bool = False) -> Tuple[Tuple, Tuple]:
+        """Return the sorted node keys and (src key, edge key, dst key) triples of the graph, which do not depend on the
+        insertion order. Values are keyed by their neighborhood (and their label with include_values), other nodes by
+        their type, names and label, and edges by their type, label and operator."""
+        return self._canonical_structure_and_fingerprint(include_values)[0]
 
-    def connect_selection(self, src_node, dst_node):
-        """Ususally relation-to-attribute
-        But, attribute-to-relation when correlation
-        """
-        self.unidirectional_connect(src_node, Selection(), dst_node)
+    def fingerprint(self, include_values: bool = False) -> int:
+        """Return a 64-bit hash of the canonical structure, stable across processes.
 
-    def connect_predicate(self, src_attribute, dst_node, operator=OperatorType.Equal):
-        """
-        dst node:
-            - attribute if join predicate.
-            - value or a set of values if selection predicate
+        By default, graphs of queries that only differ in their constants have the same fingerprint.
+        Confirm a match with has_same_structure before relying on it.
         """
-        self.unidirectional_connect(src_attribute, Predicate(operator), dst_node)
-
-    def connect_transformation(self, src_node, dst_node):
-        """NEEDCHECK: function_node to attribute or vice versa"""
-        self.unidirectional_connect(src_node, Transformation(), dst_node)
-
-    def connect_order(self, src_node, dst_attribute):
-        """relation-to-attribute or attribute-to-attribute if multiple order by columns"""
-        self.unidirectional_connect(src_node, Order(), dst_attribute)
-
-    def connect_grouping(self, src_node, dst_attribute):
-        """src_node: relation or attribute"""
-        self.unidirectional_connect(src_node, Grouping(), dst_attribute)
-
-    def connect_having(self, relation, attribute):
-        self.unidirectional_connect(relation, Having(), attribute)
-
-    def connect_join(self, relation1, r1_attribute, r2_attribute, relation2):
-        self.bidirectional_connect(relation1, Selection(), r1_attribute)
-        self.bidirectional_connect(r1_attribute, Predicate(), r2_attribute)
-        self.bidirectional_connect(relation2, Selection(), r2_attribute)
-
-    def connect_simplified_join(self, relation1, relation2, label1="", label2=""):
-        self.unidirectional_connect(relation1, Join(label1), relation2)
-        self.unidirectional_connect(relation2, Join(label2), relation1)
+        return self._canonical_structure_and_fingerprint(include_values)[1]
 
-    def connect(self, node1, node2):
-        self.unidirectional_connect(node1, Dummy_edge(), node2)
-
-    def draw(self):
-        labels = {key: f"{value.node_name}" for key, value in nx.get_node_attributes(self, "data").items()}
-        node_color_list = []
-        node_color_map = {
-            Relation: "red",
-            Attribute: "green",
-            Value: "blue",
-            Function: "pink",
-        }
-        node_color_list = [node_color_map.get(type(node), "black") for node in self]
-        nx.draw(self, nx.spring_layout(self), labels=labels, node_color=node_color_list)
+    def has_same_structure(self, other: "QueryGraphAnalysis", include_values: bool = False) -> bool:
+        return self.fingerprint(include_values) == other.fingerprint(include_values) and self.canonical_structure(
+            include_values
+        ) == other.canonical_structure(include_values)
 
     ### Utils for traversal
     def all_edges_of(self, node: Node) -> List[Tuple[Node, Node]]:
@@ -524,7 +859,7 @@ class Query_graph(nx.DiGraph):
         return [(src, node) for src in incoming_nodes] + [(node, dst) for dst in outgoing_nodes]
 
     def get_one_hop_path_of(self, node):
-        return [(src, self.edges[src, dst]["data"], dst) for src, dst in self.edges(node)]
+        return [(node, self.get_edge(node, dst), dst) for dst in self.successors(node)]
 
     def get_neighbors(self, node):
         """Return neighbors who connected to this node with outgoging edges
@@ -539,21 +874,29 @@ class Query_graph(nx.DiGraph):
 
         :param node: node the begin the traversal
         :type node: Node
+        :param visited_nodes: nodes to treat as already visited (not modified)
         """
-        if visited_nodes is None:
-            visited_nodes = set()
-        # For all outgoing edges
-        visited_nodes.add(node)
+        index = self.traversal_index
+        node_id = index.node_ids[node]
+        out_going_ids, relation_mask = index.out_going_ids, index.relation_mask
+        visited = self._to_visited_mask(visited_nodes) | (1 << node_id)
         leaf_nodes = []
-        for dst in self.get_out_going_nodes(node):
-            if dst not in visited_nodes:
-                if (
-                    type(dst) == Relation
-                    and self.number_of_non_visited_relation_nodes(dst, copy.deepcopy(visited_nodes)) == 0
-                ):
-                    leaf_nodes.append(dst)
+        # Depth-first traversal with a stack of out-going node iterators, in the same order as the recursive definition
+        stack = [iter(out_going_ids[node_id])]
+        while stack:
+            for dst_id in stack[-1]:
+                bit = 1 << dst_id
+                if visited & bit:
+                    continue
+                # The count runs on a snapshot of the visited nodes: ints are immutable, so nothing to copy
+                if relation_mask & bit and self._count_non_visited_relation_nodes(dst_id, visited)[0] == 0:
+                    leaf_nodes.append(index.nodes[dst_id])
                 else:
-                    leaf_nodes.extend(self.get_leaf_nodes(dst, visited_nodes))
+                    visited |= bit
+                    stack.append(iter(out_going_ids[dst_id]))
+                    break
+            else:
+                stack.pop()
         return leaf_nodes
 
     def get_branching_points(self, node: Node, visited_nodes: Set = None):
@@ -561,18 +904,30 @@ class Query_graph(nx.DiGraph):
 
         :param node: node the begin the traversal
         :type node: Node
+        :param visited_nodes: nodes to treat as already visited (not modified)
         """
-        if visited_nodes is None:
-            visited_nodes = set()
-        # For all outgoing edges
-        visited_nodes.add(node)
+        index = self.traversal_index
+        node_id = index.node_ids[node]
+        out_going_ids, relation_mask = index.out_going_ids, index.relation_mask
+        visited = self._to_visited_mask(visited_nodes) | (1 << node_id)
         branching_points = []
-        for dst in self.get_out_going_nodes(node):
-            if dst not in visited_nodes:
-                if type(dst) == Relation and self.number_of_non_visited_relation_nodes(dst, visited_nodes) > 1:
-                    branching_points.append(dst)
-                else:
-                    branching_points.extend(self.get_branching_points(dst, visited_nodes))
+        stack = [iter(out_going_ids[node_id])]
+        while stack:
+            for dst_id in stack[-1]:
+                bit = 1 << dst_id
+                if visited & bit:
+                    continue
+                if relation_mask & bit:
+                    # Unlike get_leaf_nodes, nodes visited while counting stay visited
+                    num, visited = self._count_non_visited_relation_nodes(dst_id, visited)
+                    if num > 1:
+                        branching_points.append(index.nodes[dst_id])
+                        continue
+                visited |= bit
+                stack.append(iter(out_going_ids[dst_id]))
+                break
+            else:
+                stack.pop()
         return branching_points
 
     def number_of_non_visited_relation_nodes(self, node: Node, visited_nodes: Optional[Set[Node]] = None):
@@ -581,51 +936,57 @@ class Query_graph(nx.DiGraph):
 
         :param node: node the begin the traversal
         :type node: Node
+        :param visited_nodes: nodes to treat as already visited (not modified)
         """
-        # Initialize
-        if visited_nodes is None:
-            visited_nodes = set()
+        node_id = self.traversal_index.node_ids[node]
+        return self._count_non_visited_relation_nodes(node_id, self._to_visited_mask(visited_nodes))[0]
+
+    def _count_non_visited_relation_nodes(self, node_id: int, visited: int) -> Tuple[int, int]:
+        """number_of_non_visited_relation_nodes over node ids
 
-        # For all outgoing edges
-        visited_nodes.add(node)
+        :return: the number of relations and the visited bitmask extended with the nodes visited by the traversal
+        """
+        index = self.traversal_index
+        out_going_ids, relation_mask = index.out_going_ids, index.relation_mask
+        visited |= 1 << node_id
         num = 0
-        for dst in self.get_out_going_nodes(node):
-            if dst not in visited_nodes:
-                if type(dst) == Relation:
+        stack = [iter(out_going_ids[node_id])]
+        while stack:
+            for dst_id in stack[-1]:
+                bit = 1 << dst_id
+                if visited & bit:
+                    continue
+                if relation_mask & bit:
+                    # Relations are counted but not marked, so a relation reached through several paths counts several times
                     num += 1
                 else:
-                    num += self.number_of_non_visited_relation_nodes(dst, visited_nodes)
-        return num
+                    visited |= bit
+                    stack.append(iter(out_going_ids[dst_id]))
+                    break
+            else:
+                stack.pop()
+        return num, visited
 
-    # Basic Graph Related Utility
-    def get_out_going_nodes(self, node: Node) -> List[Node]:
-        dst = map(lambda node_pair: node_pair[1], super().out_edges(node))
-        # Filter the node itself
-        dst = list(filter(lambda x: x != node, dst))
-        return dst
+    def has_path(self, src: Node, dst: Node) -> bool:
+        return self.reachability_index.has_path(src, dst)
 
-    def get_incoming_nodes(self, node: Node) -> List[Node]:
-        src = map(lambda node_pair: node_pair[0], super().in_edges(node))
-        # Filter the node itself
-        src = list(filter(lambda x: x != node, src))
-        return src
+    def shortest_path_length(self, src: Node, dst: Node) -> int:
+        return self.reachability_index.shortest_path_length(src, dst)
 
-    def get_edge(self, src: Node, dst: Node) -> Edge:
-        try:
-            return self.edges[src, dst]["data"]
-        except Exception as e:
-            stop = 1
-            raise e
+    def out_by_type(self, node: Node, edge_type: type) -> Tuple[Node, ...]:
+        """Return the out-going nodes of node connected through edges of exactly the given type"""
+        return self.typed_adjacency.out_by_type(node, edge_type)
 
-    def has_path(self, src: Node, dst: Node) -> bool:
-        return nx.has_path(self, src, dst)
+    def in_by_type(self, node: Node, edge_type: type) -> Tuple[Node, ...]:
+        """Return the incoming nodes of node connected through edges of exactly the given type"""
+        return self.typed_adjacency.in_by_type(node, edge_type)
 
     def has_membership_edge(self, node: Node) -> bool:
-        return any([type(self.get_edge(src, dst)) == Membership for src, dst in self.in_edges(node)])
+        return len(self.in_by_type(node, Membership)) > 0
 
     def get_membership_nodes(self, node: Node) -> List[Node]:
         assert (type(node) == Relation, f"The input node should be a relation, but found {type(node)}")
-        attributes = [src for src, dst in self.in_edges(node) if type(self.get_edge(src, dst)) == Membership]
+        attributes = list(self.in_by_type(node, Membership))
         assert all(
             [type(att) == Attribute for att in attributes]
         ), "nodes connected to relation through membership edges should all be attributes"
@@ -633,9 +994,7 @@ class Query_graph(nx.DiGraph):
 
     def get_function_node_from(self, node: Node) -> Union[Node, None]:
         # We assume incoming nodes only
-        function_nodes = list(
-            filter(lambda dst: type(self.get_edge(node, dst)) == Transformation, self.get_out_going_nodes(node))
-        )
+        function_nodes = self.out_by_type(node, Transformation)
         assert len(function_nodes) < 2, f"Unexpected number of agg func to one attribute, found {len(function_nodes)}"
         function_node = function_nodes[0] if len(function_nodes) > 0 else None
         if function_node:
@@ -644,11 +1003,293 @@ class Query_graph(nx.DiGraph):
 
     def get_function_node_to(self, node: Node) -> Union[Node, None]:
         # We assume incoming nodes only
-        function_nodes = list(
-            filter(lambda src: type(self.get_edge(src, node)) == Transformation, self.get_incoming_nodes(node))
-        )
+        function_nodes = self.in_by_type(node, Transformation)
         assert len(function_nodes) < 2, f"Unexpected number of agg func to one attribute, found {len(function_nodes)}"
         function_node = function_nodes[0] if len(function_nodes) > 0 else None
         if function_node:
             assert type(function_node) == Function, f"Unexpected type of function node, found {type(function_node)}"
         return function_node
+
+
+class Query_graph(QueryGraphAnalysis, nx.DiGraph):
+    """Query graph of Koutrika et al. (2010).
+
+    The nodes and edges are always stored by networkx (views, pickling, draw and networkx algorithms
+    keep working), while the traversal primitives (get_out_going_nodes, get_incoming_nodes, get_edge
+    and the reachability index) are answered by a GraphBackend that mirrors every mutation.
+
+    :param node_name: name of the graph
+    :param rp_dist_threshold: maximum distance between a relation and its closest reference point
+    :param graph_backend: name of the GraphBackend ("networkx" reads the graph's own storage, "adjacency"
+        keeps a pure-Python adjacency list). Not called backend, which networkx reserves for its dispatching
+    """
+
+    def __init__(self, node_name="", rp_dist_threshold=4, graph_backend=NetworkxBackend.name):
+        # The analysis cache must exist before networkx calls any of the mutation hooks
+        self._init_analysis_cache()
+        super().__init__()
+        self._graph_backend: GraphBackend = get_graph_backend(graph_backend).from_graph(self)
+        self.node_name = node_name
+        self._query_subjects = None
+        self.reference_point_distance_threshold = rp_dist_threshold
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Derived analyses are cheap to rebuild, so do not persist them
+        state["_analysis_cache"] = {}
+        # The backend mirrors the networkx storage, so only its name is persisted
+        state["_graph_backend"] = self._graph_backend.name
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        # Graphs pickled before the analysis cache was introduced
+        if "_analysis_cache" not in state:
+            self._init_analysis_cache()
+            for stale_attribute in ["_branching_relations", "_leaf_relations"]:
+                state.pop(stale_attribute, None)
+            state["_reference_point_distance_threshold"] = state.pop("reference_point_distance_threshold", 4)
+        # Graphs pickled before the graph backends were introduced use networkx
+        backend = state.pop("_graph_backend", NetworkxBackend.name)
+        self.__dict__.update(state)
+        self._graph_backend = get_graph_backend(backend).from_graph(self)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple], node_name="", rp_dist_threshold=4, graph_backend=NetworkxBackend.name):
+        """Build a graph from (src, edge, dst) records in a single bulk insertion.
+
+        The result is the same as calling unidirectional_connect(src, edge, dst) for each record in order:
+        equal nodes are merged and only the first edge between two nodes is kept.
+
+        A node is a Node or a tuple of a kind of NODE_KINDS and the constructor arguments,
+        e.g., ("attribute", "movie.title", "title"). An edge is an Edge, a kind of EDGE_KINDS or such a tuple,
+        e.g., "membership", ("predicate", OperatorType.GreaterThan) or ("join", "starring").
+
+        :param edges: records to insert
+        """
+        query_graph = cls(node_name, rp_dist_threshold, graph_backend)
+        # Fill the networkx adjacency directly: the layout of add_nodes_from/add_edges_from, without their per-item checks
+        node_data, succ, pred = query_graph._node, query_graph._succ, query_graph._pred
+        # Specs repeat within a graph: build each node and edge once
+        built_nodes, built_edges = {}, {}
+        for src_spec, edge_spec, dst_spec in edges:
+            endpoints = []
+            for spec in (src_spec, dst_spec):
+                node = built_nodes.get(spec)
+                if node is None:
+                    node = _build_from_spec(spec, NODE_KINDS, Node)
+                    if node in node_data:
+                        # Equal nodes are merged into the first one, as in add_node_if_not_exist
+                        node = node_data[node]["data"]
+                    else:
+                        node_data[node] = {"data": node}
+                        succ[node] = {}
+                        pred[node] = {}
+                    built_nodes[spec] = node
+                endpoints.append(node)
+            src, dst = endpoints
+            # Only the first edge between two nodes is kept
+            if dst not in succ[src]:
+                edge = built_edges.get(edge_spec)
+                if edge is None:
+                    edge = built_edges[edge_spec] = _build_from_spec(edge_spec, EDGE_KINDS, Edge)
+                succ[src][dst] = pred[dst][src] = {"data": edge}
+
+        query_graph._sync_graph_backend()
+        query_graph.invalidate_analysis_cache()
+        return query_graph
+
+    @property
+    def backend(self) -> GraphBackend:
+        return self._graph_backend
+
+    def _sync_graph_backend(self):
+        # Rebuild the backend after bulk mutations (rare: copies and subgraphs)
+        self._graph_backend = type(self._graph_backend).from_graph(self)
+
+    def set_backend(self, backend: str):
+        """Switch to another GraphBackend (e.g., "adjacency" for a graph built with the default backend)"""
+        self._graph_backend = get_graph_backend(backend).from_graph(self)
+        self.invalidate_analysis_cache()
+
+    ### Analysis cache
+    @property
+    def reference_point_distance_threshold(self):
+        return self._reference_point_distance_threshold
+
+    @reference_point_distance_threshold.setter
+    def reference_point_distance_threshold(self, value):
+        self._reference_point_distance_threshold = value
+        self.invalidate_analysis_cache()
+
+    def freeze(self):
+        """Return an immutable FrozenQueryGraph snapshot (CSR arrays) that the translation algorithms can run on"""
+        # Imported here since the frozen graph module builds on this one
+        from pylogos.query_graph.frozen_query_graph import FrozenQueryGraph
+
+        return FrozenQueryGraph(self)
+
+    def invalidate_analysis_cache(self):
+        """Drop all cached analyses. Mutations through the graph API call this automatically,
+        but it must be called manually after modifying a node (e.g., is_primary) in place."""
+        self._revision += 1
+        self._analysis_cache.clear()
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._graph_backend.add_node(node_for_adding)
+        self.invalidate_analysis_cache()
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self._graph_backend.remove_node(n)
+        self.invalidate_analysis_cache()
+
+    def remove_nodes_from(self, nodes):
+        super().remove_nodes_from(nodes)
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._graph_backend.add_edge(u_of_edge, v_of_edge, self._succ[u_of_edge][v_of_edge].get("data"))
+        self.invalidate_analysis_cache()
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        super().add_edges_from(ebunch_to_add, **attr)
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._graph_backend.remove_edge(u, v)
+        self.invalidate_analysis_cache()
+
+    def remove_edges_from(self, ebunch):
+        super().remove_edges_from(ebunch)
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    def clear(self):
+        super().clear()
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    def clear_edges(self):
+        super().clear_edges()
+        self._sync_graph_backend()
+        self.invalidate_analysis_cache()
+
+    ### Utils for graph construction
+    def add_node_if_not_exist(self, node):
+        if node not in self:
+            # The mutation drops the analysis cache, but the node registry can be updated in place
+            node_registry = self._analysis_cache.get("node_registry")
+            self.add_node(node, data=node)
+            if node_registry is not None:
+                node_registry.add(node)
+                self._analysis_cache["node_registry"] = node_registry
+
+    def bidirectional_connect(self, node1, edge, node2):
+        # Edges are immutable, so both directions can share the instance
+        self.unidirectional_connect(node1, edge, node2)
+        self.unidirectional_connect(node2, edge, node1)
+
+    def unidirectional_connect(self, node1, edge, node2):
+        # The mutations below drop the analysis cache, but the node registry and the typed adjacency can be updated in place
+        node_registry = self._analysis_cache.get("node_registry")
+        typed_adjacency = self._analysis_cache.get("typed_adjacency")
+
+        # Add node if not exist
+        self.add_node_if_not_exist(node1)
+        self.add_node_if_not_exist(node2)
+
+        # Add edge if not exist
+        if not self._graph_backend.has_edge(node1, node2):
+            self.add_edge(node1, node2, data=edge)
+            if typed_adjacency is not None:
+                typed_adjacency.add(node1, edge, node2)
+
+        if node_registry is not None:
+            self._analysis_cache["node_registry"] = node_registry
+        if typed_adjacency is not None:
+            self._analysis_cache["typed_adjacency"] = typed_adjacency
+
+    def connect_membership(self, relation, attribute):
+        self.unidirectional_connect(attribute, Membership(), relation)
+
+    def connect_selection(self, src_node, dst_node):
+        """Ususally relation-to-attribute
+        But, attribute-to-relation when correlation
+        """
+        self.unidirectional_connect(src_node, Selection(), dst_node)
+
+    def connect_predicate(self, src_attribute, dst_node, operator=OperatorType.Equal):
+        """
+        dst node:
+            - attribute if join predicate.
+            - value or a set of values if selection predicate
+        """
+        self.unidirectional_connect(src_attribute, Predicate(operator), dst_node)
+
+    def connect_transformation(self, src_node, dst_node):
+        """NEEDCHECK: function_node to attribute or vice versa"""
+        self.unidirectional_connect(src_node, Transformation(), dst_node)
+
+    def connect_order(self, src_node, dst_attribute):
+        """relation-to-attribute or attribute-to-attribute if multiple order by columns"""
+        self.unidirectional_connect(src_node, Order(), dst_attribute)
+
+    def connect_grouping(self, src_node, dst_attribute):
+        """src_node: relation or attribute"""
+        self.unidirectional_connect(src_node, Grouping(), dst_attribute)
+
+    def connect_having(self, relation, attribute):
+        self.unidirectional_connect(relation, Having(), attribute)
+
+    def connect_join(self, relation1, r1_attribute, r2_attribute, relation2):
+        self.bidirectional_connect(relation1, Selection(), r1_attribute)
+        self.bidirectional_connect(r1_attribute, Predicate(), r2_attribute)
+        self.bidirectional_connect(relation2, Selection(), r2_attribute)
+
+    def connect_simplified_join(self, relation1, relation2, label1="", label2=""):
+        self.unidirectional_connect(relation1, Join(label1), relation2)
+        self.unidirectional_connect(relation2, Join(label2), relation1)
+
+    def connect(self, node1, node2):
+        self.unidirectional_connect(node1, Dummy_edge(), node2)
+
+    def draw(self):
+        labels = {key: f"{value.node_name}" for key, value in nx.get_node_attributes(self, "data").items()}
+        node_color_list = []
+        node_color_map = {
+            Relation: "red",
+            Attribute: "green",
+            Value: "blue",
+            Function: "pink",
+        }
+        node_color_list = [node_color_map.get(type(node), "black") for node in self]
+        nx.draw(self, nx.spring_layout(self), labels=labels, node_color=node_color_list)
+
+    # Basic Graph Related Utility
+    def get_out_going_nodes(self, node: Node) -> List[Node]:
+        # Filter the node itself
+        return [dst for dst in self._graph_backend.successors(node) if dst != node]
+
+    def get_incoming_nodes(self, node: Node) -> List[Node]:
+        # Filter the node itself
+        return [src for src in self._graph_backend.predecessors(node) if src != node]
+
+    def get_edge(self, src: Node, dst: Node) -> Edge:
+        return self._graph_backend.get_edge(src, dst)
+
+    @property
+    @cached_analysis
+    def reachability_index(self):
+        """BFS distances between nodes, built from the backend and shared by all path queries until the graph is mutated"""
+        return ReachabilityIndex(self._graph_backend)
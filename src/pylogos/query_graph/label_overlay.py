@@ -0,0 +1,55 @@
+import copy
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class LabelOverlay:
+    """Labels and entity names of nodes for a single translation, kept apart from the nodes.
+
+    Graphs and their nodes are shared by all translations (and threads), so the algorithms never write
+    to them: a label rewritten for one translation goes in its overlay instead. The overlay holds a copy
+    of every overridden node with the new fields, which the algorithms use in place of the node.
+    Copies are equal to and hash like their node, so they can be compared with the nodes of the graph.
+
+    Entries are keyed by the identity of the node, as distinct Value nodes may compare equal.
+
+    :param base: overlay whose fields apply to the nodes that this overlay does not override (never modified)
+    """
+
+    def __init__(self, base: Optional["LabelOverlay"] = None):
+        self.base = base
+        # id(node) -> (node, overlaid copy). The node is kept to pin its id
+        self._nodes: Dict[int, Tuple[Hashable, Hashable]] = {}
+
+    def __len__(self):
+        """Number of nodes overridden by this overlay (not counting its base)"""
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return id(node) in self._nodes or (self.base is not None and node in self.base)
+
+    def set(self, node, label: Optional[str] = None, entity_name: Optional[str] = None) -> None:
+        """Override the label and/or the entity name of node"""
+        entry = self._nodes.get(id(node))
+        # Copies of the node made by the base overlay are not ours to modify
+        overlaid = entry[1] if entry is not None else copy.copy(self.apply(node))
+        if label is not None:
+            overlaid.label = label
+        if entity_name is not None:
+            overlaid.entity_name = entity_name
+        self._nodes[id(node)] = (node, overlaid)
+
+    def add_suffix(self, node, suffix: str) -> None:
+        self.set(node, label=self.label(node) + suffix)
+
+    def apply(self, node):
+        """Return node with the overridden fields (node itself if it has none)"""
+        entry = self._nodes.get(id(node))
+        if entry is not None:
+            return entry[1]
+        return node if self.base is None else self.base.apply(node)
+
+    def label(self, node) -> str:
+        return self.apply(node).label
+
+    def entity_name(self, node) -> str:
+        return self.apply(node).entity_name
@@ -0,0 +1,74 @@
+import itertools
+from collections.abc import Sequence
+from typing import Dict, Hashable, Iterable, List, Tuple, Type
+
+
+class NodeView(Sequence):
+    """Read-only, insertion-ordered view of the nodes of one type in a NodeRegistry.
+
+    A view covers the nodes registered when it was created: nodes added to the registry afterwards
+    are not visible through it. Creating a view, len and membership tests are O(1).
+    """
+
+    __slots__ = ("_nodes", "_positions", "_length")
+
+    def __init__(self, nodes: List[Hashable], positions: Dict[Hashable, int], length: int):
+        self._nodes = nodes
+        self._positions = positions
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._nodes[: self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("NodeView index out of range")
+        return self._nodes[index]
+
+    def __iter__(self):
+        return itertools.islice(self._nodes, self._length)
+
+    def __contains__(self, node):
+        position = self._positions.get(node)
+        return position is not None and position < self._length
+
+    def __eq__(self, other):
+        if isinstance(other, (NodeView, list, tuple)):
+            return len(self) == len(other) and all(node1 == node2 for node1, node2 in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+
+class NodeRegistry:
+    """Nodes of a graph partitioned by their (exact) type, in insertion order.
+
+    Nodes can only be added; a registry for a graph with removed nodes must be rebuilt.
+
+    :param nodes: nodes to register, in order
+    :param node_types: types of nodes to keep track of (other nodes are ignored)
+    """
+
+    def __init__(self, nodes: Iterable[Hashable], node_types: Tuple[Type, ...]):
+        self._nodes: Dict[Type, List[Hashable]] = {node_type: [] for node_type in node_types}
+        self._positions: Dict[Type, Dict[Hashable, int]] = {node_type: {} for node_type in node_types}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Hashable) -> None:
+        positions = self._positions.get(type(node))
+        if positions is None or node in positions:
+            return None
+        positions[node] = len(positions)
+        self._nodes[type(node)].append(node)
+
+    def view(self, node_type: Type) -> NodeView:
+        nodes = self._nodes[node_type]
+        return NodeView(nodes, self._positions[node_type], len(nodes))
@@ -4,6 +4,9 @@ import networkx as nx
 from abc import *
 from enum import IntEnum
 
+from pylogos.query_graph.graph_backend import NetworkxBackend, get_graph_backend
+from pylogos.query_graph.slots import SlotsPickleMixin
+
 
 # Type Definition
 class AggregationType(IntEnum):
@@ -63,7 +66,10 @@ class OrderingType(IntEnum):
 
 
 # Node
-class Node(metaclass=ABCMeta):
+class Node(SlotsPickleMixin, metaclass=ABCMeta):
+    # ori: the node of the original graph, set on copies of a graph during template selection
+    __slots__ = ("name", "edges", "query_block_idx", "nesting_level", "schema_template", "abbre", "ori")
+
     def __init__(self, name, query_block_idx=0, nesting_level=0):
         self.name = name
         self.edges = None  # Outgoing edges
@@ -101,6 +107,8 @@ class Node(metaclass=ABCMeta):
 
 
 class Relation(Node):
+    __slots__ = ()
+
     def __init__(self, name, query_block_idx=0, nesting_level=0):
         super().__init__(
             name, query_block_idx=query_block_idx, nesting_level=nesting_level
@@ -116,6 +124,8 @@ class Relation(Node):
 
 
 class Attribute(Node):
+    __slots__ = ()
+
     def __init__(self, name, query_block_idx=0, nesting_level=0):
         super().__init__(
             name, query_block_idx=query_block_idx, nesting_level=nesting_level
@@ -130,6 +140,8 @@ class Attribute(Node):
 
 
 class Value(Node):
+    __slots__ = ()
+
     def __init__(self, name, query_block_idx=0, nesting_level=0):
         super().__init__(
             name, query_block_idx=query_block_idx, nesting_level=nesting_level
@@ -142,6 +154,8 @@ class Value(Node):
 
 
 class Function(Node):
+    __slots__ = ()
+
     def __init__(self, aggregation_type, query_block_idx=0, nesting_level=0):
         super().__init__(
             aggregationTypeToName[aggregation_type],
@@ -156,7 +170,10 @@ class Function(Node):
 
 
 # Edge
-class Edge(metaclass=ABCMeta):
+class Edge(SlotsPickleMixin, metaclass=ABCMeta):
+    # ori: the edge of the original graph, set on copies of a graph during template selection
+    __slots__ = ("name", "abbre", "src", "dst", "ori")
+
     def __init__(self, name, src, dst):
         self.name = name
         self.abbre = "Edge"
@@ -186,6 +203,8 @@ class Edge(metaclass=ABCMeta):
 
 
 class Projection(Edge):
+    __slots__ = ()
+
     def __init__(self, src, dst):
         super().__init__("projection", src=src, dst=dst)
         self.abbre = "Proj"
@@ -196,6 +215,8 @@ class Projection(Edge):
 
 
 class Join(Edge):
+    __slots__ = ()
+
     def __init__(self, src, dst):
         super().__init__("join", src=src, dst=dst)
         self.abbre = "Join"
@@ -206,6 +227,8 @@ class Join(Edge):
 
 
 class Selection(Edge):
+    __slots__ = ("operation_idx",)
+
     def __init__(self, src, dst, operation_idx=0):
         super().__init__("selection", src=src, dst=dst)
         self.abbre = "Sel"
@@ -218,6 +241,8 @@ class Selection(Edge):
 
 
 class Grouping(Edge):
+    __slots__ = ()
+
     def __init__(self, src, dst):
         super().__init__("grouping", src=src, dst=dst)
         self.abbre = "Group"
@@ -228,6 +253,8 @@ class Grouping(Edge):
 
 
 class Having(Edge):
+    __slots__ = ("operation_idx",)
+
     def __init__(self, src, dst, operation_idx=0):
         super().__init__("having", src=src, dst=dst)
         self.abbre = "Hav"
@@ -240,6 +267,8 @@ class Having(Edge):
 
 
 class Ordering(Edge):
+    __slots__ = ("type",)
+
     def __init__(self, src, dst, ordering_direction=OrderingType.Ascending):
         super().__init__("ordering", src=src, dst=dst)
         self.abbre = "Ord"
@@ -251,6 +280,8 @@ class Ordering(Edge):
 
 
 class Operation(Edge):
+    __slots__ = ("operator_name",)
+
     def __init__(self, op_type, src, dst):
         super().__init__("operation", src=src, dst=dst)
         self.abbre = "Op"
@@ -263,6 +294,8 @@ class Operation(Edge):
 
 
 class Aggregation(Edge):
+    __slots__ = ()
+
     def __init__(self, src, dst):
         super().__init__("aggregation", src=src, dst=dst)
         self.abbre = "Agg"
@@ -273,6 +306,8 @@ class Aggregation(Edge):
 
 
 class Limit(Edge):
+    __slots__ = ()
+
     def __init__(self, src, dst):
         super().__init__("limit", src=src, dst=dst)
 
@@ -282,8 +317,68 @@ class Limit(Edge):
 
 
 class Query_graph(nx.DiGraph):
-    def __init__(self):
+    def __init__(self, graph_backend=NetworkxBackend.name):
         super().__init__()
+        # Mirrors the networkx storage and answers the neighbor and edge lookups of the traversals
+        self._graph_backend = get_graph_backend(graph_backend).from_graph(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_graph_backend"] = self._graph_backend.name
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        backend = state.pop("_graph_backend", NetworkxBackend.name)
+        self.__dict__.update(state)
+        self._graph_backend = get_graph_backend(backend).from_graph(self)
+
+    @property
+    def backend(self):
+        return self._graph_backend
+
+    def _sync_graph_backend(self):
+        self._graph_backend = type(self._graph_backend).from_graph(self)
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._graph_backend.add_node(node_for_adding)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self._sync_graph_backend()
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self._graph_backend.remove_node(n)
+
+    def remove_nodes_from(self, nodes):
+        super().remove_nodes_from(nodes)
+        self._sync_graph_backend()
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._graph_backend.add_edge(u_of_edge, v_of_edge, self._succ[u_of_edge][v_of_edge].get("data"))
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        super().add_edges_from(ebunch_to_add, **attr)
+        self._sync_graph_backend()
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._graph_backend.remove_edge(u, v)
+
+    def remove_edges_from(self, ebunch):
+        super().remove_edges_from(ebunch)
+        self._sync_graph_backend()
+
+    def clear(self):
+        super().clear()
+        self._sync_graph_backend()
+
+    def clear_edges(self):
+        super().clear_edges()
+        self._sync_graph_backend()
 
     @property
     def root(self):
@@ -313,8 +408,8 @@ class Query_graph(nx.DiGraph):
 
         def is_for_join(n1, edge, n2):
             # (Join edge) or (equality edge for join)
-            return type(edge["data"]) == Join or (
-                type(edge["data"]) == Operation
+            return type(edge) == Join or (
+                type(edge) == Operation
                 and type(n1) == Attribute
                 and type(n2) == Attribute
             )
@@ -331,13 +426,10 @@ class Query_graph(nx.DiGraph):
             self.visited_nodes.append(given_node)
         # Main logic
         ## Find all outgoing and incoming edges. (If has outgoging join and incoming join, remove incoming join condition)
-        for neighbor in self.neighbors(given_node):
-            out_edge = self.edges[given_node, neighbor]
-            # TODO: Change try and catch to checking logic
-            try:
-                in_edge = self.edges[neighbor, given_node]
-            except:
-                in_edge = None
+        backend = self._graph_backend
+        for neighbor in backend.successors(given_node):
+            out_edge = backend.get_edge(given_node, neighbor)
+            in_edge = backend.get_edge(neighbor, given_node) if backend.has_edge(neighbor, given_node) else None
             # Remove incoming join edge
             if (
                 in_edge
@@ -347,7 +439,7 @@ class Query_graph(nx.DiGraph):
                 self.remove_edge(neighbor, given_node)
 
         ## For all outgoing nodes, recursive call
-        for neighbor in self.neighbors(given_node):
+        for neighbor in backend.successors(given_node):
             self.set_join_directions(neighbor)
 
         # Clean up at initial call
@@ -0,0 +1,121 @@
+import math
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import networkx as nx
+import numpy as np
+
+UNREACHABLE = -1
+
+
+class ReachabilityIndex:
+    """Shortest path lengths (in number of edges) between the nodes of a directed graph.
+
+    Each source node is expanded with a single BFS the first time it is queried, after which
+    has_path and shortest_path_length are answered in O(1). The index is a snapshot: it must be
+    rebuilt when the graph changes (Query_graph does this through its analysis cache).
+
+    :param graph: a networkx-like directed graph (only nodes and successors are used)
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        self.nodes: List[Hashable] = list(graph.nodes)
+        self.node_ids: Dict[Hashable, int] = {node: idx for idx, node in enumerate(self.nodes)}
+        self.successor_ids: List[List[int]] = [
+            [self.node_ids[dst] for dst in graph.successors(node)] for node in self.nodes
+        ]
+        self._predecessor_ids: Optional[List[List[int]]] = None
+        self._distances: Dict[int, List[int]] = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def predecessor_ids(self) -> List[List[int]]:
+        if self._predecessor_ids is None:
+            # Built aside and then published, so that concurrent readers never see a partial list
+            predecessor_ids = [[] for _ in self.nodes]
+            for src_id, dst_ids in enumerate(self.successor_ids):
+                for dst_id in dst_ids:
+                    predecessor_ids[dst_id].append(src_id)
+            self._predecessor_ids = predecessor_ids
+        return self._predecessor_ids
+
+    def _node_id(self, node: Hashable) -> int:
+        try:
+            return self.node_ids[node]
+        except KeyError:
+            raise nx.NodeNotFound(f"Node {node} is not in the graph")
+
+    def _distances_from(self, src_id: int) -> List[int]:
+        distances = self._distances.get(src_id)
+        if distances is None:
+            distances = [UNREACHABLE] * len(self.nodes)
+            distances[src_id] = 0
+            frontier = [src_id]
+            depth = 0
+            while frontier:
+                depth += 1
+                next_frontier = []
+                for node_id in frontier:
+                    for dst_id in self.successor_ids[node_id]:
+                        if distances[dst_id] == UNREACHABLE:
+                            distances[dst_id] = depth
+                            next_frontier.append(dst_id)
+                frontier = next_frontier
+            self._distances[src_id] = distances
+        return distances
+
+    def distances_from(self, src: Hashable) -> Dict[Hashable, int]:
+        """Return the distance from src to every node reachable from it"""
+        distances = self._distances_from(self._node_id(src))
+        return {self.nodes[dst_id]: distance for dst_id, distance in enumerate(distances) if distance != UNREACHABLE}
+
+    def has_path(self, src: Hashable, dst: Hashable) -> bool:
+        return self._distances_from(self._node_id(src))[self._node_id(dst)] != UNREACHABLE
+
+    def shortest_path_length(self, src: Hashable, dst: Hashable) -> int:
+        distance = self._distances_from(self._node_id(src))[self._node_id(dst)]
+        if distance == UNREACHABLE:
+            raise nx.NetworkXNoPath(f"Node {dst} not reachable from {src}")
+        return distance
+
+    def distance_matrix(self, nodes: Iterable[Hashable]) -> np.ndarray:
+        """Return a dense matrix M where M[i, j] is the distance from nodes[i] to nodes[j] (UNREACHABLE if no path)"""
+        node_ids = [self._node_id(node) for node in nodes]
+        matrix = np.full((len(node_ids), len(node_ids)), UNREACHABLE, dtype=np.int32)
+        for row, src_id in enumerate(node_ids):
+            distances = self._distances_from(src_id)
+            matrix[row] = [distances[dst_id] for dst_id in node_ids]
+        return matrix
+
+    def relax(self, distances: List[float], src_ids: Iterable[int], reverse: bool = False) -> List[float]:
+        """Lower, in place, each entry of distances to its distance from the closest of the given sources.
+
+        Starting from math.inf everywhere, this is a multi-source BFS. Calling it again with new sources
+        only expands the nodes that get closer, so growing a source set one node at a time stays cheap.
+
+        :param distances: distance of every node id to the current source set
+        :param src_ids: ids of the nodes to add to the source set
+        :param reverse: follow edges backwards, i.e., compute distances to the sources instead of from them
+        """
+        neighbor_ids = self.predecessor_ids if reverse else self.successor_ids
+        frontier = []
+        for src_id in src_ids:
+            if distances[src_id] != 0:
+                distances[src_id] = 0
+                frontier.append(src_id)
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for node_id in frontier:
+                for next_id in neighbor_ids[node_id]:
+                    if distances[next_id] > depth:
+                        distances[next_id] = depth
+                        next_frontier.append(next_id)
+            frontier = next_frontier
+        return distances
+
+    def new_distances(self) -> List[float]:
+        """Return a distance list to be filled by relax"""
+        return [math.inf] * len(self.nodes)
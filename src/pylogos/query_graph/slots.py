@@ -0,0 +1,52 @@
+import copy
+import functools
+from typing import Tuple
+
+
+@functools.lru_cache(maxsize=None)
+def slot_names(cls: type) -> Tuple[str, ...]:
+    """Return the names of all slots declared along the MRO of cls"""
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        for name in [slots] if isinstance(slots, str) else slots:
+            if name not in ("__dict__", "__weakref__") and name not in names:
+                names.append(name)
+    return tuple(names)
+
+
+class SlotsPickleMixin:
+    """Pickle support for classes that moved their attributes from __dict__ to __slots__.
+
+    The state is pickled as a plain dict of the assigned slots, which is also the format of objects
+    pickled before __slots__ was introduced, so files can be exchanged between both versions.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in slot_names(type(self)) if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        # Default state of slotted objects is (instance dict, slot dict)
+        if isinstance(state, tuple):
+            instance_state, slot_state = state
+            state = {**(instance_state or {}), **(slot_state or {})}
+        names = slot_names(type(self))
+        for name, value in state.items():
+            # Attributes that are no longer part of the class are dropped
+            if name in names:
+                object.__setattr__(self, name, value)
+
+    def __deepcopy__(self, memo):
+        # Same result as the default deepcopy through __getstate__/__setstate__, without building the state dict
+        cls = type(self)
+        copied = cls.__new__(cls)
+        memo[id(self)] = copied
+        for name in slot_names(cls):
+            try:
+                value = getattr(self, name)
+            except AttributeError:
+                continue
+            object.__setattr__(copied, name, copy.deepcopy(value, memo))
+        return copied
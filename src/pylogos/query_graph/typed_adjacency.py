@@ -0,0 +1,51 @@
+from typing import Dict, Hashable, Tuple, Type
+
+import networkx as nx
+
+
+class TypedAdjacency:
+    """Out- and in-neighbors of every node, bucketed by the type of the connecting edge.
+
+    Neighbors are kept in the insertion order of the edges and self-loops are left out, as in
+    Query_graph.get_out_going_nodes and Query_graph.get_incoming_nodes. Edge types are matched exactly
+    (no subclass lookup), like the type(edge) == X checks this replaces.
+
+    :param graph: a networkx-like directed graph whose edges carry the Edge object in their "data" attribute
+    """
+
+    def __init__(self, graph: nx.DiGraph):
+        self._out: Dict[Hashable, Dict[Type, Tuple]] = {node: {} for node in graph.nodes}
+        self._in: Dict[Hashable, Dict[Type, Tuple]] = {node: {} for node in graph.nodes}
+        for src, dst, edge in graph.edges(data="data"):
+            self.add(src, edge, dst)
+
+    @staticmethod
+    def _append(buckets: Dict[Hashable, Dict[Type, Tuple]], node: Hashable, edge_type: Type, neighbor: Hashable):
+        node_buckets = buckets[node]
+        node_buckets[edge_type] = node_buckets.get(edge_type, ()) + (neighbor,)
+
+    def add(self, src: Hashable, edge, dst: Hashable) -> None:
+        """Register a new edge from src to dst"""
+        for node in [src, dst]:
+            self._out.setdefault(node, {})
+            self._in.setdefault(node, {})
+        if src == dst:
+            return None
+        self._append(self._out, src, type(edge), dst)
+        self._append(self._in, dst, type(edge), src)
+
+    def out_by_type(self, node: Hashable, edge_type: Type) -> Tuple:
+        """Return the nodes that node points to through edges of the given type"""
+        return self._out[node].get(edge_type, ())
+
+    def in_by_type(self, node: Hashable, edge_type: Type) -> Tuple:
+        """Return the nodes that point to node through edges of the given type"""
+        return self._in[node].get(edge_type, ())
+
+    def out_edge_types(self, node: Hashable) -> Dict[Type, Tuple]:
+        """Return the out-neighbors of node for each edge type (must not be modified)"""
+        return self._out[node]
+
+    def in_edge_types(self, node: Hashable) -> Dict[Type, Tuple]:
+        """Return the in-neighbors of node for each edge type (must not be modified)"""
+        return self._in[node]
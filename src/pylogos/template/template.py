@@ -29,6 +29,8 @@ class Template_instance(metaclass=ABCMeta):
         self.raw_template = raw_template
         self.query_graph_path = None
         self.tp_to_qgp_idx_mapping = {}
+        # Kept on the template: the nodes of the query graph are shared and never modified
+        self.schema_template = None
 
     def __len__(self):
         return len(self.query_graph_path)
@@ -99,7 +101,7 @@ class Template_instance(metaclass=ABCMeta):
                     else:
                         words = words[:-1]
                 else:
-                    word = self.query_graph_path[qgp_idx][qgp_sub_idx].nl
+                    word = self._node_nl(self.query_graph_path[qgp_idx][qgp_sub_idx])
                 words.append(word)
             else:
                 assert type(item) == str, "Error on creating NL from template"
@@ -155,7 +157,7 @@ class Template_instance(metaclass=ABCMeta):
             if is_label(item):
                 tp_idx = label_to_template_path_idx(*parse_label(item))
                 qgp_idx, qgp_sub_idx = self.tp_to_qgp_idx_mapping[tp_idx]
-                words.append(self.query_graph_path[qgp_idx][qgp_sub_idx].nl)
+                words.append(self._node_nl(self.query_graph_path[qgp_idx][qgp_sub_idx]))
             else:
                 assert type(item) == str, "Error on creating NL from template"
                 words.append(item)
@@ -220,10 +222,13 @@ class Template_instance(metaclass=ABCMeta):
         return idx
 
     def add_schema_template(self, schema_template):
-        for path in self.query_graph_path:
-            for item in path:
-                if issubclass(type(item), Node):
-                    item.set_schema_template(schema_template)
+        self.schema_template = schema_template
+
+    def _node_nl(self, node):
+        """Return the description of node, using the schema template of this template if it names the node"""
+        if self.schema_template and type(node) in (Relation, Attribute) and node.name in self.schema_template:
+            return self.schema_template[node.name]
+        return node.nl
 
     def create_template_to_query_graph_idx_mapping(self):
         def is_equivalent(tp_item, qgp_item):
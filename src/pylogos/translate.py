@@ -1,11 +1,22 @@
-from typing import Any, Dict, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 from pylogos.algorithm.MRP import MRP
 from pylogos.query_graph.koutrika_query_graph import Query_graph
 
+if TYPE_CHECKING:
+    from pylogos.translation_cache import TranslationCache
 
-def translate(query_graph: Query_graph) -> Tuple[str, Dict[str, Any]]:
-    return MRP()(query_graph.query_subjects[0], None, None, query_graph)
+# MRP keeps no state between calls, so one translator serves all calls (and threads)
+_translator = MRP()
+
+
+def translate(
+    query_graph: Query_graph, cache: Optional["TranslationCache"] = None, translator: Optional[MRP] = None
+) -> Tuple[str, Dict[str, Any]]:
+    translator = _translator if translator is None else translator
+    if cache is not None:
+        return cache.translate(query_graph, translator)
+    return translator.translate(query_graph)
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
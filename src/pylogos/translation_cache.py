@@ -0,0 +1,272 @@
+"""Cache of translations keyed by the shape of the query graph.
+
+Queries generated from the same template only differ in their constants. MRP never looks at the
+labels of Value nodes to choose what to say, so the sentence of one such query is the sentence of
+any other with the constants swapped. TranslationCache translates the first query of every shape
+with placeholders in place of the Value labels and entity names, keeps the resulting sentence as a
+SentenceTemplate, and answers the next queries of the same shape by filling in their values.
+render_bindings does the same for one graph and many bindings of its constants.
+"""
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.algorithm.string_builder import SStrSen
+from pylogos.query_graph.koutrika_query_graph import Query_graph, QueryGraphAnalysis, Value
+from pylogos.query_graph.label_overlay import LabelOverlay
+
+TranslationCacheInfo = namedtuple("TranslationCacheInfo", ["hits", "misses", "bypasses", "maxsize", "currsize"])
+
+# Private use characters: they never occur in labels, and nothing in MRP splits or changes them
+_LABEL_SLOT = "\ue000{}\ue001"
+_ENTITY_SLOT = "\ue002{}\ue003"
+_SLOT_PATTERN = re.compile("\ue000(\\d+)\ue001|\ue002(\\d+)\ue003")
+_LABEL, _ENTITY = 0, 1
+
+
+def _compile(text: Optional[str]):
+    """Return text, or the list of its literal parts and (_LABEL or _ENTITY, value index) slots if it has any"""
+    if not isinstance(text, str) or not _SLOT_PATTERN.search(text):
+        return text
+    parts, position = [], 0
+    for match in _SLOT_PATTERN.finditer(text):
+        if match.start() > position:
+            parts.append(text[position : match.start()])
+        if match.group(1) is not None:
+            parts.append((_LABEL, int(match.group(1))))
+        else:
+            parts.append((_ENTITY, int(match.group(2))))
+        position = match.end()
+    if position < len(text):
+        parts.append(text[position:])
+    return parts
+
+
+def _format_field(compiled, num_values: int) -> str:
+    """Return compiled as a str.format field string: label i is the argument i, entity name i the argument num_values + i"""
+    if type(compiled) is not list:
+        compiled = [compiled]
+    return "".join(
+        part.replace("{", "{{").replace("}", "}}") if type(part) is str else f"{{{part[1] + num_values * part[0]}}}"
+        for part in compiled
+    )
+
+
+def _fill(compiled, values: Sequence[Tuple[str, str]]) -> Optional[str]:
+    if type(compiled) is not list:
+        return compiled
+    return "".join(part if type(part) is str else values[part[1]][part[0]] for part in compiled)
+
+
+class SentenceTemplate:
+    """Translation of a query graph whose Value labels and entity names are slots.
+
+    The sentence is flattened to its phrases (SStrChar), each with its text, operation type, table and
+    column, in which the slots are kept apart from the literal text.
+
+    :param sentence: sentence built by MRP for a graph whose i-th Value has the label _LABEL_SLOT.format(i)
+        and the entity name _ENTITY_SLOT.format(i)
+    :param num_values: number of Value nodes of the graph
+    """
+
+    def __init__(self, sentence: SStrSen, num_values: int):
+        self.sentence = sentence
+        self.num_values = num_values
+        self.phrases = [
+            (_compile(char.text), char.op_type, _compile(char.table_node), _compile(char.column_node))
+            for word in sentence.items
+            for char in word.items
+        ]
+        self.format_string = " ".join(_format_field(text, num_values) for text, _, _, _ in self.phrases) + "."
+        self._mapping_phrases = [
+            (
+                text,
+                None if type(text) is list else len(text),
+                int(op_type) if op_type else None,
+                table_node,
+                column_node if type(column_node) is list or column_node else None,
+            )
+            for text, op_type, table_node, column_node in self.phrases
+        ]
+
+    def format(self, labels: Sequence[str], entity_names: Optional[Sequence[str]] = None) -> str:
+        """Return only the sentence, for the labels (and entity names, the labels by default) of the Value nodes"""
+        if len(labels) != self.num_values:
+            raise ValueError(f"Expected {self.num_values} values, got {len(labels)}")
+        return self.format_string.format(*labels, *(labels if entity_names is None else entity_names))
+
+    def render(self, values: Sequence[Tuple[str, str]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Return the sentence and mapping (as translate() does) for the (label, entity name) of every Value"""
+        if len(values) != self.num_values:
+            raise ValueError(f"Expected {self.num_values} values, got {len(values)}")
+        sentence = self.format([label for label, _ in values], [entity_name for _, entity_name in values])
+        mapping = []
+        start = 0
+        for text, length, op_type, table_node, column_node in self._mapping_phrases:
+            # Same as SStrSen.get_sentence_mapping, with the fields of the phrases without slots computed once
+            if length is None:
+                length = len(_fill(text, values))
+            if type(table_node) is list:
+                table_node = _fill(table_node, values)
+            if type(column_node) is list:
+                column_node = _fill(column_node, values) or None
+            mapping.append({"start": start, "end": start + length, "type": op_type, "table": table_node, "column": column_node})
+            start += length + 1
+        return sentence, mapping
+
+
+def value_nodes(query_graph: Query_graph) -> List[Value]:
+    """Return the Value nodes of query_graph in node order, which is the order of the slots of its template"""
+    return [node for node in query_graph.nodes if type(node) == Value]
+
+
+def shape_key(query_graph: Query_graph) -> Hashable:
+    """Return a key that is equal for two graphs iff MRP does the same traversal on both.
+
+    It holds the structural keys of the nodes (without the Value labels, see QueryGraphAnalysis.fingerprint)
+    and of the edges in the order of the graph: unlike the fingerprint, it depends on the insertion order,
+    which decides the order of the phrases in the sentence.
+    """
+    node_ids = {node: idx for idx, node in enumerate(query_graph.nodes)}
+    nodes = tuple(QueryGraphAnalysis._structural_node_key(node, False) for node in node_ids)
+    edges = tuple(
+        (node_ids[src], QueryGraphAnalysis._structural_edge_key(edge), node_ids[dst])
+        for src, dst, edge in query_graph.edges(data="data")
+    )
+    predecessors = tuple(tuple(node_ids[src] for src in query_graph.predecessors(node)) for node in node_ids)
+    return query_graph.reference_point_distance_threshold, nodes, edges, predecessors
+
+
+class TranslationCache:
+    """LRU cache of SentenceTemplate keyed by shape_key.
+
+    Graphs with an empty Value label or entity name are translated without the cache (bypasses), as
+    MRP drops empty phrases and the template would not.
+
+    The cache can be shared by threads: lookups and updates are serialized, while templates are built
+    outside of the lock (two threads missing on the same shape both build it). It can also be shared by
+    translators (MRP instances) with different lexicons, which are part of the key. Translators with a
+    label overlay of their own bypass the cache, as the overlay may rewrite the Value labels.
+
+    :param maxsize: maximum number of templates kept (None for no bound)
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError(f"maxsize must be non-negative or None, got {maxsize}")
+        self.maxsize = maxsize
+        self._templates: "OrderedDict[Hashable, SentenceTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def __len__(self):
+        return len(self._templates)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def cache_info(self) -> TranslationCacheInfo:
+        with self._lock:
+            return TranslationCacheInfo(self.hits, self.misses, self.bypasses, self.maxsize, len(self._templates))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = self.bypasses = 0
+
+    def translate(self, query_graph: Query_graph, translator: Optional[MRP] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """Same as pylogos.translate.translate, or translator.translate without its cache"""
+        translator = MRP() if translator is None else translator
+        values = value_nodes(query_graph)
+        if translator.label_overlay is not None or not all(
+            isinstance(value.label, str) and value.label and isinstance(value.entity_name, str) and value.entity_name
+            for value in values
+        ):
+            with self._lock:
+                self.bypasses += 1
+            return translator(query_graph.query_subjects[0], None, None, query_graph)
+        template = self.get_template(query_graph, values, translator)
+        return template.render([(value.label, value.entity_name) for value in values])
+
+    def get_template(
+        self, query_graph: Query_graph, values: List[Value] = None, translator: Optional[MRP] = None
+    ) -> SentenceTemplate:
+        """Return the template of the shape of query_graph, building it with translator (a new MRP by default) on a miss"""
+        translator = MRP() if translator is None else translator
+        key = (translator.lexicon_key, shape_key(query_graph))
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self.hits += 1
+                self._templates.move_to_end(key)
+                return template
+            self.misses += 1
+        if values is None:
+            values = value_nodes(query_graph)
+        template = self._build_template(query_graph, values, translator)
+        # The label overlay of a translator is not part of the key
+        if (self.maxsize is None or self.maxsize > 0) and translator.label_overlay is None:
+            with self._lock:
+                self._templates[key] = template
+                if self.maxsize is not None and len(self._templates) > self.maxsize:
+                    self._templates.popitem(last=False)
+        return template
+
+    @staticmethod
+    def _build_template(query_graph: Query_graph, values: List[Value], translator: MRP) -> SentenceTemplate:
+        # The placeholders go in an overlay: the graph may be translated by other threads meanwhile
+        label_overlay = LabelOverlay(translator.label_overlay)
+        for idx, value in enumerate(values):
+            label_overlay.set(value, label=_LABEL_SLOT.format(idx), entity_name=_ENTITY_SLOT.format(idx))
+        sentence = translator.build_sentence(query_graph.query_subjects[0], None, None, query_graph, label_overlay=label_overlay)
+        return SentenceTemplate(sentence, len(values))
+
+
+def _binding_rows(bindings: Union[np.ndarray, Iterable[Sequence]], chunk_size: int) -> Iterator[Sequence]:
+    if not isinstance(bindings, np.ndarray):
+        yield from bindings
+        return None
+    # Rows of NumPy scalars are slow to format: convert chunks of rows to Python objects instead
+    for start in range(0, len(bindings), chunk_size):
+        yield from bindings[start : start + chunk_size].tolist()
+
+
+def render_bindings(
+    query_graph: Query_graph,
+    bindings: Union[np.ndarray, Iterable[Sequence]],
+    with_mapping: bool = False,
+    cache: Optional[TranslationCache] = None,
+    chunk_size: int = 4096,
+    translator: Optional[MRP] = None,
+) -> Iterator[Union[str, Tuple[str, List[Dict[str, Any]]]]]:
+    """Translate query_graph once and yield its sentence for every row of bindings.
+
+    A row holds one constant per Value node, in the order of value_nodes(query_graph), and the sentence is the
+    one of the graph with Value(node_name, str(constant)) in place of each Value node. Rows are tuples (or any
+    sequence), or the records of a NumPy structured array (or rows of a 2-D array); bytes are decoded as UTF-8.
+    Empty constants are rendered as is, while translate() would drop their phrase.
+
+    :param with_mapping: yield (sentence, mapping) pairs as translate() does instead of the sentences only
+    :param cache: cache to get the template from (and to add it to)
+    :param chunk_size: number of rows of a NumPy array converted at once
+    :param translator: translator (and its lexicon) to build the template with
+    """
+    template = (TranslationCache(maxsize=0) if cache is None else cache).get_template(query_graph, translator=translator)
+    num_values = template.num_values
+    format_string = template.format_string
+    for row in _binding_rows(bindings, chunk_size):
+        if len(row) != num_values:
+            raise ValueError(f"Expected {num_values} values per binding, got {len(row)}: {row!r}")
+        labels = [cell if type(cell) is str else cell.decode("utf-8") if type(cell) is bytes else str(cell) for cell in row]
+        if with_mapping:
+            yield template.render([(label, label) for label in labels])
+        else:
+            yield format_string.format(*labels, *labels)
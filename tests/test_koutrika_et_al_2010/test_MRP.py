@@ -1,6 +1,11 @@
+import inspect
+import sys
 import unittest
-from pylogos.algorithm.MRP import MRP
-from tests.test_koutrika_et_al_2010.utils import Query, SPJ_query, SPJ_query2, GroupBy_query, Nested_with_correlation_query, Nested_with_multisublink_query, Nested_with_groupby_query, Nested_with_multilevel_query, TestQuery2
+from pylogos.algorithm.MRP import MRP, TranslationStats
+from pylogos.query_graph.label_overlay import LabelOverlay
+from pylogos.translate import translate
+from pylogos.translation_cache import TranslationCache
+from tests.test_koutrika_et_al_2010.utils import Query, SPJ_query, SPJ_query2, GroupBy_query, Nested_with_correlation_query, Nested_with_multisublink_query, Nested_with_groupby_query, Nested_with_multilevel_query, TestQuery2, chain_query_graph, nested_query_graph, repeated_subquery_graph
 
 
 class Test_MRP(unittest.TestCase):
@@ -41,5 +46,106 @@ class Test_MRP(unittest.TestCase):
     def test_query_2(self):
         self._test_query(TestQuery2(), "TestQuery2")
 
+
+class Test_MRP_reentrancy(unittest.TestCase):
+    QUERIES = [SPJ_query, GroupBy_query, Nested_with_correlation_query, Nested_with_multisublink_query, Nested_with_groupby_query, Nested_with_multilevel_query]
+
+    def test_reuse_translator(self):
+        translator = MRP()
+        for query in self.QUERIES:
+            query_graph = query().simplified_graph
+            expected = MRP().translate(query_graph)
+            # No state is left over from the previous calls
+            self.assertEqual(translator.translate(query_graph), expected)
+            self.assertEqual(translator.translate(query_graph), expected)
+            self.assertEqual(translate(query_graph, translator=translator), expected)
+
+    def test_label_methods_without_context(self):
+        # Callers of label_mv/label_v that do not pass a context get a fresh one
+        translator = MRP()
+        for query in [SPJ_query, GroupBy_query]:
+            query_graph = query().simplified_graph
+            query_subject = query_graph.query_subjects[0]
+            for label in [translator.label_mv, translator.label_v]:
+                self.assertEqual(
+                    str(label(query_graph, query_subject, query_subject).construct_sentence()),
+                    str(label(query_graph, query_subject, query_subject, translator.new_context(query_graph)).construct_sentence()),
+                )
+        query_graph = SPJ_query().simplified_graph
+        query_subject = query_graph.query_subjects[0]
+        self.assertEqual(str(translator.label_mv(query_graph, query_subject, query_subject).construct_sentence()), "title of courses")
+
+    def test_lexicon(self):
+        query_graph = SPJ_query().simplified_graph
+        relation = query_graph.relations[0]
+        translator = MRP(lexicon={relation.entity_name: "LEXICON"})
+        sentence, mapping = translator.translate(query_graph)
+        self.assertIn("LEXICON", sentence)
+        self.assertNotIn("LEXICON", translate(query_graph)[0])
+        self.assertNotEqual(relation.label, "LEXICON")
+        # The lexicon applies on top of the label overlay of a call
+        label_overlay = LabelOverlay()
+        label_overlay.set(query_graph.values[0], label="OVERLAID")
+        sentence, _ = translator(query_graph.query_subjects[0], None, None, query_graph, label_overlay=label_overlay)
+        self.assertIn("LEXICON", sentence)
+        self.assertIn("OVERLAID", sentence)
+
+    def test_shared_cache(self):
+        cache = TranslationCache()
+        translator = MRP(cache=cache)
+        lexicon_translator = MRP(lexicon={SPJ_query().simplified_graph.relations[0].entity_name: "LEXICON"}, cache=cache)
+        for _ in range(2):
+            query_graph = SPJ_query().simplified_graph
+            self.assertEqual(translator.translate(query_graph), translate(query_graph))
+            self.assertEqual(lexicon_translator.translate(query_graph), MRP(lexicon=lexicon_translator.lexicon).translate(query_graph))
+        # One template per lexicon
+        self.assertEqual(cache.cache_info()[:2], (2, 2))
+        # A translator with its own overlay bypasses the cache
+        MRP(label_overlay=LabelOverlay(), cache=cache).translate(query_graph)
+        self.assertEqual(cache.bypasses, 1)
+
+    def test_repeated_nested_queries(self):
+        translator = MRP()
+        sentence, mapping = translator.translate(repeated_subquery_graph(3))
+        nested = "genre of movie where director of movie is Nolan"
+        self.assertEqual(
+            sentence,
+            f"Find title of movie where genre1 of movie is in {nested}, genre2 of movie is in {nested}, and genre3 of movie is in {nested}.",
+        )
+        self.assertEqual([sentence[phrase["start"] : phrase["end"]] for phrase in mapping].count("where director"), 3)
+        # Described once, then found in the memo of the call
+        self.assertEqual(translator.translation_stats(), TranslationStats(1, 2, 1))
+        # The memo does not outlive the call
+        translator.translate(repeated_subquery_graph(3))
+        self.assertEqual(translator.translation_stats(), TranslationStats(2, 4, 2))
+        # A correlated query depends on the outer query, so it is never found in the memo
+        translator = MRP()
+        translator.translate(Nested_with_correlation_query().simplified_graph)
+        self.assertEqual(translator.translation_stats().nested_hits, 0)
+
+
+class Test_MRP_depth(unittest.TestCase):
+    def setUp(self):
+        self.recursion_limit = sys.getrecursionlimit()
+        # Leave little room above the frames of the test runner: far less than the size of the graphs
+        sys.setrecursionlimit(len(inspect.stack()) + 100)
+
+    def tearDown(self):
+        sys.setrecursionlimit(self.recursion_limit)
+
+    def test_long_join_chain(self):
+        query_graph = chain_query_graph(250)
+        sentence, _ = MRP().translate(query_graph)
+        self.assertTrue(sentence.startswith("Find name of table0 in which table0 joins table1"))
+        self.assertEqual(sentence.count(" joins "), 249)
+
+    def test_deeply_nested_queries(self):
+        query_graph = nested_query_graph(200)
+        sentence, _ = MRP().translate(query_graph)
+        self.assertTrue(sentence.startswith("Find title of movie where genre of movie is in genre of movie"))
+        self.assertEqual(sentence.count(" is in "), 200)
+        self.assertTrue(sentence.endswith("where value of movie is 2000."))
+
+
 if __name__ == "__main__":
      unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import pickle
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.async_translate import process_executor, translate_async, translate_many_async
+from pylogos.batch import TranslationError
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import translatable_graphs, untranslatable_query_graph
+
+
+class SlowTranslator(MRP):
+    """Records the largest number of concurrent translations"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = self.max_running = self.started = 0
+
+    def translate(self, query_graph):
+        with self.lock:
+            self.running += 1
+            self.started += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        try:
+            return super().translate(query_graph)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+async def collect(async_iterator):
+    return [item async for item in async_iterator]
+
+
+class Test_translate_async(unittest.TestCase):
+    def setUp(self):
+        self.query_graphs = translatable_graphs()
+        self.expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in self.query_graphs]
+
+    def test_same_as_translate(self):
+        async def main():
+            with ThreadPoolExecutor(4) as executor:
+                return await asyncio.gather(
+                    *(translate_async(query_graph, executor) for query_graph in self.query_graphs)
+                )
+
+        self.assertEqual(asyncio.run(main()), self.expected)
+
+    def test_process_executor(self):
+        with process_executor(workers=2) as executor:
+            results = asyncio.run(collect(translate_many_async(self.query_graphs, executor, max_in_flight=3)))
+        self.assertEqual(results, self.expected)
+
+    def test_limit(self):
+        translator = SlowTranslator(0.01)
+
+        async def main():
+            limit = asyncio.Semaphore(2)
+            with ThreadPoolExecutor(8) as executor:
+                calls = [
+                    translate_async(query_graph, executor, translator=translator, limit=limit)
+                    for query_graph in self.query_graphs
+                ]
+                return await asyncio.gather(*calls)
+
+        self.assertEqual(asyncio.run(main()), self.expected)
+        self.assertLessEqual(translator.max_running, 2)
+
+    def test_many_errors_are_recorded(self):
+        query_graphs = self.query_graphs[:2] + [untranslatable_query_graph()]
+        results = asyncio.run(collect(translate_many_async(query_graphs)))
+        self.assertEqual(results[:2], self.expected[:2])
+        self.assertIsInstance(results[2], TranslationError)
+        self.assertEqual((results[2].index, results[2].error_type), (2, "ValueError"))
+
+    def test_cancellation(self):
+        translator = SlowTranslator(0.1)
+
+        async def main():
+            with ThreadPoolExecutor(1) as executor:
+                task = asyncio.create_task(
+                    collect(translate_many_async(self.query_graphs, executor, max_in_flight=4, translator=translator))
+                )
+                while not translator.started:
+                    await asyncio.sleep(0.001)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+        asyncio.run(main())
+        # The first translation was running, the three others queued were cancelled
+        self.assertEqual(translator.started, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
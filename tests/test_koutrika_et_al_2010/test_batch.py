@@ -0,0 +1,103 @@
+import pickle
+import unittest
+
+from pylogos.batch import (
+    GraphStatistics,
+    TranslationError,
+    estimate_cost,
+    graph_statistics,
+    translate_batch,
+    translate_many,
+)
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import (
+    Nested_with_correlation_query,
+    SPJ_query,
+    chain_query_graph,
+    nested_query_graph,
+    repeated_subquery_graph,
+    translatable_graphs,
+    untranslatable_query_graph,
+)
+
+
+class Test_translate_many(unittest.TestCase):
+    def setUp(self):
+        self.query_graphs = translatable_graphs()
+        self.expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in self.query_graphs]
+
+    def test_same_as_translate(self):
+        for workers in [0, 2]:
+            results = list(translate_many(self.query_graphs * 3, workers=workers, chunksize=5))
+            self.assertEqual(results, self.expected * 3)
+
+    def test_errors_are_recorded(self):
+        query_graphs = self.query_graphs[:3] + [untranslatable_query_graph()] + self.query_graphs[3:]
+        for workers in [0, 2]:
+            results = list(translate_many(query_graphs, workers=workers, chunksize=2, cache_size=0))
+            self.assertEqual(results[:3] + results[4:], self.expected)
+            error = results[3]
+            self.assertIsInstance(error, TranslationError)
+            self.assertEqual((error.index, error.error_type), (3, "ValueError"))
+            self.assertIn("Traceback", error.traceback)
+
+    def test_lazy_input(self):
+        consumed = []
+
+        def graphs():
+            for idx, query_graph in enumerate(self.query_graphs * 4):
+                consumed.append(idx)
+                yield query_graph
+
+        results = translate_many(graphs(), workers=1, chunksize=2, max_pending_chunks=2)
+        self.assertEqual(next(results), self.expected[0])
+        # Only the chunks in flight were read from the input
+        self.assertLessEqual(len(consumed), 2 * 2 + 2)
+        results.close()
+        with self.assertRaises(ValueError):
+            translate_many(self.query_graphs, chunksize=0)
+
+
+class Test_translate_batch(unittest.TestCase):
+    def setUp(self):
+        self.query_graphs = translatable_graphs()
+        self.expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in self.query_graphs]
+
+    def test_graph_statistics(self):
+        self.assertEqual(graph_statistics(nested_query_graph(5)), GraphStatistics(19, 18, 6, 5, 5))
+        self.assertEqual(graph_statistics(repeated_subquery_graph(4)), GraphStatistics(22, 21, 5, 4, 1))
+        self.assertEqual(graph_statistics(chain_query_graph(10)).nesting_depth, 0)
+        # The correlation (edge back to the outer query) does not count as one more level
+        self.assertEqual(graph_statistics(Nested_with_correlation_query().simplified_graph)[3:], (1, 1))
+
+    def test_estimate_cost(self):
+        spj_cost = estimate_cost(SPJ_query().simplified_graph)
+        self.assertLess(spj_cost, estimate_cost(chain_query_graph(40)))
+        self.assertLess(estimate_cost(chain_query_graph(40)), estimate_cost(nested_query_graph(40)))
+
+    def test_same_as_translate(self):
+        query_graphs = self.query_graphs + [untranslatable_query_graph()] + self.query_graphs
+        for workers in [0, 2]:
+            results, report = translate_batch(query_graphs, workers=workers, cache_size=0)
+            self.assertEqual(results[: len(self.expected)], self.expected)
+            self.assertEqual(results[len(self.expected) + 1 :], self.expected)
+            error = results[len(self.expected)]
+            self.assertIsInstance(error, TranslationError)
+            self.assertEqual((error.index, error.error_type), (len(self.expected), "ValueError"))
+            self.assertLessEqual(len(report.busy_seconds), max(workers, 1))
+            self.assertGreater(report.tasks, 1)
+            for utilization in report.utilization.values():
+                self.assertTrue(0 < utilization <= 1)
+
+    def test_uniform_zero_cost(self):
+        for workers in [0, 2]:
+            results, report = translate_batch(self.query_graphs, workers=workers, cost=lambda query_graph: 0)
+            self.assertEqual(results, self.expected)
+            # The graphs are split by number instead
+            self.assertGreater(report.tasks, 1)
+        with self.assertRaises(ValueError):
+            translate_batch(self.query_graphs, workers=0, cost=lambda query_graph: -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
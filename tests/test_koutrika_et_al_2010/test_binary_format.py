@@ -0,0 +1,123 @@
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+from pylogos.query_graph.binary_format import (
+    FILE_HEADER,
+    FORMAT_VERSION,
+    MAGIC,
+    dumps_graph,
+    iter_graphs,
+    load_graphs,
+    loads_graph,
+    write_graphs,
+)
+from pylogos.query_graph.graph_backend import AdjacencyListBackend
+from pylogos.query_graph.koutrika_query_graph import Attribute, Function, FunctionType, Query_graph, Relation
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+    chain_query_graph,
+    random_query_graph,
+)
+
+TRANSLATABLE_QUERIES = [
+    SPJ_query,
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_multisublink_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+]
+
+
+class Test_binary_format(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "graphs.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_same_graph(self, loaded_graph, query_graph):
+        self.assertEqual(loaded_graph.node_name, query_graph.node_name)
+        self.assertEqual(loaded_graph.reference_point_distance_threshold, query_graph.reference_point_distance_threshold)
+        self.assertEqual(list(loaded_graph.nodes), list(query_graph.nodes))
+        for loaded_node, node in zip(loaded_graph.nodes, query_graph.nodes):
+            self.assertIs(type(loaded_node), type(node))
+            self.assertEqual(loaded_node.__getstate__(), node.__getstate__())
+            self.assertEqual(list(loaded_graph.predecessors(loaded_node)), list(query_graph.predecessors(node)))
+        # Edges are interned, so the loaded graph shares the edge instances
+        for (src1, dst1, edge1), (src2, dst2, edge2) in zip(loaded_graph.edges(data="data"), query_graph.edges(data="data")):
+            self.assertEqual((src1, dst1), (src2, dst2))
+            self.assertIs(edge1, edge2)
+        self.assertEqual(loaded_graph.number_of_edges(), query_graph.number_of_edges())
+
+    def test_round_trip(self):
+        query_graphs = [query().simplified_graph for query in TRANSLATABLE_QUERIES]
+        query_graphs += [random_query_graph(40, 3), chain_query_graph(20), Query_graph("empty", rp_dist_threshold=2)]
+        self.assertEqual(write_graphs(self.path, query_graphs), len(query_graphs))
+        loaded_graphs = load_graphs(self.path)
+        self.assertEqual(len(loaded_graphs), len(query_graphs))
+        for loaded_graph, query_graph in zip(loaded_graphs, query_graphs):
+            self.assert_same_graph(loaded_graph, query_graph)
+        for loaded_graph, query_graph in zip(loaded_graphs, query_graphs[: len(TRANSLATABLE_QUERIES)]):
+            self.assertEqual(translate(loaded_graph), translate(query_graph))
+
+    def test_node_attributes(self):
+        query_graph = Query_graph("attributes", rp_dist_threshold=float("inf"))
+        movie = Relation("m", "movie", "films", alias="m", is_primary=True)
+        year = Attribute("m.year", "year")
+        query_graph.connect_membership(movie, year)
+        query_graph.connect_transformation(Function(FunctionType.Max), year)
+        loaded_graph = loads_graph(dumps_graph(query_graph))
+        self.assert_same_graph(loaded_graph, query_graph)
+        self.assertEqual(loaded_graph.reference_point_distance_threshold, float("inf"))
+        self.assertTrue(loaded_graph.relations[0].is_primary)
+        self.assertEqual(loaded_graph.relations[0].alias, "m")
+
+    def test_streaming_reader(self):
+        query_graphs = [chain_query_graph(num_relations) for num_relations in range(1, 30)]
+        write_graphs(self.path, query_graphs)
+        for use_mmap in [True, False]:
+            reader = iter_graphs(self.path, use_mmap=use_mmap)
+            # Graphs are decoded one at a time
+            self.assert_same_graph(next(reader), query_graphs[0])
+            self.assertEqual(sum(1 for _ in reader), len(query_graphs) - 1)
+        loaded_graph = next(iter_graphs(self.path, graph_backend=AdjacencyListBackend.name))
+        self.assertIsInstance(loaded_graph.backend, AdjacencyListBackend)
+
+    def test_file_object_and_size(self):
+        query_graphs = [random_query_graph(30, seed) for seed in range(5)]
+        buffer = io.BytesIO()
+        write_graphs(buffer, query_graphs)
+        with open(self.path, "wb") as f:
+            f.write(buffer.getvalue())
+        self.assertEqual(len(load_graphs(self.path)), len(query_graphs))
+        self.assertLess(len(buffer.getvalue()), len(b"".join(pickle.dumps(g, pickle.HIGHEST_PROTOCOL) for g in query_graphs)))
+
+    def test_invalid_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a graph file")
+        with self.assertRaises(ValueError):
+            list(iter_graphs(self.path))
+        with open(self.path, "wb") as f:
+            f.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION + 1, 0))
+        with self.assertRaises(ValueError):
+            list(iter_graphs(self.path))
+        write_graphs(self.path, [chain_query_graph(5)])
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            list(iter_graphs(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import pickle
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pylogos.algorithm.MRP import MRP
+from pylogos.query_graph.label_overlay import LabelOverlay
+from pylogos.translate import translate
+from pylogos.translation_cache import TranslationCache
+from tests.test_koutrika_et_al_2010.utils import SPJ_query, translatable_graphs
+
+
+def node_states(query_graph):
+    return [node.__getstate__() for node in query_graph.nodes]
+
+
+class Test_label_overlay(unittest.TestCase):
+    def test_overlay(self):
+        query_graph = SPJ_query().simplified_graph
+        relation = query_graph.relations[0]
+        label_overlay = LabelOverlay()
+        label_overlay.set(relation, label="table")
+        label_overlay.add_suffix(relation, "s")
+        self.assertIn(relation, label_overlay)
+        self.assertEqual(label_overlay.label(relation), "tables")
+        self.assertEqual(label_overlay.entity_name(relation), relation.entity_name)
+        # The overlaid copy stands in for the node
+        self.assertEqual(label_overlay.apply(relation), relation)
+        self.assertEqual(hash(label_overlay.apply(relation)), hash(relation))
+        self.assertNotEqual(relation.label, "tables")
+        other = query_graph.relations[1]
+        self.assertIs(label_overlay.apply(other), other)
+
+    def test_translation_with_overlay(self):
+        query_graph = SPJ_query().simplified_graph
+        states = node_states(query_graph)
+        value = query_graph.values[0]
+        label_overlay = LabelOverlay()
+        label_overlay.set(value, label="OVERLAID")
+        sentence, _ = MRP(label_overlay)(query_graph.query_subjects[0], None, None, query_graph)
+        self.assertIn("OVERLAID", sentence)
+        self.assertNotIn("OVERLAID", translate(query_graph)[0])
+        self.assertEqual(node_states(query_graph), states)
+
+
+class Test_concurrent_translation(unittest.TestCase):
+    def setUp(self):
+        # Switch threads often to interleave the translations as much as possible
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_shared_graphs_and_cache(self):
+        query_graphs = translatable_graphs()
+        expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in query_graphs]
+        states = [node_states(query_graph) for query_graph in query_graphs]
+        # No analysis is cached yet, so the threads also race to compute them
+        shared_graphs = [pickle.loads(pickle.dumps(query_graph)) for query_graph in query_graphs]
+        # Smaller than the number of shapes, so that templates are evicted and rebuilt concurrently
+        cache = TranslationCache(maxsize=4)
+        tasks = [idx for _ in range(8) for idx in range(len(shared_graphs))]
+
+        def run(idx):
+            if idx % 2:
+                return idx, translate(shared_graphs[idx], cache)
+            return idx, translate(shared_graphs[idx])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(run, tasks))
+        for idx, result in results:
+            self.assertEqual(result, expected[idx])
+        for query_graph, state in zip(shared_graphs, states):
+            self.assertEqual(node_states(query_graph), state)
+        info = cache.cache_info()
+        self.assertEqual(info.hits + info.misses + info.bypasses, sum(1 for idx in tasks if idx % 2))
+        self.assertLessEqual(info.currsize, 4)
+
+    def test_shared_translator(self):
+        query_graphs = translatable_graphs()
+        expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in query_graphs]
+        # One translator for all threads, with and without a cache
+        translators = [MRP(), MRP(cache=TranslationCache())]
+        tasks = [(idx, translator) for _ in range(8) for idx in range(len(query_graphs)) for translator in translators]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda task: task[1].translate(query_graphs[task[0]]), tasks))
+        for (idx, _), result in zip(tasks, results):
+            self.assertEqual(result, expected[idx])
+
+
+if __name__ == "__main__":
+    unittest.main()
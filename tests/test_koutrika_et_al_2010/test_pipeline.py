@@ -0,0 +1,51 @@
+import io
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from pylogos.pipeline import translate_file
+from pylogos.query_graph.binary_format import write_graphs
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import translatable_graphs, untranslatable_query_graph
+
+
+class Test_translate_file(unittest.TestCase):
+    def setUp(self):
+        self.query_graphs = translatable_graphs()
+        self.expected = [translate(pickle.loads(pickle.dumps(query_graph))) for query_graph in self.query_graphs]
+        self.directory = tempfile.TemporaryDirectory()
+        self.graph_path = os.path.join(self.directory.name, "graphs.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_same_as_translate(self):
+        write_graphs(self.graph_path, self.query_graphs * 3)
+        for workers in [0, 2]:
+            output_path = os.path.join(self.directory.name, f"translations_{workers}.jsonl")
+            report = translate_file(self.graph_path, output_path, workers=workers, chunksize=4)
+            with open(output_path, encoding="utf-8") as file:
+                records = [json.loads(line) for line in file]
+            self.assertEqual([record["id"] for record in records], list(range(len(self.query_graphs) * 3)))
+            self.assertEqual(
+                [(record["sentence"], record["mapping"]) for record in records],
+                [tuple(json.loads(json.dumps(expected))) for expected in self.expected * 3],
+            )
+            self.assertEqual((report.graphs, report.errors), (len(records), 0))
+            # At most max_pending_chunks (2 per worker, 1 inline) chunks of 4 graphs were held at once
+            self.assertLessEqual(report.peak_in_flight, 4 * max(2 * workers, 1))
+
+    def test_errors_are_recorded(self):
+        write_graphs(self.graph_path, self.query_graphs[:2] + [untranslatable_query_graph()])
+        output = io.StringIO()
+        report = translate_file(self.graph_path, output, cache_size=0)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual((report.graphs, report.errors), (3, 1))
+        self.assertEqual(records[2]["id"], 2)
+        self.assertEqual(records[2]["error"]["type"], "ValueError")
+
+
+if __name__ == "__main__":
+    unittest.main()
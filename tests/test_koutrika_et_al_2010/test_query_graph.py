@@ -0,0 +1,704 @@
+import copy
+import gc
+import pickle
+import subprocess
+import sys
+import unittest
+
+import networkx as nx
+
+from pylogos.query_graph.koutrika_query_graph import (
+    Attribute,
+    Function,
+    InternedEdgeMeta,
+    Join,
+    Membership,
+    OperatorType,
+    Predicate,
+    Query_graph,
+    ReferencePointCondition,
+    Relation,
+    Selection,
+    Value,
+)
+from pylogos.query_graph.frozen_query_graph import EDGE_TYPES, NODE_TYPES
+from pylogos.query_graph.graph_backend import AdjacencyListBackend, NetworkxBackend
+from pylogos.query_graph.reachability_index import UNREACHABLE
+from pylogos.translate import translate
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+    SPJ_query2,
+    TestQuery2,
+    chain_query_graph,
+    chain_query_graph_edges,
+    random_query_graph,
+    star_query_graph,
+)
+
+
+def legacy_reference_points(query_graph):
+    """Reference points computed condition by condition, as Query_graph.reference_points originally did"""
+
+    def shortest_path_length(node1, node2):
+        if nx.has_path(query_graph, node1, node2):
+            return nx.shortest_path_length(query_graph, node1, node2)
+        elif nx.has_path(query_graph, node2, node1):
+            return nx.shortest_path_length(query_graph, node2, node1)
+        raise RuntimeError(f"No path between {node1} and {node2}")
+
+    relations = query_graph.relations
+    reference_points = [r for r in relations if query_graph._get_number_of_projecting_attributes(r)]
+    for relations_to_add in ["branching_relations", "leaf_relations"]:
+        for r1 in relations:
+            if r1 not in reference_points and r1 in getattr(query_graph, relations_to_add):
+                reference_points.append(r1)
+    for r1 in relations:
+        if r1 in reference_points:
+            continue
+        shortest_path_lengths = [shortest_path_length(rp, r1) for rp in reference_points]
+        if min(shortest_path_lengths, default=float("inf")) > query_graph.reference_point_distance_threshold:
+            reference_points.append(r1)
+    for r1 in relations:
+        if r1 in reference_points:
+            continue
+        for neighbor in query_graph.get_neighbors(r1):
+            num_of_relations_to_visit = query_graph.number_of_non_visited_relation_nodes(neighbor, set([r1]))
+            if type(query_graph.get_edge(r1, neighbor)) != Join and num_of_relations_to_visit > 0:
+                reference_points.append(r1)
+                break
+    return reference_points
+
+
+def legacy_number_of_non_visited_relation_nodes(query_graph, node, visited_nodes):
+    visited_nodes.add(node)
+    num = 0
+    for dst in query_graph.get_out_going_nodes(node):
+        if dst not in visited_nodes:
+            if type(dst) == Relation:
+                num += 1
+            else:
+                num += legacy_number_of_non_visited_relation_nodes(query_graph, dst, visited_nodes)
+    return num
+
+
+def legacy_leaf_nodes(query_graph, node, visited_nodes):
+    visited_nodes.add(node)
+    leaf_nodes = []
+    for dst in query_graph.get_out_going_nodes(node):
+        if dst not in visited_nodes:
+            if type(dst) == Relation and legacy_number_of_non_visited_relation_nodes(query_graph, dst, set(visited_nodes)) == 0:
+                leaf_nodes.append(dst)
+            else:
+                leaf_nodes.extend(legacy_leaf_nodes(query_graph, dst, visited_nodes))
+    return leaf_nodes
+
+
+def legacy_branching_points(query_graph, node, visited_nodes):
+    visited_nodes.add(node)
+    branching_points = []
+    for dst in query_graph.get_out_going_nodes(node):
+        if dst not in visited_nodes:
+            if type(dst) == Relation and legacy_number_of_non_visited_relation_nodes(query_graph, dst, visited_nodes) > 1:
+                branching_points.append(dst)
+            else:
+                branching_points.extend(legacy_branching_points(query_graph, dst, visited_nodes))
+    return branching_points
+
+
+class Test_node_and_edge_hash(unittest.TestCase):
+    def test_hash_is_stable_across_processes(self):
+        code = (
+            "from pylogos.query_graph.koutrika_query_graph import Relation, Predicate, OperatorType;"
+            "print(hash(Relation('movie', 'movie')), hash(Predicate(OperatorType.LessThan)))"
+        )
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-c", code], capture_output=True, text=True, env={"PYTHONHASHSEED": seed, "PYTHONPATH": ":".join(sys.path)}
+            ).stdout
+            for seed in ["1", "2"]
+        }
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs.pop().split(), [str(hash(Relation("movie", "movie"))), str(hash(Predicate(OperatorType.LessThan)))])
+
+    def test_hash_is_full_width(self):
+        # Hashes used to be reduced modulo 10**8, which made collisions likely on large corpora
+        hashes = {hash(Attribute(f"attribute_{i}", "attribute")) for i in range(10000)}
+        self.assertEqual(len(hashes), 10000)
+        self.assertTrue(any(abs(h) >= 10**8 for h in hashes))
+
+    def test_hash_follows_equality(self):
+        self.assertEqual(hash(Relation("Movie", "movie")), hash(Relation("movie", "film")))
+        self.assertEqual(hash(Value("3", "3")), hash(Value("3", "three")))
+        self.assertEqual(hash(Predicate(OperatorType.GreaterThan)), hash(Predicate(OperatorType.GreaterThan)))
+        self.assertNotEqual(hash(Predicate(OperatorType.GreaterThan)), hash(Predicate(OperatorType.LessThan)))
+        self.assertNotEqual(hash(Membership()), hash(Selection()))
+
+    def test_hash_survives_pickling(self):
+        query_graph = SPJ_query().simplified_graph
+        loaded_graph = pickle.loads(pickle.dumps(query_graph))
+        self.assertEqual([hash(node) for node in query_graph.nodes], [hash(node) for node in loaded_graph.nodes])
+
+    def test_hash_is_restored_for_legacy_pickles(self):
+        relation = Relation("movie", "movie")
+        del relation._hash
+        loaded_relation = pickle.loads(pickle.dumps(relation))
+        self.assertEqual(hash(loaded_relation), hash(Relation("movie", "movie")))
+
+
+class Test_slots(unittest.TestCase):
+    def test_no_instance_dict(self):
+        for obj in [Relation("movie", "movie", is_primary=True), Attribute("title", "title"), Value("3", "3"), Function(0), Predicate(), Membership(), Join("")]:
+            self.assertFalse(hasattr(obj, "__dict__"), type(obj))
+
+    def test_pickled_state_is_a_dict(self):
+        # Versions before __slots__ restore the state with __dict__.update, so keep writing a dict
+        relation = Relation("movie", "movie", alias="m", is_primary=True)
+        state = relation.__reduce_ex__(pickle.HIGHEST_PROTOCOL)[2]
+        self.assertEqual(state, {"node_name": "movie", "entity_name": "movie", "label": "movie", "_hash": hash(relation), "alias": "m", "is_primary": True})
+
+    def test_load_dict_based_state(self):
+        predicate = Predicate.__new__(Predicate)
+        predicate.__setstate__({"op": OperatorType.LessThan, "label": "less than", "stale_attribute": None})
+        self.assertEqual(predicate, Predicate(OperatorType.LessThan))
+        self.assertEqual(hash(predicate), hash(Predicate(OperatorType.LessThan)))
+        self.assertFalse(hasattr(predicate, "stale_attribute"))
+
+    def test_graph_round_trip(self):
+        query_graph = Nested_with_groupby_query().simplified_graph
+        loaded_graph = pickle.loads(pickle.dumps(query_graph))
+        self.assertEqual([(n.node_name, n.entity_name, n.label) for n in loaded_graph.nodes], [(n.node_name, n.entity_name, n.label) for n in query_graph.nodes])
+        self.assertEqual([e.signature for _, _, e in loaded_graph.edges(data="data")], [e.signature for _, _, e in query_graph.edges(data="data")])
+
+
+class Test_interned_edges(unittest.TestCase):
+    def test_one_instance_per_type_label_and_operator(self):
+        self.assertIs(Membership(), Membership("of"))
+        self.assertIs(Selection(), Selection())
+        self.assertIs(Predicate(OperatorType.LessThan), Predicate(operator_id=OperatorType.LessThan))
+        self.assertIsNot(Predicate(OperatorType.LessThan), Predicate(OperatorType.GreaterThan))
+        self.assertIsNot(Join("a"), Join("b"))
+        self.assertIsNot(Membership(), Selection("of"))
+
+    def test_edges_are_immutable(self):
+        with self.assertRaises(AttributeError):
+            Membership().label = "in"
+        with self.assertRaises(AttributeError):
+            del Predicate().op
+        self.assertEqual(Membership().label, "of")
+
+    def test_graph_shares_edge_instances(self):
+        query_graph = SPJ_query().simplified_graph
+        edges = [edge for _, _, edge in query_graph.edges(data="data")]
+        self.assertEqual(len({id(edge) for edge in edges}), len({edge.intern_key for edge in edges}))
+        self.assertIs(copy.deepcopy(query_graph).get_edge(*list(query_graph.edges)[0]), edges[0])
+
+    def test_bidirectional_edges_share_instance(self):
+        query_graph = Query_graph()
+        movie, direction = Relation("movie", "movie"), Relation("direction", "direction")
+        movie_id, direction_mid = Attribute("movie.id", "id"), Attribute("direction.mid", "mid")
+        query_graph.connect_join(movie, movie_id, direction_mid, direction)
+        self.assertEqual(query_graph.number_of_edges(), 6)
+        for src, dst, edge in query_graph.edges(data="data"):
+            self.assertIs(query_graph.get_edge(dst, src), edge)
+
+    def test_pickled_edges_are_interned(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        for src, dst, edge in query_graph.edges(data="data"):
+            self.assertIs(edge, InternedEdgeMeta.intern(edge))
+
+    def test_unused_edges_are_released(self):
+        edge = Join("label used by a single graph")
+        intern_key = edge.intern_key
+        self.assertIn(intern_key, InternedEdgeMeta._edges_by_key)
+        del edge
+        gc.collect()
+        self.assertNotIn(intern_key, InternedEdgeMeta._edges_by_key)
+
+    def test_unhashable_arguments(self):
+        edge = Join(["a", "b"])
+        self.assertEqual(edge.label, ["a", "b"])
+        self.assertEqual(edge, Join(["a", "b"]))
+
+    def test_freeze_unhashable_labels(self):
+        query_graph = Query_graph()
+        movie, direction = Relation("movie", "movie"), Relation("direction", "direction")
+        query_graph.connect_simplified_join(movie, direction, ["x", "y"], ["x", "y"])
+        frozen_graph = query_graph.freeze()
+        self.assertEqual(frozen_graph.get_edge(movie, direction).label, ["x", "y"])
+        self.assertEqual(frozen_graph.get_edge(direction, movie).label, ["x", "y"])
+
+
+class Test_analysis_cache(unittest.TestCase):
+    def test_repeated_access_hits_cache(self):
+        query_graph = pickle.loads(pickle.dumps(Nested_with_multilevel_query().simplified_graph))
+        reference_points = query_graph.reference_points
+        misses = query_graph.cache_info().misses
+        for _ in range(10):
+            self.assertIs(query_graph.reference_points, reference_points)
+        self.assertEqual(query_graph.cache_info().misses, misses)
+        self.assertGreaterEqual(query_graph.cache_info().hits, 10)
+
+    def test_mutation_invalidates_cache(self):
+        query_graph = pickle.loads(pickle.dumps(Nested_with_multilevel_query().simplified_graph))
+        relations = query_graph.relations
+        revision = query_graph.revision
+        movie4 = Relation("movie4", "movie")
+        query_graph.connect_membership(movie4, Attribute("title", "title"))
+        self.assertGreater(query_graph.revision, revision)
+        self.assertIn(movie4, query_graph.relations)
+        self.assertNotIn(movie4, relations)
+
+        query_graph.remove_node(movie4)
+        self.assertNotIn(movie4, query_graph.relations)
+
+    def test_threshold_change_invalidates_cache(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        query_graph.reference_points
+        self.assertGreater(query_graph.cache_info().size, 0)
+        query_graph.reference_point_distance_threshold = 1
+        self.assertEqual(query_graph.cache_info().size, 0)
+
+    def test_cache_is_not_pickled(self):
+        query_graph = SPJ_query().simplified_graph
+        query_graph.reference_points
+        self.assertEqual(pickle.loads(pickle.dumps(query_graph)).cache_info().size, 0)
+
+
+class Test_reachability_index(unittest.TestCase):
+    def test_matches_networkx(self):
+        for query in [SPJ_query(), Nested_with_multisublink_query()]:
+            query_graph = query.simplified_graph
+            for src in query_graph.nodes:
+                for dst in query_graph.nodes:
+                    # networkx compares the end points with ==, and all values are equal to each other
+                    if type(src) == type(dst) == Value and src is not dst:
+                        continue
+                    has_path = nx.has_path(query_graph, src, dst)
+                    self.assertEqual(query_graph.has_path(src, dst), has_path)
+                    if has_path:
+                        self.assertEqual(query_graph.shortest_path_length(src, dst), nx.shortest_path_length(query_graph, src, dst))
+                    else:
+                        self.assertRaises(nx.NetworkXNoPath, query_graph.shortest_path_length, src, dst)
+
+    def test_relation_distance_matrix(self):
+        query_graph = Nested_with_multilevel_query().simplified_graph
+        relations = query_graph.relations
+        matrix = query_graph.reachability_index.distance_matrix(relations)
+        for i, src in enumerate(relations):
+            for j, dst in enumerate(relations):
+                expected = nx.shortest_path_length(query_graph, src, dst) if nx.has_path(query_graph, src, dst) else UNREACHABLE
+                self.assertEqual(matrix[i, j], expected)
+
+    def test_index_is_rebuilt_after_mutation(self):
+        query_graph = pickle.loads(pickle.dumps(Nested_with_multilevel_query().simplified_graph))
+        movie1, movie3 = Relation("movie1", "movie"), Relation("movie3", "movie")
+        self.assertFalse(query_graph.has_path(movie3, movie1))
+        query_graph.connect_simplified_join(movie3, movie1)
+        self.assertEqual(query_graph.shortest_path_length(movie3, movie1), 1)
+
+
+class Test_node_registry(unittest.TestCase):
+    def test_same_as_filtering_nodes(self):
+        for query_graph in [Nested_with_groupby_query().simplified_graph, GroupBy_query().simplified_graph, random_query_graph(30, 1)]:
+            for view, node_type in [
+                (query_graph.relations, Relation),
+                (query_graph.attributes, Attribute),
+                (query_graph.values, Value),
+                (query_graph.functions, Function),
+            ]:
+                self.assertEqual(list(view), [node for node in query_graph.nodes if type(node) == node_type])
+
+    def test_views_are_read_only_snapshots(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        relations = query_graph.relations
+        with self.assertRaises(TypeError):
+            relations[0] = Relation("movie4", "movie")
+        self.assertFalse(hasattr(relations, "append"))
+
+        movie4 = Relation("movie4", "movie")
+        node_registry = query_graph.node_registry
+        query_graph.connect_simplified_join(relations[0], movie4)
+        self.assertIs(query_graph.node_registry, node_registry)
+        self.assertNotIn(movie4, relations)
+        self.assertIn(movie4, query_graph.relations)
+        self.assertEqual(query_graph.relations[-1], movie4)
+        self.assertEqual(list(query_graph.relations), list(relations) + [movie4])
+
+    def test_registry_is_rebuilt_after_removal(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        relation = query_graph.relations[0]
+        query_graph.remove_node(relation)
+        self.assertNotIn(relation, query_graph.relations)
+        self.assertEqual(list(query_graph.relations), [node for node in query_graph.nodes if type(node) == Relation])
+
+
+class Test_typed_adjacency(unittest.TestCase):
+    def _assert_same_as_scan(self, query_graph):
+        edge_types = {type(edge) for _, _, edge in query_graph.edges(data="data")}
+        for node in query_graph.nodes:
+            for edge_type in edge_types:
+                self.assertEqual(
+                    list(query_graph.out_by_type(node, edge_type)),
+                    [dst for dst in query_graph.get_out_going_nodes(node) if type(query_graph.get_edge(node, dst)) == edge_type],
+                )
+                self.assertEqual(
+                    list(query_graph.in_by_type(node, edge_type)),
+                    [src for src in query_graph.get_incoming_nodes(node) if type(query_graph.get_edge(src, node)) == edge_type],
+                )
+
+    def test_same_as_scan(self):
+        for query in [SPJ_query(), GroupBy_query(), Nested_with_correlation_query(), Nested_with_groupby_query(), Nested_with_multilevel_query()]:
+            self._assert_same_as_scan(query.simplified_graph)
+        self._assert_same_as_scan(random_query_graph(30, 0))
+
+    def test_index_is_updated_on_connect(self):
+        query_graph = pickle.loads(pickle.dumps(Nested_with_multilevel_query().simplified_graph))
+        movie1, movie4 = Relation("movie1", "movie"), Relation("movie4", "movie")
+        typed_adjacency = query_graph.typed_adjacency
+        query_graph.connect_membership(movie4, Attribute("title", "title"))
+        query_graph.connect_simplified_join(movie1, movie4)
+        self.assertIs(query_graph.typed_adjacency, typed_adjacency)
+        self.assertEqual(query_graph.in_by_type(movie4, Membership), (Attribute("title", "title"),))
+        self.assertIn(movie4, query_graph.out_by_type(movie1, Join))
+        self._assert_same_as_scan(query_graph)
+
+    def test_index_is_rebuilt_after_other_mutations(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        relation = query_graph.relations[0]
+        attributes = query_graph.get_membership_nodes(relation)
+        query_graph.remove_node(attributes[0])
+        self.assertEqual(query_graph.get_membership_nodes(relation), attributes[1:])
+
+
+class Test_bitset_traversals(unittest.TestCase):
+    def _test_queries(self):
+        queries = [SPJ_query(), GroupBy_query(), Nested_with_correlation_query(), Nested_with_multisublink_query(), Nested_with_groupby_query(), Nested_with_multilevel_query(), TestQuery2()]
+        synthetic_graphs = [chain_query_graph(n) for n in [1, 5, 30]] + [star_query_graph(n) for n in [1, 5, 30]]
+        synthetic_graphs += [random_query_graph(n, seed) for n in [5, 30] for seed in range(5)]
+        return [query.simplified_graph for query in queries] + synthetic_graphs
+
+    def test_same_as_recursive_traversals(self):
+        for query_graph in self._test_queries():
+            for node in query_graph.nodes:
+                for visited_nodes in [set(), set(query_graph.relations[:1])]:
+                    self.assertEqual(query_graph.get_leaf_nodes(node, visited_nodes), legacy_leaf_nodes(query_graph, node, set(visited_nodes)))
+                    self.assertEqual(query_graph.get_branching_points(node, visited_nodes), legacy_branching_points(query_graph, node, set(visited_nodes)))
+                    self.assertEqual(
+                        query_graph.number_of_non_visited_relation_nodes(node, visited_nodes),
+                        legacy_number_of_non_visited_relation_nodes(query_graph, node, set(visited_nodes)),
+                    )
+
+    def test_visited_nodes_are_not_modified(self):
+        query_graph = Nested_with_multilevel_query().simplified_graph
+        visited_nodes = set()
+        query_graph.get_leaf_nodes(query_graph.query_subjects[0], visited_nodes)
+        query_graph.number_of_non_visited_relation_nodes(query_graph.query_subjects[0], visited_nodes)
+        self.assertEqual(visited_nodes, set())
+
+    def test_deep_graph_does_not_recurse(self):
+        query_graph = chain_query_graph(sys.getrecursionlimit() + 100)
+        self.assertEqual([r.node_name for r in query_graph.leaf_relations], [query_graph.relations[-1].node_name])
+        self.assertEqual(query_graph.branching_relations, [])
+
+
+class Test_frozen_query_graph(unittest.TestCase):
+    def test_csr_arrays(self):
+        query_graph = Nested_with_groupby_query().simplified_graph
+        frozen_graph = query_graph.freeze()
+        self.assertEqual(list(frozen_graph.nodes), list(query_graph.nodes))
+        self.assertEqual(list(frozen_graph.labels), [node.label for node in query_graph.nodes])
+        for node_id, node in enumerate(frozen_graph.nodes):
+            begin, end = frozen_graph.out_indptr[node_id], frozen_graph.out_indptr[node_id + 1]
+            self.assertEqual([frozen_graph.nodes[i] for i in frozen_graph.out_indices[begin:end]], list(query_graph.successors(node)))
+            self.assertEqual(
+                [frozen_graph.edge_table[i].intern_key for i in frozen_graph.out_edges[begin:end]],
+                [query_graph.get_edge(node, dst).intern_key for dst in query_graph.successors(node)],
+            )
+            begin, end = frozen_graph.in_indptr[node_id], frozen_graph.in_indptr[node_id + 1]
+            self.assertEqual([frozen_graph.nodes[i] for i in frozen_graph.in_indices[begin:end]], list(query_graph.predecessors(node)))
+            self.assertEqual(
+                [frozen_graph.edge_table[i].intern_key for i in frozen_graph.in_edges[begin:end]],
+                [query_graph.get_edge(src, node).intern_key for src in query_graph.predecessors(node)],
+            )
+            self.assertEqual(list(frozen_graph.predecessors(node)), list(query_graph.predecessors(node)))
+            self.assertEqual(NODE_TYPES[frozen_graph.node_type_codes[node_id]], type(node))
+        for edge, code in zip(frozen_graph.edge_table, frozen_graph.edge_type_codes):
+            self.assertEqual(EDGE_TYPES[code], type(edge))
+
+    def test_same_analyses(self):
+        for query_graph in [Nested_with_multilevel_query().simplified_graph, random_query_graph(30, 2), star_query_graph(12)]:
+            frozen_graph = query_graph.freeze()
+            for analysis in ["relations", "query_subjects", "reference_points", "branching_relations", "leaf_relations", "secondary_relations"]:
+                self.assertEqual(list(getattr(frozen_graph, analysis)), list(getattr(query_graph, analysis)), analysis)
+            self.assertEqual(frozen_graph.reference_point_classification, query_graph.reference_point_classification)
+
+    def test_translation(self):
+        for query in [SPJ_query(), GroupBy_query(), Nested_with_correlation_query(), Nested_with_multisublink_query(), Nested_with_groupby_query(), Nested_with_multilevel_query()]:
+            self.assertEqual(translate(query.simplified_graph.freeze()), translate(query.simplified_graph))
+
+    def test_snapshot_is_immutable(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        frozen_graph = query_graph.freeze()
+        self.assertIs(frozen_graph.freeze(), frozen_graph)
+        self.assertFalse(hasattr(frozen_graph, "connect_membership"))
+        with self.assertRaises(ValueError):
+            frozen_graph.out_indices[0] = 0
+        # Later changes to the source graph are not visible
+        movie4 = Relation("movie4", "movie")
+        query_graph.connect_simplified_join(query_graph.relations[0], movie4)
+        self.assertNotIn(movie4, frozen_graph)
+        self.assertEqual(frozen_graph.number_of_edges(), query_graph.number_of_edges() - 2)
+
+
+class Test_graph_backend(unittest.TestCase):
+    def _assert_backend_matches_networkx(self, query_graph):
+        backend = query_graph.backend
+        self.assertEqual(list(backend.nodes), list(query_graph.nodes))
+        self.assertEqual(backend.number_of_edges(), query_graph.number_of_edges())
+        for node in query_graph.nodes:
+            self.assertEqual(backend.successors(node), list(query_graph.successors(node)))
+            self.assertEqual(backend.predecessors(node), list(query_graph.predecessors(node)))
+            for dst in query_graph.successors(node):
+                self.assertIs(backend.get_edge(node, dst), query_graph.edges[node, dst]["data"])
+
+    def test_same_primitives(self):
+        for query_graph in [Nested_with_multilevel_query().simplified_graph, random_query_graph(20, 4)]:
+            query_graph = pickle.loads(pickle.dumps(query_graph))
+            networkx_graph = pickle.loads(pickle.dumps(query_graph))
+            query_graph.set_backend(AdjacencyListBackend.name)
+            self.assertIsInstance(query_graph.backend, AdjacencyListBackend)
+            self._assert_backend_matches_networkx(query_graph)
+            for node in query_graph.nodes:
+                self.assertEqual(query_graph.get_out_going_nodes(node), networkx_graph.get_out_going_nodes(node))
+                self.assertEqual(query_graph.get_incoming_nodes(node), networkx_graph.get_incoming_nodes(node))
+            for src in list(query_graph.nodes)[:5]:
+                for dst in query_graph.nodes:
+                    has_path = nx.has_path(networkx_graph, src, dst)
+                    self.assertEqual(query_graph.backend.has_path(src, dst), has_path)
+                    self.assertEqual(networkx_graph.backend.has_path(src, dst), has_path)
+                    if has_path:
+                        distance = nx.shortest_path_length(networkx_graph, src, dst)
+                        self.assertEqual(query_graph.backend.shortest_path_length(src, dst), distance)
+                        self.assertEqual(query_graph.shortest_path_length(src, dst), distance)
+
+    def test_same_analyses_and_translation(self):
+        for query in [SPJ_query(), GroupBy_query(), Nested_with_correlation_query(), Nested_with_multisublink_query(), Nested_with_groupby_query()]:
+            networkx_graph = query.simplified_graph
+            adjacency_graph = pickle.loads(pickle.dumps(networkx_graph))
+            adjacency_graph.set_backend(AdjacencyListBackend.name)
+            for analysis in ["query_subjects", "reference_points", "branching_relations", "leaf_relations", "secondary_relations"]:
+                self.assertEqual(list(getattr(adjacency_graph, analysis)), list(getattr(networkx_graph, analysis)), analysis)
+            self.assertEqual(translate(adjacency_graph), translate(networkx_graph))
+
+    def test_backend_follows_mutations(self):
+        query_graph = Query_graph("graph", graph_backend=AdjacencyListBackend.name)
+        movie, actor, director = Relation("movie", "movie"), Relation("actor", "actor"), Relation("director", "director")
+        title = Attribute("title", "title")
+        query_graph.connect_membership(movie, title)
+        query_graph.connect_simplified_join(movie, actor)
+        query_graph.connect_simplified_join(movie, director)
+        self._assert_backend_matches_networkx(query_graph)
+        query_graph.remove_edge(movie, actor)
+        self._assert_backend_matches_networkx(query_graph)
+        query_graph.remove_node(director)
+        self._assert_backend_matches_networkx(query_graph)
+        query_graph.add_edges_from([(actor, director, {"data": Join("plays in")})])
+        self._assert_backend_matches_networkx(query_graph)
+        # networkx copies go through the bulk mutations
+        self._assert_backend_matches_networkx(query_graph.copy())
+        query_graph.clear_edges()
+        self._assert_backend_matches_networkx(query_graph)
+
+    def test_standalone_backends_behave_the_same(self):
+        movie, actor, director = Relation("movie", "movie"), Relation("actor", "actor"), Relation("director", "director")
+        join = Join("starring")
+        for backend in [NetworkxBackend(), AdjacencyListBackend()]:
+            backend.add_edge(movie, actor, join)
+            backend.add_edge(actor, movie, join)
+            backend.add_node(director)
+            self.assertEqual(list(backend.nodes), [movie, actor, director])
+            self.assertEqual((backend.number_of_nodes(), backend.number_of_edges()), (3, 2))
+            self.assertIs(backend.get_edge(movie, actor), join)
+            self.assertEqual(backend.shortest_path_length(actor, actor), 0)
+            self.assertFalse(backend.has_path(movie, director))
+            with self.assertRaises(nx.NetworkXNoPath):
+                backend.shortest_path_length(movie, director)
+            with self.assertRaises(nx.NodeNotFound):
+                backend.successors(Relation("unknown", "unknown"))
+            with self.assertRaises(KeyError):
+                backend.get_edge(movie, director)
+            backend.remove_node(actor)
+            self.assertEqual((backend.number_of_nodes(), backend.number_of_edges()), (2, 0))
+
+    def test_pickle_keeps_backend(self):
+        query_graph = pickle.loads(pickle.dumps(SPJ_query().simplified_graph))
+        query_graph.set_backend(AdjacencyListBackend.name)
+        loaded_graph = pickle.loads(pickle.dumps(query_graph))
+        self.assertIsInstance(loaded_graph.backend, AdjacencyListBackend)
+        self._assert_backend_matches_networkx(loaded_graph)
+        self.assertIsInstance(copy.deepcopy(SPJ_query().simplified_graph).backend, NetworkxBackend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            Query_graph(graph_backend="unknown")
+
+
+class Test_from_edges(unittest.TestCase):
+    def test_same_as_connect_calls(self):
+        for num_relations in [1, 7, 30]:
+            expected_graph = chain_query_graph(num_relations)
+            query_graph = Query_graph.from_edges(chain_query_graph_edges(num_relations), expected_graph.node_name)
+            self.assertEqual(list(query_graph.nodes), list(expected_graph.nodes))
+            self.assertEqual(list(query_graph.edges(data="data")), list(expected_graph.edges(data="data")))
+            self.assertEqual(translate(query_graph), translate(expected_graph))
+
+    def test_same_as_fixture_edges(self):
+        expected_graph = Nested_with_multisublink_query().simplified_graph
+        query_graph = Query_graph.from_edges((src, edge, dst) for src, dst, edge in expected_graph.edges(data="data"))
+        self.assertEqual(set(query_graph.nodes), set(expected_graph.nodes))
+        self.assertEqual(set(query_graph.edges(data="data")), set(expected_graph.edges(data="data")))
+        self.assertEqual(query_graph.reference_points, expected_graph.reference_points)
+
+    def test_deduplication(self):
+        movie = ("relation", "movie", "movie")
+        title = ("attribute", "movie.title", "title")
+        query_graph = Query_graph.from_edges(
+            [
+                (title, "membership", movie),
+                (title, "membership", movie),
+                # Only the first edge between two nodes is kept, as in unidirectional_connect
+                (title, "dummy", movie),
+                (Attribute("movie.title", "title"), ("predicate", OperatorType.GreaterThan), ("value", "1990", "1990")),
+            ]
+        )
+        self.assertEqual(query_graph.number_of_nodes(), 3)
+        self.assertEqual(query_graph.number_of_edges(), 2)
+        self.assertEqual(type(query_graph.get_edge(Attribute("movie.title", "title"), Relation("movie", "movie"))), Membership)
+        self.assertEqual(query_graph.attributes, [Attribute("movie.title", "title")])
+        self.assertEqual(query_graph.out_by_type(Attribute("movie.title", "title"), Predicate), (Value("1990", "1990"),))
+
+    def test_graph_backend(self):
+        query_graph = Query_graph.from_edges(chain_query_graph_edges(5), graph_backend=AdjacencyListBackend.name)
+        self.assertIsInstance(query_graph.backend, AdjacencyListBackend)
+        self.assertEqual(query_graph.backend.number_of_edges(), query_graph.number_of_edges())
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            Query_graph.from_edges([(("table", "movie", "movie"), "membership", ("relation", "movie", "movie"))])
+        with self.assertRaises(ValueError):
+            Query_graph.from_edges([(("attribute", "title", "title"), "projection", ("relation", "movie", "movie"))])
+
+
+class Test_fingerprint(unittest.TestCase):
+    @staticmethod
+    def shape_graph(age, name, operator=OperatorType.LessThan):
+        person = ("relation", "p", "person")
+        age_attribute = ("attribute", "p.age", "age")
+        name_attribute = ("attribute", "p.name", "name")
+        return [
+            (name_attribute, "membership", person),
+            (person, "selection", age_attribute),
+            (age_attribute, ("predicate", operator), ("value", f"p.age.{age}", str(age))),
+            (person, "selection", name_attribute),
+            (name_attribute, ("predicate", OperatorType.Equal), ("value", f"p.name.{name}", name)),
+        ]
+
+    def test_literals_are_ignored(self):
+        query_graph1 = Query_graph.from_edges(self.shape_graph(10, "Kim"))
+        query_graph2 = Query_graph.from_edges(self.shape_graph(12, "Lee"))
+        self.assertEqual(query_graph1.fingerprint(), query_graph2.fingerprint())
+        self.assertTrue(query_graph1.has_same_structure(query_graph2))
+        self.assertNotEqual(query_graph1.fingerprint(include_values=True), query_graph2.fingerprint(include_values=True))
+        self.assertFalse(query_graph1.has_same_structure(query_graph2, include_values=True))
+
+    def test_values_are_told_apart_by_position(self):
+        # Swapping the literals of two predicates keeps the shape but not the values
+        query_graph1 = Query_graph.from_edges(self.shape_graph(10, "12"))
+        query_graph2 = Query_graph.from_edges(self.shape_graph(12, "10"))
+        self.assertEqual(query_graph1.fingerprint(), query_graph2.fingerprint())
+        self.assertNotEqual(query_graph1.fingerprint(include_values=True), query_graph2.fingerprint(include_values=True))
+
+    def test_independent_of_insertion_order(self):
+        records = chain_query_graph_edges(12)
+        query_graph = Query_graph.from_edges(records)
+        shuffled_graph = Query_graph.from_edges(records[::-1])
+        self.assertNotEqual(list(query_graph.nodes), list(shuffled_graph.nodes))
+        for include_values in [False, True]:
+            self.assertEqual(query_graph.fingerprint(include_values), shuffled_graph.fingerprint(include_values))
+            self.assertTrue(query_graph.has_same_structure(shuffled_graph, include_values))
+        self.assertEqual(query_graph.freeze().fingerprint(), query_graph.fingerprint())
+
+    def test_structure_changes(self):
+        fingerprint = Query_graph.from_edges(self.shape_graph(10, "Kim")).fingerprint()
+        self.assertNotEqual(Query_graph.from_edges(self.shape_graph(10, "Kim", OperatorType.GreaterThan)).fingerprint(), fingerprint)
+        records = self.shape_graph(10, "Kim")
+        self.assertNotEqual(Query_graph.from_edges(records[:-1]).fingerprint(), fingerprint)
+        query_graph = Query_graph.from_edges(records)
+        self.assertEqual(query_graph.fingerprint(), fingerprint)
+        # Mutations drop the cached fingerprint
+        query_graph.connect_membership(Relation("p", "person"), Attribute("p.id", "id"))
+        self.assertNotEqual(query_graph.fingerprint(), fingerprint)
+        distinct_fingerprints = {query().simplified_graph.fingerprint() for query in [SPJ_query, SPJ_query2, GroupBy_query, TestQuery2]}
+        self.assertEqual(len(distinct_fingerprints), 4)
+
+    def test_stable_across_processes(self):
+        code = (
+            "from pylogos.query_graph.koutrika_query_graph import Query_graph; "
+            "from tests.test_koutrika_et_al_2010.utils import chain_query_graph; "
+            "print(chain_query_graph(10).fingerprint())"
+        )
+        outputs = {
+            subprocess.run(
+                [sys.executable, "-W", "ignore", "-c", code],
+                capture_output=True,
+                text=True,
+                env={"PYTHONHASHSEED": seed, "PYTHONPATH": ":".join(sys.path)},
+            ).stdout
+            for seed in ["1", "2"]
+        }
+        self.assertEqual(outputs, {f"{chain_query_graph(10).fingerprint()}\n"})
+
+
+class Test_reference_point_classification(unittest.TestCase):
+    def _assert_same_as_legacy(self, query_graph):
+        try:
+            expected = legacy_reference_points(query_graph)
+        except (RuntimeError, nx.NetworkXNoPath) as e:
+            self.assertRaises(type(e), lambda: query_graph.reference_points)
+            return
+        self.assertEqual([r.node_name for r in query_graph.reference_points], [r.node_name for r in expected])
+
+    def test_same_as_legacy_on_test_queries(self):
+        for query in [SPJ_query(), SPJ_query2(), GroupBy_query(), Nested_with_correlation_query(), Nested_with_multisublink_query(), Nested_with_groupby_query(), Nested_with_multilevel_query(), TestQuery2()]:
+            self._assert_same_as_legacy(query.simplified_graph)
+
+    def test_same_as_legacy_on_synthetic_graphs(self):
+        for num_relations in [1, 2, 5, 12, 30]:
+            for threshold in [1, 2, 4]:
+                for query_graph in [chain_query_graph(num_relations), star_query_graph(num_relations)] + [random_query_graph(num_relations, seed) for seed in range(5)]:
+                    query_graph.reference_point_distance_threshold = threshold
+                    self._assert_same_as_legacy(query_graph)
+
+    def test_classification(self):
+        query_graph = chain_query_graph(12)
+        classification = query_graph.reference_point_classification
+        self.assertEqual(list(classification), query_graph.relations)
+        conditions = {r.node_name: info.condition for r, info in classification.items()}
+        distances = {r.node_name: info.distance for r, info in classification.items()}
+        self.assertEqual(conditions["r0"], ReferencePointCondition.Projection)
+        self.assertEqual(conditions["r11"], ReferencePointCondition.LeafRelation)
+        self.assertEqual([conditions[f"r{i}"] for i in range(1, 5)], [None] * 4)
+        self.assertEqual([distances[f"r{i}"] for i in range(1, 5)], [1, 2, 2, 1])
+        self.assertEqual(conditions["r5"], ReferencePointCondition.DistanceThreshold)
+        self.assertEqual(distances["r5"], 0)
+        # Distances are measured to the closest of all reference points, e.g., r4 is closer to r5 than to r0
+        self.assertEqual(distances["r10"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+
+import numpy as np
+
+from pylogos.query_graph.frozen_query_graph import FrozenQueryGraph
+from pylogos.query_graph.koutrika_query_graph import OperatorType, Query_graph
+from pylogos.translate import translate
+from pylogos.translation_cache import TranslationCache, render_bindings, shape_key, value_nodes
+from tests.test_koutrika_et_al_2010.utils import (
+    GroupBy_query,
+    Nested_with_correlation_query,
+    Nested_with_groupby_query,
+    Nested_with_multilevel_query,
+    Nested_with_multisublink_query,
+    SPJ_query,
+    chain_query_graph,
+    random_query_graph,
+)
+
+
+def person_query_graph(age, name, operator=OperatorType.LessThan):
+    person = ("relation", "p", "person")
+    age_attribute = ("attribute", "p.age", "age")
+    name_attribute = ("attribute", "p.name", "name")
+    return Query_graph.from_edges(
+        [
+            (name_attribute, "membership", person),
+            (person, "selection", age_attribute),
+            (age_attribute, ("predicate", operator), ("value", f"p.age.{age}", str(age))),
+            (person, "selection", name_attribute),
+            (name_attribute, ("predicate", OperatorType.Equal), ("value", f"p.name.{name}", name)),
+        ]
+    )
+
+
+class Test_translation_cache(unittest.TestCase):
+    def test_same_as_translate(self):
+        cache = TranslationCache()
+        query_graphs = [
+            query().simplified_graph
+            for query in [
+                SPJ_query,
+                GroupBy_query,
+                Nested_with_correlation_query,
+                Nested_with_multisublink_query,
+                Nested_with_groupby_query,
+                Nested_with_multilevel_query,
+            ]
+        ]
+        query_graphs += [random_query_graph(5, seed) for seed in range(5)] + [chain_query_graph(7)]
+        for query_graph in query_graphs:
+            expected = translate(query_graph)
+            # Miss, then hit
+            self.assertEqual(cache.translate(query_graph), expected)
+            self.assertEqual(translate(query_graph, cache), expected)
+            self.assertEqual(cache.translate(FrozenQueryGraph(query_graph)), expected)
+        self.assertEqual(cache.misses, len(query_graphs))
+        self.assertEqual(cache.hits, 2 * len(query_graphs))
+
+    def test_values_are_spliced(self):
+        cache = TranslationCache()
+        self.assertEqual(cache.translate(person_query_graph(10, "Kim")), translate(person_query_graph(10, "Kim")))
+        for age, name in [(12, "Lee"), (7, "Park Jae-sung"), (100, "O'Brien")]:
+            query_graph = person_query_graph(age, name)
+            sentence, mapping = cache.translate(query_graph)
+            self.assertEqual((sentence, mapping), translate(query_graph))
+            self.assertIn(name, sentence)
+            self.assertIn(name, [sentence[phrase["start"] : phrase["end"]] for phrase in mapping])
+        self.assertEqual(cache.cache_info().misses, 1)
+        self.assertEqual(cache.cache_info().hits, 3)
+        self.assertEqual(cache.hit_rate, 0.75)
+        # Another operator is another shape
+        query_graph = person_query_graph(10, "Kim", OperatorType.GreaterThan)
+        self.assertEqual(cache.translate(query_graph), translate(query_graph))
+        self.assertEqual(cache.misses, 2)
+        # The probe leaves the labels of the graph unchanged
+        self.assertEqual(sorted(node.label for node in query_graph.values), ["10", "Kim"])
+
+    def test_shape_key(self):
+        self.assertEqual(shape_key(person_query_graph(10, "Kim")), shape_key(person_query_graph(12, "Lee")))
+        self.assertNotEqual(
+            shape_key(person_query_graph(10, "Kim")), shape_key(person_query_graph(10, "Kim", OperatorType.Equal))
+        )
+        self.assertNotEqual(shape_key(chain_query_graph(4)), shape_key(chain_query_graph(5)))
+
+    def test_lru_eviction(self):
+        cache = TranslationCache(maxsize=2)
+        query_graphs = [chain_query_graph(num_relations) for num_relations in [3, 4, 5]]
+        for query_graph in query_graphs:
+            cache.translate(query_graph)
+        self.assertEqual(len(cache), 2)
+        # The least recently used shape (3 relations) was evicted
+        cache.translate(query_graphs[2])
+        cache.translate(query_graphs[0])
+        self.assertEqual(cache.cache_info()[:2], (1, 4))
+        cache.clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 0, 2, 0))
+        # maxsize=0 never stores anything
+        cache = TranslationCache(maxsize=0)
+        cache.translate(query_graphs[0])
+        cache.translate(query_graphs[0])
+        self.assertEqual(cache.cache_info()[:2], (0, 2))
+        with self.assertRaises(ValueError):
+            TranslationCache(maxsize=-1)
+
+    def test_empty_values_bypass_the_cache(self):
+        cache = TranslationCache()
+        query_graph = person_query_graph(10, "")
+        self.assertEqual(cache.translate(query_graph), translate(query_graph))
+        self.assertEqual(cache.cache_info(), (0, 0, 1, 1024, 0))
+
+
+class Test_render_bindings(unittest.TestCase):
+    BINDINGS = [(10, "Kim"), (12, "Lee"), (7, "{braces} and 'quotes'"), (3.5, "Park")]
+
+    def expected(self):
+        return [translate(person_query_graph(age, name)) for age, name in self.BINDINGS]
+
+    def test_tuples(self):
+        query_graph = person_query_graph(1, "x")
+        self.assertEqual([value.label for value in value_nodes(query_graph)], ["1", "x"])
+        expected = self.expected()
+        self.assertEqual(list(render_bindings(query_graph, self.BINDINGS)), [sentence for sentence, _ in expected])
+        self.assertEqual(list(render_bindings(query_graph, iter(self.BINDINGS), with_mapping=True)), expected)
+
+    def test_numpy(self):
+        query_graph = person_query_graph(1, "x")
+        expected = [sentence for sentence, _ in self.expected()]
+        # Mixed integers and floats in one object field (10.0 in a float field would be rendered as "10.0")
+        bindings = np.array(self.BINDINGS, dtype=[("age", "O"), ("name", "U32")])
+        self.assertEqual(list(render_bindings(query_graph, bindings, chunk_size=3)), expected)
+        names = np.array([(age, name.encode("utf-8")) for age, name in self.BINDINGS[:2]], dtype=[("age", "i4"), ("name", "S8")])
+        self.assertEqual(list(render_bindings(query_graph, names)), expected[:2])
+
+    def test_cache_and_errors(self):
+        cache = TranslationCache()
+        self.assertEqual(len(list(render_bindings(person_query_graph(1, "x"), self.BINDINGS, cache=cache))), 4)
+        cache.translate(person_query_graph(5, "y"))
+        self.assertEqual(cache.cache_info()[:2], (1, 1))
+        with self.assertRaises(ValueError):
+            list(render_bindings(person_query_graph(1, "x"), [(1, "x", "extra")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import abc
+import random
 import re
 
 from pylogos.query_graph.koutrika_query_graph import (Attribute, Function,
@@ -1076,3 +1077,135 @@ class TestQuery2(Query):
     def TMT_nl(self) -> str:
         return """
             """
+
+
+# Synthetic query graphs (for scaling tests and benchmarks)
+def _join(query_graph, relation1, relation2):
+    query_graph.connect_join(
+        relation1,
+        Attribute(f"{relation1.node_name}.{relation2.node_name}_id", "id"),
+        Attribute(f"{relation2.node_name}.{relation1.node_name}_id", "id"),
+        relation2,
+    )
+
+
+def _select(query_graph, relation, value, operator=OperatorType.Equal):
+    attribute = Attribute(f"{relation.node_name}.value", "value")
+    query_graph.connect_selection(relation, attribute)
+    query_graph.connect_predicate(attribute, Value(f"{relation.node_name}.{value}", str(value)), operator)
+
+
+def chain_query_graph(num_relations):
+    """r0 - r1 - ... - r(n-1) joined one after the other, projecting from r0 and selecting on every third relation"""
+    relations = [Relation(f"r{i}", f"table{i}") for i in range(num_relations)]
+    query_graph = Query_graph(f"chain of {num_relations} relations")
+    query_graph.connect_membership(relations[0], Attribute("r0.name", "name"))
+    for relation1, relation2 in zip(relations, relations[1:]):
+        query_graph.connect_simplified_join(relation1, relation2, "joins", "joins")
+    for i in range(0, num_relations, 3):
+        _select(query_graph, relations[i], i)
+    return query_graph
+
+
+def chain_query_graph_edges(num_relations):
+    """Records of Query_graph.from_edges that build the same graph as chain_query_graph(num_relations)"""
+    relations = [("relation", f"r{i}", f"table{i}") for i in range(num_relations)]
+    edges = [(("attribute", "r0.name", "name"), "membership", relations[0])]
+    for relation1, relation2 in zip(relations, relations[1:]):
+        edges.append((relation1, ("join", "joins"), relation2))
+        edges.append((relation2, ("join", "joins"), relation1))
+    for i in range(0, num_relations, 3):
+        attribute = ("attribute", f"r{i}.value", "value")
+        edges.append((relations[i], "selection", attribute))
+        edges.append((attribute, ("predicate", OperatorType.Equal), ("value", f"r{i}.{i}", str(i))))
+    return edges
+
+
+def star_query_graph(num_relations):
+    """r0 joined with each of r1, ..., r(n-1), projecting from r0 and selecting on every spoke"""
+    relations = [Relation(f"r{i}", f"table{i}") for i in range(num_relations)]
+    query_graph = Query_graph(f"star of {num_relations} relations")
+    query_graph.connect_membership(relations[0], Attribute("r0.name", "name"))
+    for i, relation in enumerate(relations[1:], start=1):
+        query_graph.connect_simplified_join(relations[0], relation, "joins", "joins")
+        _select(query_graph, relation, i, OperatorType.GreaterThan)
+    return query_graph
+
+
+def nested_query_graph(depth):
+    """r0 projecting a title where r(i).genre IN (SELECT r(i+1).genre ...), nested depth levels deep"""
+    relations = [Relation(f"r{i}", "movie", is_primary=(i == 0)) for i in range(depth + 1)]
+    query_graph = Query_graph(f"{depth} nested queries")
+    query_graph.connect_membership(relations[0], Attribute("r0.title", "title"))
+    for i in range(depth):
+        outer_attribute = Attribute(f"r{i}.genre", "genre")
+        inner_attribute = Attribute(f"r{i + 1}.projected_genre", "genre")
+        query_graph.connect_selection(relations[i], outer_attribute)
+        query_graph.connect_predicate(outer_attribute, inner_attribute, OperatorType.In)
+        query_graph.connect_membership(relations[i + 1], inner_attribute)
+    _select(query_graph, relations[depth], 2000)
+    return query_graph
+
+
+def repeated_subquery_graph(num_subqueries):
+    """r0 projecting a title where r0.genre(i) IN (SELECT genre FROM movie WHERE director = 'Nolan') for every i"""
+    outer_relation = Relation("r0", "movie", is_primary=True)
+    query_graph = Query_graph(f"{num_subqueries} repeated nested queries")
+    query_graph.connect_membership(outer_relation, Attribute("r0.title", "title"))
+    for i in range(1, num_subqueries + 1):
+        inner_relation = Relation(f"r{i}", "movie")
+        outer_attribute = Attribute(f"r0.genre{i}", f"genre{i}")
+        inner_attribute = Attribute(f"r{i}.genre", "genre")
+        director = Attribute(f"r{i}.director", "director")
+        query_graph.connect_selection(outer_relation, outer_attribute)
+        query_graph.connect_predicate(outer_attribute, inner_attribute, OperatorType.In)
+        query_graph.connect_membership(inner_relation, inner_attribute)
+        query_graph.connect_selection(inner_relation, director)
+        query_graph.connect_predicate(director, Value(f"r{i}.Nolan", "Nolan"))
+    return query_graph
+
+
+def random_query_graph(num_relations, seed):
+    """A random spanning tree of joins, plus sublinks from outer attributes to projected attributes of inner relations"""
+    rng = random.Random(seed)
+    relations = [Relation(f"r{i}", f"table{i}", is_primary=(i == 0)) for i in range(num_relations)]
+    query_graph = Query_graph(f"random graph {seed}")
+    query_graph.connect_membership(relations[0], Attribute("r0.name", "name"))
+    for i in range(1, num_relations):
+        if rng.random() < 0.2:
+            # Nested query: r_j.attribute IN (SELECT r_i.attribute ...)
+            outer_attribute = Attribute(f"r{i}.outer", "outer")
+            inner_attribute = Attribute(f"r{i}.inner", "inner")
+            query_graph.connect_selection(relations[rng.randrange(i)], outer_attribute)
+            query_graph.connect_predicate(outer_attribute, inner_attribute, OperatorType.In)
+            query_graph.connect_membership(relations[i], inner_attribute)
+        elif rng.random() < 0.2:
+            query_graph.connect_simplified_join(relations[rng.randrange(i)], relations[i])
+        else:
+            _join(query_graph, relations[rng.randrange(i)], relations[i])
+        if rng.random() < 0.3:
+            _select(query_graph, relations[i], i)
+    return query_graph
+
+
+def translatable_graphs():
+    """The example queries that MRP translates, random graphs and a join chain"""
+    query_graphs = [
+        query().simplified_graph
+        for query in [
+            SPJ_query,
+            GroupBy_query,
+            Nested_with_correlation_query,
+            Nested_with_multisublink_query,
+            Nested_with_groupby_query,
+            Nested_with_multilevel_query,
+        ]
+    ]
+    return query_graphs + [random_query_graph(5, seed) for seed in range(5)] + [chain_query_graph(10)]
+
+
+def untranslatable_query_graph():
+    """A condition on an attribute of no relation: the graph has no query subject, so its translation fails (ValueError)"""
+    query_graph = Query_graph("untranslatable graph")
+    query_graph.connect_predicate(Attribute("movie.year", "year"), Value("2000", "2000"))
+    return query_graph
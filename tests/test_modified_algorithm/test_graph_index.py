@@ -0,0 +1,93 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from tests.test_koutrika_et_al_2010.utils import chain_query_graph, random_query_graph
+from tests.test_modified_algorithm.utils_hjkim import (
+    build_graph_index,
+    count_graphs,
+    graph_index_path,
+    load_graph,
+    load_graph_index,
+    load_graph_range,
+    load_graphs,
+    split_graph_index,
+    write_graphs,
+)
+
+
+class Test_graph_index(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "graphs.graph")
+        self.graphs = [chain_query_graph(n) for n in range(1, 8)] + [random_query_graph(n, n) for n in range(5, 30, 5)]
+        with open(self.path, "wb") as f:
+            write_graphs(f, self.graphs)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_same_graphs(self, loaded_graphs, graphs):
+        self.assertEqual([graph.node_name for graph in loaded_graphs], [graph.node_name for graph in graphs])
+        for loaded_graph, graph in zip(loaded_graphs, graphs):
+            self.assertEqual(list(loaded_graph.edges(data="data")), list(graph.edges(data="data")))
+
+    def test_offsets(self):
+        offsets = build_graph_index(self.path)
+        self.assertTrue(os.path.exists(graph_index_path(self.path)))
+        self.assertEqual(len(offsets), len(self.graphs) + 1)
+        self.assertEqual(offsets[-1], os.path.getsize(self.path))
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for idx, graph in enumerate(self.graphs):
+            self.assertEqual(pickle.loads(data[offsets[idx] : offsets[idx + 1]]).node_name, graph.node_name)
+
+    def test_random_access(self):
+        self.assertEqual(count_graphs(self.path), len(self.graphs))
+        self.assert_same_graphs([load_graph(self.path, idx) for idx in [9, 0, 4]], [self.graphs[idx] for idx in [9, 0, 4]])
+        self.assert_same_graphs(load_graph_range(self.path, 3, 7), self.graphs[3:7])
+        self.assert_same_graphs(load_graphs(self.path), self.graphs)
+        with self.assertRaises(IndexError):
+            load_graph(self.path, len(self.graphs))
+
+    def test_stale_index_is_rebuilt(self):
+        build_graph_index(self.path)
+        with open(self.path, "ab") as f:
+            write_graphs(f, [chain_query_graph(3)])
+        self.assertEqual(count_graphs(self.path), len(self.graphs) + 1)
+        with open(graph_index_path(self.path), "wb") as f:
+            f.write(b"corrupted")
+        self.assertEqual(len(load_graph_index(self.path)), len(self.graphs) + 2)
+
+    def test_truncated_index_is_rebuilt(self):
+        build_graph_index(self.path)
+        with open(graph_index_path(self.path), "r+b") as f:
+            f.truncate(os.path.getsize(graph_index_path(self.path)) - 3)
+        self.assertEqual(len(load_graph_index(self.path)), len(self.graphs) + 1)
+
+    def test_rewritten_file_of_same_size_is_reindexed(self):
+        build_graph_index(self.path)
+        # Same graphs in reverse order: same size, different offsets
+        with open(self.path, "wb") as f:
+            write_graphs(f, self.graphs[::-1])
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assert_same_graphs([load_graph(self.path, idx) for idx in range(len(self.graphs))], self.graphs[::-1])
+
+    def test_split(self):
+        offsets = load_graph_index(self.path)
+        for num_parts in [1, 3, 5, len(self.graphs), 100]:
+            ranges = split_graph_index(offsets, num_parts)
+            self.assertLessEqual(len(ranges), num_parts)
+            # Disjoint, covering and in order
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], len(self.graphs))
+            for (_, stop), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(stop, start)
+            loaded_graphs = [graph for start, stop in ranges for graph in load_graph_range(self.path, start, stop, offsets)]
+            self.assert_same_graphs(loaded_graphs, self.graphs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,21 @@
 
 import ast
 import csv
+import os
 import pickle
+import struct
 from collections import defaultdict
 
+import numpy as np
+
 def write_graphs(writer, graphs):
     for graph in graphs:
         pickle.dump(graph, writer, pickle.HIGHEST_PROTOCOL)
 
-def load_graphs(filepath, count):
+def load_graphs(filepath, count=None):
+    if count is None:
+        # All graphs of the file
+        return load_graph_range(filepath, 0, count_graphs(filepath))
     graphs = list()
     with open(filepath, 'rb') as f:
         for i in range(count):
@@ -20,6 +27,81 @@ def load_graphs(filepath, count):
             graphs.append(data)
     return graphs
 
+# Sidecar offset index of a file written by write_graphs: header, then the byte offset of every graph
+# followed by the size of the file (so graph i spans offsets[i]:offsets[i + 1])
+# The size and modification time of the graph file identify the version of it the index was built for
+GRAPH_INDEX_MAGIC = b"PLGIDX02"
+GRAPH_INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, size and mtime (ns) of the graph file, number of graphs
+
+def graph_index_path(filepath):
+    return filepath + ".idx"
+
+def build_graph_index(filepath, index_filepath=None):
+    """Record the byte offset of every pickled graph of filepath in a sidecar file and return the offsets"""
+    offsets = [0]
+    with open(filepath, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        while True:
+            try:
+                pickle.load(f)
+            except EOFError:
+                break
+            # The unpickler only consumes the bytes of the record, so the position is the start of the next one
+            offsets.append(f.tell())
+    offsets = np.array(offsets, dtype='<u8')
+    with open(index_filepath or graph_index_path(filepath), 'wb') as f:
+        f.write(GRAPH_INDEX_HEADER.pack(GRAPH_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets) - 1))
+        f.write(offsets.tobytes())
+    return offsets
+
+def load_graph_index(filepath, index_filepath=None):
+    """Return the offsets of the graphs of filepath, (re)building the sidecar index if it is missing or stale"""
+    index_filepath = index_filepath or graph_index_path(filepath)
+    try:
+        with open(index_filepath, 'rb') as f:
+            magic, file_size, file_mtime_ns, count = GRAPH_INDEX_HEADER.unpack(f.read(GRAPH_INDEX_HEADER.size))
+            # ValueError if the index is truncated in the middle of an offset
+            offsets = np.frombuffer(f.read(), dtype='<u8')
+        stat = os.stat(filepath)
+        if (
+            magic == GRAPH_INDEX_MAGIC
+            and (file_size, file_mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+            and len(offsets) == count + 1
+            and offsets[-1] == file_size
+        ):
+            return offsets
+    except (FileNotFoundError, struct.error, ValueError):
+        pass
+    return build_graph_index(filepath, index_filepath)
+
+def count_graphs(filepath):
+    return len(load_graph_index(filepath)) - 1
+
+def load_graph_range(filepath, start, stop, offsets=None):
+    """Load graphs start to stop - 1 of filepath, seeking directly to the first one"""
+    offsets = load_graph_index(filepath) if offsets is None else offsets
+    if not 0 <= start <= stop <= len(offsets) - 1:
+        raise IndexError("Graph range {}:{} out of range for the {} graphs in {}".format(start, stop, len(offsets) - 1, filepath))
+    graphs = list()
+    with open(filepath, 'rb') as f:
+        f.seek(int(offsets[start]))
+        for _ in range(stop - start):
+            graphs.append(pickle.load(f))
+    return graphs
+
+def load_graph(filepath, idx, offsets=None):
+    offsets = load_graph_index(filepath) if offsets is None else offsets
+    return load_graph_range(filepath, idx, idx + 1, offsets)[0]
+
+def split_graph_index(offsets, num_parts):
+    """Split the graphs into at most num_parts disjoint (start, stop) ranges of about the same number of bytes,
+    so that parallel workers can each call load_graph_range on their own range"""
+    count = len(offsets) - 1
+    # First graph of each part: the graph that contains the k-th fraction of the bytes
+    bounds = np.searchsorted(offsets[:-1], np.linspace(0, offsets[-1], num_parts + 1)[1:-1], side='right')
+    bounds = [0] + sorted(set(int(bound) for bound in bounds) - {0, count}) + [count]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
 
 
 def _get_table_dict(tables):